@@ -0,0 +1,5 @@
+""" Benchmarks for json_inspect.
+
+Each module can be run with 'python -m benchmarks.<module>' from the
+root of the repository and prints its results as JSON.
+"""
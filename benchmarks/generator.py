@@ -0,0 +1,215 @@
+""" Deterministic generator of synthetic SIEM log corpora.
+
+Events are modeled on the Office 365 Management API logs described in
+the README: a flat set of common fields, lists of small objects
+(Actor, ExtendedProperties) and optionally JSON encoded within string
+values. The same arguments always produce the same corpus.
+
+Run with:
+    python -m benchmarks.generator OUTPUT [--events N] [--depth D] ...
+"""
+
+import argparse
+import json
+import random
+
+
+OPERATIONS = ("UserLoggedIn", "FileAccessed", "Set-Mailbox", "MailItemsAccessed")
+WORKLOADS = ("AzureActiveDirectory", "SharePoint", "Exchange", "OneDrive")
+
+
+class CorpusSpec:
+    """ Describes a synthetic corpus.
+
+    Attributes:
+        events (int): Number of events in the corpus.
+        seed (int): Seed for the random number generator.
+        depth (int): How many tiers of nested objects are added to
+            each event beneath its common fields.
+        list_length (int): The longest a generated list can be.
+        key_cardinality (int): Number of distinct keys that nested
+            objects draw their keys from. Higher values give more
+            distinct log structures.
+        embedded_fraction (float): Fraction of nested values that are
+            encoded as JSON within a string, the way O365 encodes
+            ModifiedProperties.
+    """
+
+    def __init__(
+        self,
+        events=10000,
+        seed=0,
+        depth=3,
+        list_length=4,
+        key_cardinality=12,
+        embedded_fraction=0.2,
+    ):
+        self.events = events
+        self.seed = seed
+        self.depth = depth
+        self.list_length = list_length
+        self.key_cardinality = key_cardinality
+        self.embedded_fraction = embedded_fraction
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _hex(rng, bits):
+    return "%0*x" % (bits // 4, rng.getrandbits(bits))
+
+
+def _edge(rng):
+    roll = rng.random()
+    if roll < 0.5:
+        return _hex(rng, 48)
+    if roll < 0.8:
+        return rng.randint(0, 100000)
+    if roll < 0.9:
+        return rng.random() < 0.5
+    return None
+
+
+def _nested(rng, spec, depth):
+    """ Builds a nested value with up to depth tiers of objects. """
+
+    if depth <= 0 or rng.random() < 0.3:
+        return _edge(rng)
+    if rng.random() < 0.4:
+        value = [
+            _nested(rng, spec, depth - 1)
+            for _ in range(rng.randint(0, spec.list_length))
+        ]
+    else:
+        keys = rng.sample(
+            range(spec.key_cardinality), rng.randint(1, min(4, spec.key_cardinality))
+        )
+        value = {f"Field{key}": _nested(rng, spec, depth - 1) for key in keys}
+    if rng.random() < spec.embedded_fraction:
+        return json.dumps(value)
+    return value
+
+
+def o365_event(rng, spec=None):
+    """ Builds one event shaped like an Office 365 Management API log.
+
+    Args:
+        rng (random.Random): Source of randomness.
+        spec (CorpusSpec, None): Shape of the nested content. Defaults
+            to CorpusSpec().
+
+    Returns:
+        dict: The event.
+    """
+
+    spec = spec or CorpusSpec()
+    event = {
+        "CreationTime": f"2019-01-{rng.randint(1, 28):02d}T12:00:00",
+        "Id": _hex(rng, 128),
+        "Operation": rng.choice(OPERATIONS),
+        "OrganizationId": _hex(rng, 128),
+        "RecordType": rng.randint(1, 40),
+        "ResultStatus": rng.choice(["Succeeded", "Failed"]),
+        "UserKey": _hex(rng, 64),
+        "UserType": 0,
+        "Version": 1,
+        "Workload": rng.choice(WORKLOADS),
+        "ClientIP": ".".join(str(rng.randint(0, 255)) for _ in range(4)),
+        "UserId": f"user{rng.randint(0, 10000)}@example.com",
+        "Actor": [
+            {"ID": _hex(rng, 128), "Type": rng.randint(0, 5)}
+            for _ in range(rng.randint(1, spec.list_length))
+        ],
+        "ExtendedProperties": [
+            {"Name": name, "Value": _hex(rng, 48)}
+            for name in rng.sample(["UserAgent", "RequestType", "ResultStatusDetail"], 2)
+        ],
+    }
+    if spec.depth:
+        event["Payload"] = _nested(rng, spec, spec.depth)
+    if rng.random() < spec.embedded_fraction:
+        event["ModifiedProperties"] = json.dumps(
+            [{"Name": "StrongAuthenticationMethod", "NewValue": "[]", "OldValue": ""}]
+        )
+    return event
+
+
+def generate(spec):
+    """ Yields the events of a corpus.
+
+    Args:
+        spec (CorpusSpec): The corpus to generate.
+
+    Yields:
+        dict: Each event.
+    """
+
+    rng = random.Random(spec.seed)
+    for _ in range(spec.events):
+        yield o365_event(rng, spec)
+
+
+def lines(spec):
+    """ Yields the events of a corpus as JSON lines, without newlines. """
+
+    for event in generate(spec):
+        yield json.dumps(event)
+
+
+def write_corpus(path, spec):
+    """ Writes a corpus to a JSONL file.
+
+    Args:
+        path (str): The file to write.
+        spec (CorpusSpec): The corpus to generate.
+
+    Returns:
+        int: The number of bytes written.
+    """
+
+    written = 0
+    with open(path, "w") as f:
+        for line in lines(spec):
+            written += f.write(line + "\n")
+    return written
+
+
+def add_spec_arguments(parser):
+    """ Adds the CorpusSpec options to an argument parser. """
+
+    defaults = CorpusSpec()
+    parser.add_argument("--events", type=int, default=defaults.events)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--depth", type=int, default=defaults.depth)
+    parser.add_argument("--list-length", type=int, default=defaults.list_length)
+    parser.add_argument("--key-cardinality", type=int, default=defaults.key_cardinality)
+    parser.add_argument(
+        "--embedded-fraction", type=float, default=defaults.embedded_fraction
+    )
+
+
+def spec_from_arguments(args):
+    """ Builds a CorpusSpec from parsed add_spec_arguments options. """
+
+    return CorpusSpec(
+        events=args.events,
+        seed=args.seed,
+        depth=args.depth,
+        list_length=args.list_length,
+        key_cardinality=args.key_cardinality,
+        embedded_fraction=args.embedded_fraction,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("output")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+    spec = spec_from_arguments(args)
+    written = write_corpus(args.output, spec)
+    print(json.dumps({"output": args.output, "bytes": written, **spec.as_dict()}))
+
+
+if __name__ == "__main__":
+    main()
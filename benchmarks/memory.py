@@ -0,0 +1,94 @@
+""" Measures the memory held per ingested event by a MinionGarage.
+
+Each backend is measured in a fresh process, so neither inherits the
+interned key sets or the embedded JSON cache warmed by the other.
+
+Run with:
+    python -m benchmarks.memory [--events N] [--depth D] ...
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from benchmarks import generator
+from json_inspect import master
+from json_inspect import serialize
+
+
+def measure(lines, compact):
+    """ Returns the bytes held per event after ingesting the lines.
+
+    Everything allocated while ingesting counts, including the shared
+    state that is built along the way, such as the interned key sets,
+    so this should be called once per process.
+
+    Args:
+        lines (list): JSON strings, one per event.
+        compact (bool): Whether to use the compact garage backend.
+
+    Returns:
+        float: Bytes allocated by the garage divided by event count.
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    garage = master.MinionGarage(compact=compact)
+    for line in lines:
+        garage.append(serialize.json_transform(line))
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(lines)
+
+
+def measure_in_child(corpus, compact):
+    """ Runs measure() on a corpus file in a fresh process. """
+
+    command = [sys.executable, "-m", "benchmarks.memory", "--child", corpus]
+    if compact:
+        command.append("compact")
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def _child(corpus, compact):
+    with open(corpus) as f:
+        lines = f.read().splitlines()
+    print(json.dumps(measure(lines, compact)))
+
+
+def main():
+    if sys.argv[1:2] == ["--child"]:
+        _child(sys.argv[2], sys.argv[3:] == ["compact"])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    generator.add_spec_arguments(parser)
+    parser.set_defaults(events=5000)
+    args = parser.parse_args()
+
+    spec = generator.spec_from_arguments(args)
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = os.path.join(directory, "corpus.jsonl")
+        written = generator.write_corpus(corpus, spec)
+        default = measure_in_child(corpus, compact=False)
+        compact = measure_in_child(corpus, compact=True)
+    results = {
+        "benchmark": "memory",
+        "corpus": spec.as_dict(),
+        "mean_line_bytes": written / spec.events - 1,
+        "default_bytes_per_event": round(default),
+        "compact_bytes_per_event": round(compact),
+        "reduction": round(default / compact, 2),
+    }
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+""" Repeatable benchmarks of the json_inspect hot paths.
+
+Generates a synthetic corpus (see benchmarks.generator), then times:
+    - make: Master.make() in the default, aggregate and compact modes.
+    - hashes/uniques: MinionGarage.hashes() and uniques() at each
+      resolution from 0 to --max-resolution.
+    - write_recursive: Master.write_unique_data_recursive().
+    - rss: Peak resident memory of a fresh process running
+      Master.make(), scaled to a million events.
+
+Results are printed as a single JSON document, and optionally written
+to a file, so they can be compared between releases.
+
+Run with:
+    python -m benchmarks [--events N] [--output results.json] ...
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from loguru import logger
+
+from benchmarks import generator
+from json_inspect import master
+
+
+MAKE_MODES = {
+    "default": {},
+    "aggregate": {"aggregate": True},
+    "compact": {"compact": True},
+}
+
+
+def _best_of(repeat, function):
+    """ Runs function repeat times and returns the fastest time. """
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def _result(name, seconds, events, **extra):
+    return {
+        "benchmark": name,
+        "seconds": round(seconds, 6),
+        "events_per_second": round(events / seconds) if seconds else None,
+        **extra,
+    }
+
+
+def bench_make(corpus, events, repeat):
+    results = []
+    for mode, kwargs in MAKE_MODES.items():
+
+        def run():
+            master.Master(input_file=corpus, **kwargs).make()
+
+        seconds = _best_of(repeat, run)
+        results.append(_result("make", seconds, events, mode=mode))
+    return results
+
+
+def bench_garage(corpus, events, repeat, max_resolution):
+    m = master.Master(input_file=corpus)
+    m.make()
+    results = []
+    for resolution in range(max_resolution + 1):
+        seconds = _best_of(repeat, lambda: m.minions.hashes(resolution))
+        results.append(_result("hashes", seconds, events, resolution=resolution))
+        seconds = _best_of(repeat, lambda: m.minions.uniques(resolution))
+        results.append(_result("uniques", seconds, events, resolution=resolution))
+    return results
+
+
+def bench_write_recursive(corpus, events, repeat, max_resolution, directory):
+    m = master.Master(input_file=corpus)
+    m.make()
+    output = os.path.join(directory, "uniques.json")
+    seconds = _best_of(
+        repeat, lambda: m.write_unique_data_recursive(output, resolution=max_resolution)
+    )
+    return [_result("write_recursive", seconds, events, resolution=max_resolution)]
+
+
+def bench_rss(corpus, events, mode):
+    """ Measures peak RSS in a fresh process so earlier benchmarks do
+    not inflate it. """
+
+    command = [sys.executable, "-m", "benchmarks.suite", "--rss-child", corpus, mode]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    child = json.loads(output)
+    growth = child["peak_rss_bytes"] - child["baseline_rss_bytes"]
+    return [
+        {
+            "benchmark": "rss",
+            "mode": mode,
+            "peak_rss_bytes": child["peak_rss_bytes"],
+            "rss_bytes_per_million_events": round(growth / events * 1000000),
+        }
+    ]
+
+
+def _max_rss():
+    """ Returns the peak resident memory of this process in bytes. """
+
+    # On Linux ru_maxrss carries over from the parent process across
+    # fork and exec, while VmHWM starts afresh with the new program.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _rss_child(corpus, mode):
+    logger.remove()
+    baseline = _max_rss()
+    m = master.Master(input_file=corpus, **MAKE_MODES[mode])
+    m.make()
+    print(json.dumps({"baseline_rss_bytes": baseline, "peak_rss_bytes": _max_rss()}))
+
+
+def run(spec, repeat=3, max_resolution=4, directory=None):
+    """ Runs every benchmark against a corpus built from spec.
+
+    Args:
+        spec (CorpusSpec): The corpus to benchmark against.
+        repeat (int): Each timing is the best of this many runs.
+        max_resolution (int): Highest resolution to benchmark.
+        directory (str, None): Where to write the corpus and outputs.
+            Defaults to a temporary directory.
+
+    Returns:
+        dict: Metadata about the run and a list of results.
+    """
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        corpus = os.path.join(tmp, "corpus.json")
+        corpus_bytes = generator.write_corpus(corpus, spec)
+        events = spec.events
+
+        logger.disable("json_inspect")
+        try:
+            results = bench_make(corpus, events, repeat)
+            results += bench_garage(corpus, events, repeat, max_resolution)
+            results += bench_write_recursive(
+                corpus, events, repeat, max_resolution, tmp
+            )
+        finally:
+            logger.enable("json_inspect")
+        for mode in MAKE_MODES:
+            results += bench_rss(corpus, events, mode)
+
+    return {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": dict(spec.as_dict(), bytes=corpus_bytes),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "--rss-child":
+        _rss_child(sys.argv[2], sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    generator.add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-resolution", type=int, default=4)
+    parser.add_argument("--output", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    report = run(
+        generator.spec_from_arguments(args),
+        repeat=args.repeat,
+        max_resolution=args.max_resolution,
+    )
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    print(document)
+
+
+if __name__ == "__main__":
+    main()
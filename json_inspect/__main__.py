@@ -0,0 +1,5 @@
+import sys
+
+from json_inspect.cli import main
+
+sys.exit(main())
@@ -0,0 +1,222 @@
+import asyncio
+import inspect
+import time
+
+from json_inspect import serialize
+
+
+class Feeder:
+    """ Feeds logs into a Master from asyncio code.
+
+    Logs are put on a bounded queue and modeled in batches by a single
+    consumer task, which hands each batch to an executor so that the
+    transform and fingerprint work never blocks the event loop. When
+    the queue is full, put() waits and feed_nowait() raises
+    asyncio.QueueFull, which pushes back on the producer.
+
+    Batches are modeled one at a time and in order, so the Master ends
+    up exactly as if the logs had been read from a file. The Master
+    should only be queried once join() has returned.
+
+    Example:
+        >>> async def collector(m, source):
+        ...     feeder = m.feeder(on_new=print_structure)
+        ...     await feeder.feed(source)
+
+    Attributes:
+        master (Master): The Master the logs are fed into.
+        queue_size (int): The most logs that can wait to be modeled.
+        batch_size (int): The most logs modeled per executor call.
+        executor (Executor, None): Where batches are modeled. None for
+            the event loop's default executor.
+        resolution (int): The resolution structures are compared at
+            for on_new.
+        on_new (callable, None): Called on the event loop with each log
+            whose structure at the resolution is new to the Master. If
+            it returns an awaitable, it is awaited before the next
+            batch is modeled.
+    """
+
+    def __init__(
+        self,
+        master,
+        queue_size=1024,
+        batch_size=256,
+        executor=None,
+        resolution=1,
+        on_new=None,
+    ):
+        self.master = master
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.executor = executor
+        self.resolution = resolution
+        self.on_new = on_new
+        self._queue = None
+        self._consumer = None
+        self._loop = None
+        self._error = None
+        self._seen = None
+        if on_new is not None:
+            self._seen = {
+                minion_.fingerprint(resolution)
+                for minion_ in master.minions.filtered(resolution)
+            }
+
+    async def feed(self, records):
+        """ Feeds every log from an iterable, then waits until they
+        have all been modeled.
+
+        Args:
+            records (iterable, async iterable): Raw log lines, as str
+                or bytes, or logs that have already been parsed.
+        """
+
+        if hasattr(records, "__aiter__"):
+            async for record in records:
+                await self.put(record)
+        else:
+            for record in records:
+                await self.put(record)
+        await self.join()
+
+    async def put(self, record):
+        """ Queues a log, waiting while the queue is full.
+
+        Args:
+            record (str, bytes, dict, list): See feed().
+        """
+
+        self._start()
+        await self._queue.put(record)
+
+    def feed_nowait(self, record):
+        """ Queues a log without waiting. Must be called from the event
+        loop's thread.
+
+        Args:
+            record (str, bytes, dict, list): See feed().
+
+        Raises:
+            asyncio.QueueFull: If the queue is full. The log was not
+                queued and should be retried or dropped.
+        """
+
+        self._start()
+        self._queue.put_nowait(record)
+
+    async def join(self):
+        """ Waits until every queued log has been modeled.
+
+        Raises:
+            Exception: Whatever stopped the consumer, if modeling a
+                batch failed.
+        """
+
+        if self._queue is not None:
+            self._start()
+            await self._queue.join()
+        self._raise()
+
+    async def close(self):
+        """ Waits for the queued logs, then stops the consumer. """
+
+        try:
+            await self.join()
+        finally:
+            if self._consumer is not None:
+                self._consumer.cancel()
+                self._consumer = None
+
+    def _start(self):
+        """ Makes sure the queue and consumer belong to the running
+        event loop.
+
+        Queues and tasks are bound to one event loop, such as that of
+        one asyncio.run(). When logs are fed from another loop, a new
+        queue and consumer are made for it, and any logs left on the
+        old queue are moved to the new one so that they are modeled.
+        """
+
+        self._raise()
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            pending = []
+            while self._queue is not None and not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            for record in pending:
+                self._queue.put_nowait(record)
+            self._consumer = None
+            self._loop = loop
+        if self._consumer is None or self._consumer.done():
+            self._consumer = loop.create_task(self._consume())
+
+    def _raise(self):
+        if self._error is not None:
+            raise self._error
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                # After a failure, logs are only taken off the queue so
+                # that producers and join() do not wait forever.
+                if self._error is None:
+                    new_minions = await loop.run_in_executor(
+                        self.executor, self._model, batch
+                    )
+                    for new_minion in new_minions:
+                        result = self.on_new(new_minion)
+                        if inspect.isawaitable(result):
+                            await result
+            except Exception as error:
+                self._error = error
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    def _model(self, batch):
+        """ Models a batch of logs. Runs in the executor.
+
+        Returns:
+            list: The Minions with a structure new to the Master, if
+                on_new is set.
+        """
+
+        master = self.master
+        stats = master._stats
+        garage = master.minions
+        clock = time.perf_counter
+        new_minions = []
+        with stats.track(master.codec, master.embedded_json):
+            for record in batch:
+                started = clock()
+                data = serialize.json_transform(
+                    record, policy=master.embedded_json, codec=master.codec
+                )
+                transformed = clock()
+                new_minion = garage.append(data)
+                stats.add("transform", transformed - started)
+                stats.add("build", clock() - transformed)
+                if self._is_new(new_minion):
+                    new_minions.append(new_minion)
+        stats.count("events", len(batch))
+        return new_minions
+
+    def _is_new(self, new_minion):
+        """ Returns True if on_new should be called for the Minion. """
+
+        if self._seen is None or new_minion is None:
+            return False
+        if new_minion.depth < self.resolution:
+            return False
+        fingerprint = new_minion.fingerprint(self.resolution)
+        if fingerprint in self._seen:
+            return False
+        self._seen.add(fingerprint)
+        return True
@@ -0,0 +1,321 @@
+import json
+import os
+import sqlite3
+import time
+
+from loguru import logger
+
+
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    source TEXT,
+    started REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    run INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shapes (
+    fingerprint BLOB PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    exemplar TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    first_run INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS models (
+    resolution INTEGER NOT NULL,
+    fingerprint BLOB NOT NULL,
+    model TEXT NOT NULL,
+    shape BLOB NOT NULL,
+    count INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    first_run INTEGER NOT NULL,
+    PRIMARY KEY (resolution, fingerprint)
+);
+"""
+
+
+class Catalog:
+    """ A persistent catalog of log structures kept in an SQLite file.
+
+    The catalog holds one row per distinct log structure (shape) with
+    an exemplar log, an occurrence count and first/last seen times. It
+    also holds one row per unique model at each resolution, so the
+    unique models of everything ever ingested can be listed without
+    reading any logs. Files that have been ingested are recorded so
+    that later runs only need to read new files.
+
+    Fingerprints are only comparable between runs that use the same
+    digest, so the digest is stored in the catalog and checked when it
+    is opened.
+
+    Attributes:
+        path (str): The SQLite file of the catalog.
+        codec (Codec): The codec the fingerprints were made with.
+        run (int, None): The id of the latest run started through this
+            Catalog object.
+    """
+
+    def __init__(self, path, codec):
+        """ Opens or creates the catalog
+
+        Args:
+            path (str): The SQLite file to open or create.
+            codec (Codec): The codec that fingerprints are made with.
+
+        Raises:
+            ValueError: If the catalog was made with a different digest
+                or a newer schema.
+        """
+
+        self.path = path
+        self.codec = codec
+        self.run = None
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+        self._check_meta()
+
+    def _check_meta(self):
+        """ Records or validates the schema version and digest. """
+
+        expected = {
+            "schema_version": str(SCHEMA_VERSION),
+            "digest": f"{self.codec.digest_name}/{self.codec.digest_size}",
+        }
+        stored = dict(self._connection.execute("SELECT key, value FROM meta"))
+        if not stored:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT INTO meta (key, value) VALUES (?, ?)", expected.items()
+                )
+            return
+        if int(stored["schema_version"]) > SCHEMA_VERSION:
+            raise ValueError(
+                f"Catalog {self.path} uses a newer schema: {stored['schema_version']}"
+            )
+        if stored["digest"] != expected["digest"]:
+            raise ValueError(
+                f"Catalog {self.path} was made with the {stored['digest']} digest, "
+                f"not {expected['digest']}."
+            )
+
+    def has_file(self, file_loc):
+        """ Returns True if the file was already ingested unchanged.
+
+        A file counts as unchanged if its size and modification time
+        match the ones recorded when it was ingested.
+
+        Args:
+            file_loc (str): The name of the file.
+        """
+
+        stat = os.stat(file_loc)
+        row = self._connection.execute(
+            "SELECT size, mtime FROM files WHERE path = ?",
+            (os.path.abspath(file_loc),),
+        ).fetchone()
+        return row == (stat.st_size, stat.st_mtime)
+
+    def start_run(self, source=None):
+        """ Starts a new run, which new shapes will be attributed to.
+
+        Args:
+            source (str, None): Description of what is being ingested.
+
+        Returns:
+            int: The id of the run.
+        """
+
+        with self._connection:
+            cursor = self._connection.execute(
+                "INSERT INTO runs (source, started) VALUES (?, ?)", (source, time.time())
+            )
+        self.run = cursor.lastrowid
+        return self.run
+
+    def record_file(self, file_loc):
+        """ Records that the file was ingested during the current run.
+
+        Args:
+            file_loc (str): The name of the file.
+        """
+
+        stat = os.stat(file_loc)
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, run) "
+                "VALUES (?, ?, ?, ?)",
+                (os.path.abspath(file_loc), stat.st_size, stat.st_mtime, self.run),
+            )
+
+    def update(self, garage, seen=None):
+        """ Adds the shapes held by a garage to the catalog.
+
+        Shapes already in the catalog have their count and last seen
+        time updated. New shapes, and any models they have that are
+        new at some resolution, are added with the current run.
+
+        Args:
+            garage (MinionGarage): The garage holding the logs of the
+                current run only.
+            seen (float, None): Time the logs were seen, as seconds
+                since the epoch. Defaults to now.
+
+        Returns:
+            list: The Shapes of the garage that were not in the
+                catalog.
+        """
+
+        if self.run is None:
+            self.start_run()
+        seen = seen or time.time()
+        new_shapes = []
+        with self._connection:
+            for shape in garage.shapes():
+                if self._update_shape(shape, seen):
+                    new_shapes.append(shape)
+        logger.info(
+            f"Catalog {self.path}: {len(new_shapes)} new shapes "
+            f"in run {self.run}."
+        )
+        return new_shapes
+
+    def _update_shape(self, shape, seen):
+        """ Upserts one shape and its models. Returns True if new. """
+
+        exemplar = shape.exemplar
+        fingerprint = exemplar.fingerprint(-1)
+        updated = self._connection.execute(
+            "UPDATE shapes SET count = count + ?, last_seen = ? WHERE fingerprint = ?",
+            (shape.count, seen, fingerprint),
+        ).rowcount
+        for resolution in range(exemplar.depth + 1):
+            self._update_model(shape, resolution, seen)
+        if updated:
+            return False
+
+        self._connection.execute(
+            "INSERT INTO shapes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                fingerprint,
+                exemplar.depth,
+                json.dumps(exemplar.data(-1)),
+                shape.count,
+                seen,
+                seen,
+                self.run,
+            ),
+        )
+        return True
+
+    def _update_model(self, shape, resolution, seen):
+        """ Upserts the model of a shape at one resolution. """
+
+        exemplar = shape.exemplar
+        key = (resolution, exemplar.fingerprint(resolution))
+        updated = self._connection.execute(
+            "UPDATE models SET count = count + ?, last_seen = ? "
+            "WHERE resolution = ? AND fingerprint = ?",
+            (shape.count, seen) + key,
+        ).rowcount
+        if updated:
+            return
+        self._connection.execute(
+            "INSERT INTO models VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            key
+            + (
+                json.dumps(exemplar.model(resolution)),
+                exemplar.fingerprint(-1),
+                shape.count,
+                seen,
+                seen,
+                self.run,
+            ),
+        )
+
+    def models(self, resolution=0, run=None):
+        """ Returns the unique models at a resolution.
+
+        Args:
+            resolution (int): Only models of logs with a depth >= this
+                resolution are returned, as with MinionGarage.uniques.
+            run (int, None): If given, only models first seen in this
+                run are returned.
+
+        Returns:
+            dict: Maps each model's hash to the model, in order of
+                first appearance.
+        """
+
+        query = "SELECT fingerprint, model FROM models WHERE resolution = ?"
+        params = (resolution,)
+        if run is not None:
+            query += " AND first_run = ?"
+            params += (run,)
+        rows = self._connection.execute(query + " ORDER BY rowid", params)
+        return {fingerprint.hex(): json.loads(model) for fingerprint, model in rows}
+
+    def exemplars(self, resolution=0, run=None):
+        """ Returns an exemplar log for each unique model at a
+        resolution.
+
+        Args:
+            resolution (int): See Catalog.models.
+            run (int, None): See Catalog.models.
+
+        Returns:
+            dict: Maps each model's hash to the full data of the first
+                log seen with that model.
+        """
+
+        query = (
+            "SELECT models.fingerprint, shapes.exemplar FROM models "
+            "JOIN shapes ON shapes.fingerprint = models.shape "
+            "WHERE models.resolution = ?"
+        )
+        params = (resolution,)
+        if run is not None:
+            query += " AND models.first_run = ?"
+            params += (run,)
+        rows = self._connection.execute(query + " ORDER BY models.rowid", params)
+        return {fingerprint.hex(): json.loads(data) for fingerprint, data in rows}
+
+    def shapes(self):
+        """ Returns a row per shape in the catalog.
+
+        Returns:
+            list: Dicts with the hash, depth, count, first_seen,
+                last_seen and first_run of each shape.
+        """
+
+        rows = self._connection.execute(
+            "SELECT fingerprint, depth, count, first_seen, last_seen, first_run "
+            "FROM shapes ORDER BY rowid"
+        )
+        return [
+            {
+                "hash": fingerprint.hex(),
+                "depth": depth,
+                "count": count,
+                "first_seen": first_seen,
+                "last_seen": last_seen,
+                "first_run": first_run,
+            }
+            for fingerprint, depth, count, first_seen, last_seen, first_run in rows
+        ]
+
+    def close(self):
+        self._connection.close()
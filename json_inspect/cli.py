@@ -0,0 +1,323 @@
+""" Command line interface for json_inspect.
+
+Reads JSON logs, one per line, from files or stdin and writes each log
+structure to stdout the moment it is first seen, as one JSON object
+per line:
+
+    {"hash": "...", "model": {...}}
+
+This makes it possible to sit at the end of a pipe and watch for new
+log structures as they arrive:
+
+    tail -F /var/log/o365.json | json-inspect --resolution 1
+
+With --estimate, nothing is written per structure. Instead the number
+of distinct structures is estimated in a few kilobytes of memory and
+written once the input ends:
+
+    {"resolution": 1, "events": ..., "estimate": ..., "error": ...}
+
+Add --sketch to keep the estimate in a file across runs or hosts.
+
+With --drift, the structures in each window of that many seconds are
+compared with those in the window before it, and a report is written
+whenever a window closes:
+
+    {"start": ..., "end": ..., "events": ..., "previous_events": ...,
+     "shapes": ..., "new": [...], "vanished": [...], "shifted": [...]}
+
+Windows follow --timestamp-field if it is given, or the time each log
+is read, and slide by --slide seconds if it is given. Times more than
+--max-skew seconds ahead of the clock are not trusted.
+
+Throughput is reported on stderr periodically, and a summary is
+reported when the input ends.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from loguru import logger
+
+from json_inspect import codec as codec_
+from json_inspect import serialize
+from json_inspect import stream
+
+
+def _parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="json-inspect",
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=["-"],
+        help="JSONL files, directories or glob patterns to read. Directories "
+        "are searched for .json and .jsonl files. Files ending in .gz, .bz2 or "
+        ".xz are decompressed. '-' or nothing reads from stdin.",
+    )
+    parser.add_argument(
+        "-r",
+        "--resolution",
+        type=int,
+        default=1,
+        help="Resolution to compare log structures at. (default: 1)",
+    )
+    parser.add_argument(
+        "--data",
+        action="store_true",
+        help="Also write the data of the first log with each structure.",
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=10.0,
+        help="Seconds between throughput reports on stderr. 0 to disable.",
+    )
+    parser.add_argument(
+        "--embedded-json",
+        choices=serialize.EmbeddedJSON.modes,
+        default="always",
+        help="When to decode JSON embedded in strings. (default: always)",
+    )
+    parser.add_argument(
+        "--estimate",
+        action="store_true",
+        help="Estimate the number of distinct structures instead of writing them.",
+    )
+    parser.add_argument(
+        "--error",
+        type=float,
+        default=0.01,
+        help="Relative standard error of --estimate. (default: 0.01)",
+    )
+    parser.add_argument(
+        "--sketch",
+        help="File to merge the --estimate sketch into, created if missing.",
+    )
+    parser.add_argument(
+        "--drift",
+        type=float,
+        metavar="SECONDS",
+        help="Report structures that appear, vanish or shift in frequency "
+        "between windows of this many seconds.",
+    )
+    parser.add_argument(
+        "--slide",
+        type=float,
+        metavar="SECONDS",
+        help="Seconds --drift windows slide by. (default: the window)",
+    )
+    parser.add_argument(
+        "--timestamp-field",
+        metavar="PATH",
+        help="Dotted key path of the time of each log for --drift, such as "
+        "CreationTime. (default: the time each log is read)",
+    )
+    parser.add_argument(
+        "--shift-ratio",
+        type=float,
+        default=2.0,
+        help="Change in a structure's share of the logs that --drift reports "
+        "as shifted. (default: 2.0)",
+    )
+    parser.add_argument(
+        "--min-count",
+        type=int,
+        default=10,
+        help="Fewest logs with a structure for --drift to report it as "
+        "shifted. (default: 10)",
+    )
+    parser.add_argument(
+        "--max-skew",
+        type=float,
+        default=stream.DEFAULT_MAX_SKEW,
+        metavar="SECONDS",
+        help="Most seconds a log's --timestamp-field may be ahead of the clock "
+        "before --drift counts it as if it had no time. (default: 86400)",
+    )
+    parser.add_argument("--parser", choices=codec_.PARSERS, default="auto")
+    parser.add_argument("--digest", choices=codec_.DIGESTS, default="md5")
+    return parser.parse_args(argv)
+
+
+def _lines(files):
+    """ Yields raw lines from each file in turn, as soon as each line
+    is available. """
+
+    for file_name in files:
+        if file_name == "-":
+            # readline() returns each line as soon as it arrives,
+            # rather than waiting to fill a buffer.
+            yield from iter(sys.stdin.buffer.readline, b"")
+            continue
+        for path in serialize.expand_paths(file_name):
+            yield from serialize.read_lines(path)
+
+
+def _emit(new_minion, resolution, data):
+    record = {
+        "hash": new_minion.hash(resolution),
+        "model": new_minion.model(resolution),
+    }
+    if data:
+        record["data"] = new_minion.data(-1)
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+
+def estimate(args):
+    """ Streams the input and writes an estimate of the number of
+    distinct structures.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        DistinctCounter: The counter, including any sketch merged in.
+    """
+
+    counter = stream.DistinctCounter(
+        resolutions=(args.resolution,),
+        error=args.error,
+        codec=codec_.Codec(parser=args.parser, digest=args.digest),
+        embedded_json=serialize.EmbeddedJSON(mode=args.embedded_json),
+    )
+    # The saved sketch is merged in first, so that a sketch that cannot
+    # be merged is reported before any input is read.
+    if args.sketch and os.path.exists(args.sketch):
+        with open(args.sketch, "rb") as f:
+            saved = stream.DistinctCounter.from_bytes(f.read(), codec=counter.codec)
+        try:
+            counter.merge(saved)
+        except ValueError as error:
+            sys.exit(f"json-inspect: {args.sketch}: {error}")
+
+    for line in _lines(args.files):
+        if line.strip():
+            counter.check_line(line)
+
+    if args.sketch:
+        with open(args.sketch, "wb") as f:
+            f.write(counter.to_bytes())
+
+    record = {
+        "resolution": args.resolution,
+        "events": counter.events,
+        "estimate": counter.count(args.resolution),
+        "error": round(counter.sketches[args.resolution].error, 4),
+    }
+    sys.stdout.write(json.dumps(record) + "\n")
+    return counter
+
+
+def drift(args):
+    """ Streams the input and writes a drift report whenever a window
+    closes.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        DriftDetector: The detector, holding the final windows.
+    """
+
+    detector = stream.DriftDetector(
+        window=args.drift,
+        step=args.slide,
+        resolution=args.resolution,
+        timestamp=args.timestamp_field,
+        shift_ratio=args.shift_ratio,
+        min_count=args.min_count,
+        max_skew=args.max_skew,
+        codec=codec_.Codec(parser=args.parser, digest=args.digest),
+        embedded_json=serialize.EmbeddedJSON(mode=args.embedded_json),
+    )
+    for line in _lines(args.files):
+        if line.strip():
+            for report in detector.check_line(line):
+                _write_report(report)
+    for report in detector.flush():
+        _write_report(report)
+
+    logger.info(
+        f"Done: {detector.events} events, {detector.untimed} without a time, "
+        f"{detector.late} late, {detector.skewed} ahead of the clock."
+    )
+    return detector
+
+
+def _write_report(report):
+    sys.stdout.write(json.dumps(report) + "\n")
+    sys.stdout.flush()
+
+
+def run(args):
+    """ Streams the input and writes novel structures.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        NoveltyFilter: The filter, holding the final counts.
+    """
+
+    if args.estimate:
+        return estimate(args)
+    if args.drift:
+        return drift(args)
+
+    novelty = stream.NoveltyFilter(
+        resolution=args.resolution,
+        codec=codec_.Codec(parser=args.parser, digest=args.digest),
+        embedded_json=serialize.EmbeddedJSON(mode=args.embedded_json),
+    )
+    started = last_report = time.monotonic()
+    reported_events = 0
+
+    for line in _lines(args.files):
+        if not line.strip():
+            continue
+        new_minion = novelty.check_line(line)
+        if new_minion is not None:
+            _emit(new_minion, args.resolution, args.data)
+
+        if args.stats_interval:
+            now = time.monotonic()
+            if now - last_report >= args.stats_interval:
+                rate = (novelty.events - reported_events) / (now - last_report)
+                logger.info(
+                    f"{novelty.events} events, {len(novelty)} structures, "
+                    f"{rate:.0f} events/s"
+                )
+                last_report, reported_events = now, novelty.events
+
+    elapsed = time.monotonic() - started
+    rate = novelty.events / elapsed if elapsed else 0
+    logger.info(
+        f"Done: {novelty.events} events, {len(novelty)} unique structures at "
+        f"resolution {args.resolution} in {elapsed:.1f}s ({rate:.0f} events/s)."
+    )
+    return novelty
+
+
+def main(argv=None):
+    args = _parse_args(argv)
+    try:
+        run(args)
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # The reader went away, such as when piping into head.
+        sys.stderr.close()
+        return 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
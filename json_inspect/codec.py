@@ -0,0 +1,137 @@
+import functools
+import hashlib
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+PARSERS = ("auto", "orjson", "json")
+DIGESTS = ("md5", "blake2b")
+
+
+class Codec:
+    """ Parses JSON logs and hashes models.
+
+    The parser only affects how quickly logs are read. Models are
+    always serialized with the stdlib json module before they are
+    digested, so fingerprints are identical whichever parser is used.
+    Only the digest changes fingerprint values.
+
+    Attributes:
+        parser (str): The parser in use, 'orjson' or 'json'.
+        digest_name (str): The digest in use, 'md5' or 'blake2b'.
+        digest_size (int): The size of each digest in bytes.
+        digests (int): The number of digests computed so far.
+    """
+
+    def __init__(self, parser="auto", digest="md5", digest_size=None):
+        """ Init the Codec class
+
+        Args:
+            parser (str): 'orjson' to use orjson, 'json' to use the
+                stdlib, or 'auto' to use orjson when it is installed
+                and the stdlib otherwise.
+            digest (str): 'md5', or 'blake2b' which is faster and
+                allows smaller digests.
+            digest_size (int, None): Size in bytes of blake2b digests.
+                Defaults to 16. MD5 digests are always 16 bytes.
+
+        Raises:
+            ValueError: If the parser or digest is not supported or
+                orjson was requested but is not installed.
+        """
+
+        if parser not in PARSERS:
+            raise ValueError(f"Parser must be one of {PARSERS}: {parser}")
+        if digest not in DIGESTS:
+            raise ValueError(f"Digest must be one of {DIGESTS}: {digest}")
+        if parser == "orjson" and orjson is None:
+            raise ValueError("The orjson parser was requested but is not installed.")
+        if digest == "md5" and digest_size not in (None, 16):
+            raise ValueError("MD5 digests are always 16 bytes.")
+
+        if parser == "auto":
+            parser = "orjson" if orjson is not None else "json"
+        self.parser = parser
+        self.digest_name = digest
+        self.digest_size = digest_size or 16
+        self.digests = 0
+
+        if digest == "md5":
+            self._hash = hashlib.md5
+        else:
+            self._hash = functools.partial(hashlib.blake2b, digest_size=self.digest_size)
+        self.value_digest = functools.lru_cache(maxsize=4096)(self._value_digest)
+        self.label_fingerprints = functools.lru_cache(maxsize=None)(
+            self._label_fingerprints
+        )
+
+    def loads(self, data):
+        """ Parses a JSON document.
+
+        Documents that orjson rejects but the stdlib accepts, such as
+        NaN or integers wider than 64 bits, are parsed by the stdlib so
+        that every parser gives the same result.
+
+        Args:
+            data (str, bytes): The JSON document.
+
+        Returns:
+            The parsed value.
+
+        Raises:
+            ValueError: If the document is not valid JSON.
+        """
+
+        if self.parser == "orjson":
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(data)
+
+    def digest(self, bytes_):
+        """ Returns the raw digest of the bytes. """
+
+        self.digests += 1
+        return self._hash(bytes_).digest()
+
+    def _value_digest(self, value):
+        """ Digest of a model that is a single value, such as a label.
+
+        Args:
+            value (str, tuple): A label string, or a tuple of strings
+                which is hashed as a JSON list (a list summary).
+
+        Returns:
+            bytes: Digest of the JSON form of the value.
+        """
+
+        if isinstance(value, tuple):
+            value = list(value)
+        return self.digest(json.dumps(value).encode("utf-8"))
+
+    def _label_fingerprints(self, label):
+        """ Fingerprints of a Minion whose model is only its label.
+
+        The same tuple is shared by every such Minion.
+        """
+
+        return (self.value_digest(label),)
+
+    def __reduce__(self):
+        # The caches cannot be pickled, so rebuild from the settings.
+        digest_size = None if self.digest_name == "md5" else self.digest_size
+        return (Codec, (self.parser, self.digest_name, digest_size))
+
+    def __repr__(self):
+        return (
+            f"Codec(parser={self.parser!r}, digest={self.digest_name!r}, "
+            f"digest_size={self.digest_size})"
+        )
+
+
+DEFAULT_CODEC = Codec()
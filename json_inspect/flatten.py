@@ -0,0 +1,328 @@
+import itertools
+
+from loguru import logger
+
+
+_CONTAINERS = (dict, list)
+_CONTAINER_TYPES = frozenset(_CONTAINERS)
+
+# Returned by _descriptor_at when a path does not lead to a value.
+_MISSING = None
+
+
+def flatten(data, separator="."):
+    """ Flattens a log into a single dict of dotted keys.
+
+    Nested dict keys are joined with the separator. Lists holding any
+    dicts or lists are flattened by index, e.g. 'Actor.0.ID'. Lists of
+    plain values, and empty dicts and lists, are kept as values. Keys
+    are in the order they appear in the log, and when two dotted keys
+    collide, the later one wins.
+
+    This is the generic flatten. Flattener gives the same result much
+    faster for logs whose structure it has seen before.
+
+    Example:
+        >>> flatten({'location': {'city': 'Mortons Gap'}, 'ip': [1, 2]})
+        {'location.city': 'Mortons Gap', 'ip': [1, 2]}
+
+    Args:
+        data (dict, list, str, int): A log that has been through
+            serialize.json_transform.
+        separator (str): Joins the keys of each level.
+
+    Returns:
+        dict: Maps each dotted key to its value. A log that is not a
+            dict or list is returned under the key ''.
+    """
+
+    flattened = {}
+    for path, value in _leaves(data):
+        flattened[separator.join(str(part) for part in path)] = value
+    return flattened
+
+
+def _leaves(data):
+    """ Yields the path and value of each value that flatten keeps, in
+    the order they appear in the log.
+
+    The log is walked with an explicit stack, as logs can be nested
+    deeper than the recursion limit. Children are pushed in reverse,
+    so they are popped in order.
+    """
+
+    stack = [((), data)]
+    while stack:
+        path, value = stack.pop()
+        if isinstance(value, dict) and value:
+            items = [(path + (key,), item) for key, item in value.items()]
+        elif isinstance(value, list) and not _CONTAINER_TYPES.isdisjoint(
+            map(type, value)
+        ):
+            items = [(path + (index,), item) for index, item in enumerate(value)]
+        else:
+            yield path, value
+            continue
+        items.reverse()
+        stack.extend(items)
+
+
+def _descriptor(value):
+    """ What a value looks like, as far as telling structures apart.
+    The keys of dicts are in order, as flattened logs keep that order.
+    """
+
+    if isinstance(value, dict):
+        return ("DICT", tuple(value))
+    if isinstance(value, list):
+        return ("LIST", len(value))
+    return "edge"
+
+
+def _descriptor_at(data, path):
+    """ Returns the descriptor of the value at the path, or _MISSING. """
+
+    value = data
+    for part in path:
+        if not isinstance(value, _CONTAINERS):
+            return _MISSING
+        try:
+            value = value[part]
+        except (KeyError, IndexError, TypeError):
+            return _MISSING
+    return _descriptor(value)
+
+
+def _descriptors(data):
+    """ Maps the path of every value in the log to its descriptor. """
+
+    descriptors = {}
+    stack = [((), data)]
+    while stack:
+        path, value = stack.pop()
+        descriptors[path] = _descriptor(value)
+        if isinstance(value, dict):
+            stack.extend((path + (key,), item) for key, item in value.items())
+        elif isinstance(value, list):
+            stack.extend((path + (index,), item) for index, item in enumerate(value))
+    return descriptors
+
+
+def compile_flattener(data, separator=".", name="flatten"):
+    """ Generates a function that flattens logs with the same structure
+    as the log given, including the order of the keys of each dict.
+
+    The function is straight-line code: it looks up each value by its
+    fixed key or index and builds the flattened dict in one go, rather
+    than walking the log. It first checks that the log really has that
+    structure, and returns None if it does not.
+
+    Args:
+        data (dict, list, str, int): The log whose structure the
+            function is for.
+        separator (str): See flatten.
+        name (str): Name of the function, used in tracebacks.
+
+    Returns:
+        function: Takes a log and returns the same dict as flatten, or
+            None if the log has a different structure.
+    """
+
+    body = []
+    items = []
+    names = (f"v{number}" for number in itertools.count(1))
+
+    # Values are visited in the order flatten keeps them, with an
+    # explicit stack so that deep logs do not hit the recursion limit.
+    stack = [("v0", data, ())]
+    while stack:
+        variable, value, path = stack.pop()
+        if isinstance(value, dict) and value:
+            body.append(
+                f"if not (isinstance({variable}, dict) and "
+                f"tuple({variable}) == {tuple(value)!r}): return None"
+            )
+            children = value.items()
+        elif isinstance(value, list) and not _CONTAINER_TYPES.isdisjoint(
+            map(type, value)
+        ):
+            body.append(
+                f"if not (isinstance({variable}, list) and len({variable}) == "
+                f"{len(value)}): return None"
+            )
+            children = enumerate(value)
+        else:
+            if isinstance(value, dict):
+                check = f"isinstance({variable}, dict) and not {variable}"
+            elif isinstance(value, list):
+                check = (
+                    f"isinstance({variable}, list) and "
+                    f"_CONTAINER_TYPES.isdisjoint(map(type, {variable}))"
+                )
+            else:
+                check = f"not isinstance({variable}, _CONTAINERS)"
+            body.append(f"if not ({check}): return None")
+            key = separator.join(str(part) for part in path)
+            items.append(f"{key!r}: {variable}")
+            continue
+
+        pushed = []
+        for child_key, child in children:
+            child_variable = next(names)
+            body.append(f"{child_variable} = {variable}[{child_key!r}]")
+            pushed.append((child_variable, child, path + (child_key,)))
+        pushed.reverse()
+        stack.extend(pushed)
+
+    source = "\n".join(
+        [f"def {name}(v0):"]
+        + [f"    {line}" for line in body]
+        + ["    return {" + ", ".join(items) + "}"]
+    )
+    namespace = {"_CONTAINERS": _CONTAINERS, "_CONTAINER_TYPES": _CONTAINER_TYPES}
+    exec(compile(source, f"<{name}>", "exec"), namespace)
+    return namespace[name]
+
+
+class _Branch:
+    """ Dispatch node that picks a child by the descriptor at a path. """
+
+    __slots__ = ("path", "children")
+
+    def __init__(self, path):
+        self.path = path
+        self.children = {}
+
+
+class _Leaf:
+    """ Dispatch node holding the flattener for one structure, and the
+    descriptors of the log it was added for. """
+
+    __slots__ = ("function", "descriptors")
+
+    def __init__(self, function, descriptors):
+        self.function = function
+        self.descriptors = descriptors
+
+
+class Flattener:
+    """ Flattens logs with a flattener compiled once per structure.
+
+    Flatteners are generated by compile_flattener and cached by the
+    structure of the log they were made from, including the order of
+    its keys, so that the flattened keys come out in the same order as
+    with flatten. Logs that only differ in key order have the same
+    fingerprint, but each order gets its own flattener. To find the
+    flattener for a log without walking all of it, the structures seen
+    so far are kept in a decision tree that only looks at the few paths
+    that tell them apart, such as the keys of one dict or the length of
+    one list. The flattener then checks the rest of the structure as it
+    runs.
+
+    A log with a new structure gets a flattener compiled for it, so
+    this is fastest when there are far fewer structures than logs,
+    which is the case json_inspect is for. Use prepare() to compile
+    the flatteners for the structures a Master has already found.
+
+    Attributes:
+        separator (str): See flatten.
+        flatteners (dict): Maps each structure, as the frozenset of
+            the descriptors at its paths, to its compiled flattener.
+        hits (int): Logs flattened by a flattener found in the tree.
+        misses (int): Logs whose structure was not found in the tree.
+    """
+
+    def __init__(self, separator="."):
+        self.separator = separator
+        self.flatteners = {}
+        self.hits = 0
+        self.misses = 0
+        self._tree = None
+
+    def prepare(self, garage):
+        """ Compiles flatteners for the structures held by a garage.
+
+        Args:
+            garage (MinionGarage): The garage whose shapes to compile
+                flatteners for.
+        """
+
+        for shape in garage.shapes():
+            self._learn(shape.exemplar.data(-1))
+        logger.info(f"Compiled {len(self.flatteners)} flatteners.")
+
+    def flatten(self, data):
+        """ Flattens a log. See flatten.
+
+        Args:
+            data (dict, list, str, int): A log that has been through
+                serialize.json_transform.
+
+        Returns:
+            dict: Maps each dotted key to its value.
+        """
+
+        node = self._tree
+        while node.__class__ is _Branch:
+            node = node.children.get(_descriptor_at(data, node.path))
+        if node is not None:
+            flattened = node.function(data)
+            if flattened is not None:
+                self.hits += 1
+                return flattened
+
+        self.misses += 1
+        return self._learn(data)(data)
+
+    def _learn(self, data):
+        """ Adds the structure of a log to the decision tree, compiling
+        a flattener for it if the structure is new.
+
+        Returns:
+            function: The flattener for the structure.
+        """
+
+        descriptors = _descriptors(data)
+        structure = frozenset(descriptors.items())
+        function = self.flatteners.get(structure)
+        if function is None:
+            function = compile_flattener(
+                data, self.separator, name=f"flatten_{len(self.flatteners)}"
+            )
+            self.flatteners[structure] = function
+        self._insert(_Leaf(function, descriptors))
+        return function
+
+    def _insert(self, leaf):
+        descriptors = leaf.descriptors
+        if self._tree is None:
+            self._tree = leaf
+            return
+
+        parent, key, node = None, None, self._tree
+        while node.__class__ is _Branch:
+            descriptor = descriptors.get(node.path, _MISSING)
+            child = node.children.get(descriptor)
+            if child is None:
+                node.children[descriptor] = leaf
+                return
+            parent, key, node = node, descriptor, child
+
+        # Split the leaf on the shallowest path where the structures
+        # differ.
+        existing = node.descriptors
+        differing = [
+            path
+            for path in existing.keys() | descriptors.keys()
+            if existing.get(path, _MISSING) != descriptors.get(path, _MISSING)
+        ]
+        if not differing:
+            # The same structure is already in the tree.
+            return
+        branch = _Branch(min(differing, key=len))
+        branch.children[existing.get(branch.path, _MISSING)] = node
+        branch.children[descriptors.get(branch.path, _MISSING)] = leaf
+        if parent is None:
+            self._tree = branch
+        else:
+            parent.children[key] = branch
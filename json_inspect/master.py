@@ -1,20 +1,126 @@
+import array
+import collections
+import concurrent.futures
+import contextlib
+import functools
+import heapq
 import json
+import os
+import time
+import weakref
 
 from loguru import logger
 
+from json_inspect import aio
+from json_inspect import catalog as catalog_
+from json_inspect import codec as codec_
+from json_inspect import flatten
 from json_inspect import minion
+from json_inspect import paths as paths_
+from json_inspect import render
 from json_inspect import serialize
+from json_inspect import stats as stats_
+
+
+# Written in the header of every garage snapshot. Bumped whenever the
+# format changes in a way older versions cannot read.
+SNAPSHOT_FORMAT = "json_inspect.garage"
+SNAPSHOT_VERSION = 1
+
+
+def _fill(garage, json_items, stats):
+    """ Appends each transformed log to a garage, timing the build
+    stage.
+
+    Args:
+        garage (MinionGarage): The garage to append to.
+        json_items (iterable): The transformed logs.
+        stats (Stats): The stats to add the build time and events to.
+
+    Returns:
+        int: The number of logs appended.
+    """
+
+    clock = time.perf_counter
+    events = 0
+    for json_ in json_items:
+        started = clock()
+        garage.append(json_)
+        stats.add("build", clock() - started)
+        stats.tick()
+        events += 1
+    stats.count("events", events)
+    return events
+
+
+def _make_shard(file_loc, start, end, aggregate, policy, codec, max_resolution):
+    """ Builds a MinionGarage from one byte range of a file.
+
+    This runs in a worker process during a parallel Master.make().
+
+    The garage is always compact, so what is sent back to the parent
+    is a table of packed fingerprints, depth counts and compressed
+    logs rather than trees of minions, which would take longer to
+    unpickle than to build. The parent rebuilds a log's tree only when
+    its data or model is asked for.
+
+    Args:
+        file_loc (str): The name of the file to read from.
+        start (int): Byte offset of the first line of the range.
+        end (int, None): Byte offset where the range ends, or None for
+            the end of the file.
+        aggregate (bool): See MinionGarage.
+        policy (EmbeddedJSON): See serialize.json_transform.
+        codec (Codec): See MinionGarage.
+        max_resolution (int, None): See MinionGarage.
+
+    Returns:
+        tuple: The compact MinionGarage holding the logs in the range,
+            and the Stats for reading them.
+    """
+
+    garage = MinionGarage(
+        compact=True, aggregate=aggregate, codec=codec, max_resolution=max_resolution
+    )
+    stats = stats_.Stats()
+    with stats.track(codec, policy):
+        json_items = serialize.json_transform_from_file_range(
+            file_loc, start, end, policy=policy, codec=codec, stats=stats
+        )
+        _fill(garage, json_items, stats)
+    return garage, stats
+
+
+# Holds the positions of the minions with a depth in a garage.
+_positions = functools.partial(array.array, "L")
+
+
+def _canonical(exemplar):
+    """ The exemplar's log as JSON with sorted keys, used to pick the
+    same exemplar whatever order garages are merged in. """
+
+    return json.dumps(exemplar.data(-1), sort_keys=True)
+
+
+def _packed_fingerprints(exemplar):
+    """ The fingerprints of a Minion for every resolution, packed as a
+    CompactMinion holds them. """
+
+    fingerprints = exemplar._fingerprints
+    if isinstance(fingerprints, bytes):
+        return fingerprints
+    return b"".join(fingerprints)
 
 
 def _input_type(input_file, input_string):
     """ Helper function to determine input type
 
     Args:
-        input_file (str, None): The file name to be read from.
+        input_file (str, list, None): The files to be read from.
         input_string (str, None): JSON-serializable string.
 
     Returns:
-        str: 'file' if input type is a file name. 'string' if
+        str: 'file' if input type is files. 'string' if
             input type is a JSON-serializable string.
         None: If input is neither a file name or JSON-serializable
             string.
@@ -28,15 +134,80 @@ def _input_type(input_file, input_string):
         return None
 
 
+class Shape:
+    """ A distinct log structure seen by an aggregating MinionGarage.
+
+    Attributes:
+        exemplar (Minion): The first log seen with this structure.
+        count (int): The number of logs seen with this structure.
+        first_line (int, None): Zero-based line offset of the first
+            log. None in a merged garage, which has no line order.
+        last_line (int, None): Zero-based line offset of the latest
+            log. None in a merged garage.
+    """
+
+    __slots__ = ("exemplar", "count", "first_line", "last_line")
+
+    def __init__(self, exemplar, line):
+        self.exemplar = exemplar
+        self.count = 1
+        self.first_line = line
+        self.last_line = line
+
+
 class MinionGarage:
     """ Holds minions and performs tasks on minions in bulk.
 
     Attributes:
-        _list (list): A list of minions. One minion per log line.
+        _list (list): A list of minions. One minion per log line, or
+            one minion per distinct structure when aggregating.
+        _depth_index (dict): Maps a minion depth to the ascending
+            positions in _list of the minions with that depth, in an
+            array rather than a list of int objects.
+        _depth_counts (Counter): Maps a minion depth to the number of
+            logs seen with that depth.
+        _shapes (dict): Maps the fingerprint of a log's full structure
+            to its Shape. Only populated when aggregating.
+        events (int): The number of logs appended.
+        compact (bool): Whether logs are stored as CompactMinions.
+            Logs read by a parallel Master.make() are CompactMinions
+            either way.
+        packer (Packer): Compresses the logs of the CompactMinions,
+            with a dictionary shared by all of them.
+        aggregate (bool): Whether only one exemplar is kept per
+            distinct structure, rather than every log.
+        codec (Codec): Provides the digest used to fingerprint logs.
+        max_resolution (int, None): The highest resolution minions are
+            built for. Depths are capped at max_resolution + 1, and
+            aggregated structures are those seen at max_resolution.
+            None to build every tier.
+        path_index (PathIndex, None): Index of the key paths in the
+            logs appended or absorbed, or None if not indexing.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        compact=False,
+        aggregate=False,
+        codec=None,
+        max_resolution=None,
+        index_paths=False,
+    ):
         self._list = []
+        self.compact = compact
+        self.aggregate = aggregate
+        self.codec = codec or codec_.DEFAULT_CODEC
+        self.max_resolution = max_resolution
+        self.events = 0
+        self._depth_index = collections.defaultdict(_positions)
+        self._depth_counts = collections.Counter()
+        self._shapes = {}
+        self.packer = minion.Packer(self.codec)
+        self.path_index = None
+        if index_paths:
+            # Only the tiers that are fingerprinted can be indexed.
+            max_parts = None if max_resolution is None else max_resolution + 1
+            self.path_index = paths_.PathIndex(max_parts=max_parts)
 
     def append(self, data):
         """ A wrapper for the 'append' attribute of self._list
@@ -44,13 +215,354 @@ class MinionGarage:
         This allows us to take a raw log line and then convert it
         into a minion before appending to the list.
 
+        When aggregating, the minion is only kept if it is the first
+        log with its structure. Logs with the same full structure
+        share a model at every resolution, so the exemplar stands in
+        for all of them.
+
         Args:
             data (list, dict, str, int): The data to be converted into
                 a minion and appended to the minion list.
+
+        Returns:
+            Minion: The new minion.
+            None: If aggregating and the structure was already held.
         """
 
-        new_minion = minion.minion_generator(data)
+        if self.compact:
+            new_minion = minion.CompactMinion(
+                data, max_resolution=self.max_resolution, packer=self.packer
+            )
+        else:
+            new_minion = minion.minion_generator(
+                data, codec=self.codec, max_resolution=self.max_resolution
+            )
+        line = self.events
+        self.events += 1
+        self._depth_counts[new_minion.depth] += 1
+        if self.path_index is not None:
+            self.path_index.add(new_minion)
+
+        if self.aggregate:
+            key = new_minion.fingerprint(-1)
+            shape = self._shapes.get(key)
+            if shape is not None:
+                shape.count += 1
+                shape.last_line = line
+                return None
+            self._shapes[key] = Shape(new_minion, line)
+
+        self._depth_index[new_minion.depth].append(len(self._list))
         self._list.append(new_minion)
+        return new_minion
+
+    def absorb(self, other):
+        """ Appends the logs held by another garage, as if they had
+        been read right after the logs already in this garage.
+
+        Line offsets from the other garage are shifted accordingly,
+        and structures already seen here keep their exemplar. If this
+        garage indexes key paths, the other garage's logs are indexed
+        as they are absorbed.
+
+        Args:
+            other (MinionGarage): A garage built with the same
+                aggregate, codec and max_resolution settings as this
+                one.
+
+        Raises:
+            ValueError: If the garages have different settings.
+        """
+
+        if other.aggregate != self.aggregate:
+            raise ValueError("Cannot absorb a garage with a different aggregate mode.")
+        if repr(other.codec) != repr(self.codec):
+            raise ValueError("Cannot absorb a garage with a different codec.")
+        if other.max_resolution != self.max_resolution:
+            raise ValueError("Cannot absorb a garage with a different max_resolution.")
+
+        offset = self.events
+        self.events += other.events
+        self._depth_counts.update(other._depth_counts)
+
+        path_index = self.path_index
+        if not self.aggregate:
+            for minion_ in other._list:
+                self._depth_index[minion_.depth].append(len(self._list))
+                self._list.append(minion_)
+                if path_index is not None:
+                    path_index.add(minion_)
+            return
+
+        for key, other_shape in other._shapes.items():
+            if path_index is not None:
+                path_index.add(other_shape.exemplar, other_shape.count)
+            shape = self._shapes.get(key)
+            if shape is None:
+                shape = Shape(other_shape.exemplar, other_shape.first_line + offset)
+                shape.count = 0
+                self._shapes[key] = shape
+                self._depth_index[shape.exemplar.depth].append(len(self._list))
+                self._list.append(shape.exemplar)
+            shape.count += other_shape.count
+            shape.last_line = other_shape.last_line + offset
+
+    def merge(self, other):
+        """ Returns a garage holding the logs of both garages, such as
+        partial garages computed on different hosts.
+
+        Unlike absorb, the result does not depend on which garage is
+        merged into which, or in what order many are merged, so
+        garages can be merged in any order or tree shape. The result
+        is an aggregating garage with one Shape per distinct
+        structure, in fingerprint order. Counts are summed, and of the
+        exemplars for a structure the one with the smallest canonical
+        JSON is kept. Line offsets are not kept. Neither garage is
+        changed, and exemplars are shared with them.
+
+        This takes time in proportion to the number of distinct
+        structures, not logs, when both garages aggregate.
+
+        Args:
+            other (MinionGarage): A garage with the same digest and
+                max_resolution. Its parser and compact setting may
+                differ.
+
+        Returns:
+            MinionGarage: The merged garage. It is compact only if
+                both garages are, and indexes key paths if either
+                does.
+
+        Raises:
+            ValueError: If the garages have a different digest or
+                max_resolution.
+        """
+
+        if (self.codec.digest_name, self.codec.digest_size) != (
+            other.codec.digest_name,
+            other.codec.digest_size,
+        ):
+            raise ValueError("Cannot merge garages with different digests.")
+        if other.max_resolution != self.max_resolution:
+            raise ValueError("Cannot merge garages with a different max_resolution.")
+
+        shapes = {}
+        for garage in (self, other):
+            for shape in garage.shapes():
+                key = shape.exemplar.fingerprint(-1)
+                merged = shapes.get(key)
+                if merged is None:
+                    shapes[key] = (shape.exemplar, shape.count)
+                    continue
+                exemplar = min(merged[0], shape.exemplar, key=_canonical)
+                shapes[key] = (exemplar, merged[1] + shape.count)
+
+        garage = MinionGarage(
+            compact=self.compact and other.compact,
+            aggregate=True,
+            codec=self.codec,
+            max_resolution=self.max_resolution,
+            index_paths=self.path_index is not None or other.path_index is not None,
+        )
+        garage.events = self.events + other.events
+        garage._depth_counts = self._depth_counts + other._depth_counts
+        for key in sorted(shapes):
+            exemplar, count = shapes[key]
+            garage._add_shape(key, exemplar, count)
+        return garage
+
+    def write_snapshot(self, output):
+        """ Writes the state of the garage to a versioned JSONL
+        snapshot, which from_snapshot reads.
+
+        The first line is a header with the format, version, digest,
+        max_resolution, the number of logs and the number of logs per
+        depth. Each following line is one distinct structure, in
+        fingerprint order:
+
+            {"fingerprint": "...", "count": 12, "depth": 3,
+             "fingerprints": "...", "exemplar": {...}}
+
+        where "fingerprints" are the hex of the exemplar's fingerprints
+        for every resolution, packed. Nothing is pickled, so snapshots
+        can be read by any version that supports the format version.
+
+        Args:
+            output (str, file object): The file to write to, which is
+                compressed if it ends in .gz, .bz2 or .xz, or an open
+                text file object.
+
+        Returns:
+            int: The number of structures written.
+        """
+
+        header = {
+            "format": SNAPSHOT_FORMAT,
+            "version": SNAPSHOT_VERSION,
+            "digest": self.codec.digest_name,
+            "digest_size": self.codec.digest_size,
+            "max_resolution": self.max_resolution,
+            "events": self.events,
+            "depth_counts": sorted(self._depth_counts.items()),
+        }
+        shapes = sorted(
+            ((shape.exemplar.fingerprint(-1), shape) for shape in self.shapes()),
+            key=lambda item: item[0],
+        )
+
+        if isinstance(output, str):
+            sink = serialize.open_output(output)
+        else:
+            sink = contextlib.nullcontext(output)
+        with sink as wf:
+            wf.write("{}\n".format(json.dumps(header)))
+            for key, shape in shapes:
+                exemplar = shape.exemplar
+                record = {
+                    "fingerprint": key.hex(),
+                    "count": shape.count,
+                    "depth": exemplar.depth,
+                    "fingerprints": _packed_fingerprints(exemplar).hex(),
+                    "exemplar": exemplar.data(-1),
+                }
+                wf.write("{}\n".format(json.dumps(record)))
+
+        logger.info(f"Wrote a snapshot of {len(shapes)} shapes to {output}.")
+        return len(shapes)
+
+    @classmethod
+    def from_snapshot(cls, source, codec=None, index_paths=False):
+        """ Reads a garage from a snapshot written by write_snapshot.
+
+        The exemplars are restored as CompactMinions from the
+        fingerprints in the snapshot, so no log is rebuilt or
+        fingerprinted again.
+
+        Args:
+            source (str): The snapshot file. It may be compressed.
+            codec (Codec, None): The codec of the garage. Its digest
+                must be the one the snapshot was written with.
+                Defaults to codec.DEFAULT_CODEC, or a codec with the
+                snapshot's digest if that differs.
+            index_paths (bool): See MinionGarage.
+
+        Returns:
+            MinionGarage: A compact, aggregating garage.
+
+        Raises:
+            ValueError: If the file is not a snapshot this version can
+                read, its digest does not match the codec, or a
+                structure's fingerprints do not match.
+        """
+
+        lines = serialize.read_lines(source)
+        try:
+            header = json.loads(next(lines))
+        except (StopIteration, ValueError):
+            raise ValueError(f"{source} is not a garage snapshot.")
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"{source} is not a garage snapshot.")
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(
+                f"{source} is a version {header.get('version')} snapshot, but "
+                f"only version {SNAPSHOT_VERSION} can be read."
+            )
+
+        digest = (header["digest"], header["digest_size"])
+        if codec is None:
+            codec = codec_.DEFAULT_CODEC
+            if (codec.digest_name, codec.digest_size) != digest:
+                digest_size = None if digest[0] == "md5" else digest[1]
+                codec = codec_.Codec(digest=digest[0], digest_size=digest_size)
+        elif (codec.digest_name, codec.digest_size) != digest:
+            raise ValueError(
+                f"{source} was written with {digest[0]} digests of "
+                f"{digest[1]} bytes, which do not match {codec!r}."
+            )
+
+        garage = cls(
+            compact=True,
+            aggregate=True,
+            codec=codec,
+            max_resolution=header["max_resolution"],
+            index_paths=index_paths,
+        )
+        garage.events = header["events"]
+        garage._depth_counts = collections.Counter(dict(header["depth_counts"]))
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            exemplar = minion.CompactMinion.restore(
+                record["exemplar"],
+                bytes.fromhex(record["fingerprints"]),
+                record["depth"],
+                garage.packer,
+            )
+            key = exemplar.fingerprint(-1)
+            if key.hex() != record["fingerprint"]:
+                raise ValueError(f"{source} has a shape with mismatched fingerprints.")
+            garage._add_shape(key, exemplar, record["count"])
+        return garage
+
+    def _add_shape(self, key, exemplar, count):
+        """ Adds a Shape without line offsets to an aggregating garage.
+        The caller accounts for its logs in events and depth counts. """
+
+        shape = Shape(exemplar, None)
+        shape.count = count
+        self._shapes[key] = shape
+        self._depth_index[exemplar.depth].append(len(self._list))
+        self._list.append(exemplar)
+        if self.path_index is not None:
+            self.path_index.add(exemplar, count)
+
+    def shapes(self):
+        """ Returns the distinct structures held by the garage.
+
+        When not aggregating, these are worked out from every minion
+        held, and the first minion of each structure is the exemplar.
+
+        Returns:
+            list: Shape objects in order of first appearance.
+        """
+
+        if self.aggregate:
+            return list(self._shapes.values())
+
+        shapes = {}
+        for line, minion_ in enumerate(self._list):
+            key = minion_.fingerprint(-1)
+            shape = shapes.get(key)
+            if shape is None:
+                shapes[key] = Shape(minion_, line)
+                continue
+            shape.count += 1
+            shape.last_line = line
+        return list(shapes.values())
+
+    def filtered(self, tier=1):
+        """ Yields the minions with a depth >= tier in log line order.
+
+        Only the depth buckets that satisfy the tier are visited, so
+        shallow minions are never touched when filtering for a deep
+        tier.
+
+        Args:
+            tier (int): The minimum depth of the minions to yield.
+
+        Yields:
+            Minion: Each minion with a depth >= tier.
+        """
+
+        buckets = [
+            positions for depth, positions in self._depth_index.items() if depth >= tier
+        ]
+        if len(buckets) == len(self._depth_index):
+            yield from self._list
+            return
+        for position in heapq.merge(*buckets):
+            yield self._list[position]
 
     def hashes(self, resolution=1):
         """ Returns a set of unique hashes that represent unique log
@@ -68,11 +580,11 @@ class MinionGarage:
                 the specified resolution and greater.
 
         Returns:
-            set: Set of MD5 hexdigest strings for each unique log model
+            set: The hex of the fingerprint of each unique log model,
+                made with the garage codec's digest (md5 or blake2b).
         """
 
-        filtered_list = [minion for minion in self._list if minion.depth >= resolution]
-        return {minion.hash(resolution) for minion in filtered_list}
+        return {minion.hash(resolution) for minion in self.filtered(resolution)}
 
     def count(self, tier=1):
         """ Count the number of minions in a tier
@@ -86,8 +598,7 @@ class MinionGarage:
                 requirement.
         """
 
-        filtered_list = [minion for minion in self._list if minion.depth >= tier]
-        return len(filtered_list)
+        return sum(count for depth, count in self._depth_counts.items() if depth >= tier)
 
     @property
     def depth(self):
@@ -101,23 +612,78 @@ class MinionGarage:
             int: The deepest tier of all the minions.
         """
 
-        deepest = 0
-        for minion_ in self._list:
-            minion_depth = minion_.depth
-            if not (minion_depth > deepest):
-                continue
-            deepest = minion_depth
-        return deepest
+        return max(self._depth_index, default=0)
 
     def uniques(self, tier=1):
-        filtered_list = [minion for minion in self._list if minion.depth >= tier]
-        return {minion.hash(tier): minion for minion in filtered_list}
+        """ Returns the first minion seen for each unique hash.
+
+        Args:
+            tier (int): The resolution to hash at. Only minions with a
+                depth >= this argument are considered.
+
+        Returns:
+            dict: Maps each unique hash to its first minion, in order
+                of first appearance.
+        """
+
+        return dict(self.iter_uniques(tier))
+
+    def iter_uniques(self, tier=1):
+        """ Yields the first minion seen for each unique hash as soon
+        as it is found.
+
+        Only the fingerprints seen so far are kept, so this can be
+        consumed without holding every unique minion at once.
+
+        Args:
+            tier (int): See uniques.
+
+        Yields:
+            tuple: Each unique hash and its first minion, in order of
+                first appearance.
+        """
+
+        seen = set()
+        for minion_ in self.filtered(tier):
+            fingerprint = minion_.fingerprint(tier)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                yield fingerprint.hex(), minion_
+
+    def tier_uniques(self, resolution=1):
+        """ Yields each minion that is the first of its model at any
+        tier from 1 through the resolution.
+
+        Every tier is checked in a single pass over the minions using
+        the fingerprints each minion already holds, so this costs
+        about as much as uniques() at a single tier.
+
+        Args:
+            resolution (int): The deepest tier to check.
+
+        Yields:
+            Minion: Each tier-unique minion once, in log line order.
+        """
+
+        seen = [set() for _ in range(resolution + 1)]
+        for minion_ in self.filtered(1):
+            unique = False
+            for tier in range(1, min(minion_.depth, resolution) + 1):
+                fingerprint = minion_.fingerprint(tier)
+                if fingerprint not in seen[tier]:
+                    seen[tier].add(fingerprint)
+                    unique = True
+            if unique:
+                yield minion_
 
     def __getattr__(self, item):
+        if item == "_list":
+            # Not yet set, such as while unpickling.
+            raise AttributeError(item)
         return getattr(self._list, item)
 
     def __len__(self):
-        return len(self._list)
+        return self.events
 
     def __str__(self):
         return str(self._list)
@@ -128,32 +694,120 @@ class Master:
     minions / minion garage.
 
     Attributes:
-        input (str): Input file name or a string containing logs in
-            json-serializable format.
+        input (str, list): Input files (see Master.__init__) or a
+            string containing logs in json-serializable format.
         input_type (str): Indicates what type of input is being used.
         minions (MinionGarage): The MinionGarage that will be where
             we store Minions which represent the input logs.
+        embedded_json (EmbeddedJSON): When to decode JSON embedded in
+            string values of the logs.
+        codec (Codec): Parser and digest used for the logs.
+        catalog (Catalog, None): Persistent catalog of the structures
+            seen across runs, if one was opened.
+        max_resolution (int, None): The highest resolution the logs
+            can be inspected at, or None for every resolution.
+        render_cache (RenderCache): Unique models and data already
+            rendered, and their JSON, for repeated queries. Emptied
+            whenever logs are added.
+        _stats (Stats): Timers and counters for everything this
+            Master has done. See Master.stats().
     """
 
-    def __init__(self, input_file=None, input_string=None):
+    def __init__(
+        self,
+        input_file=None,
+        input_string=None,
+        compact=False,
+        aggregate=False,
+        embedded_json=None,
+        codec=None,
+        catalog=None,
+        max_resolution=None,
+        stats_interval=None,
+        index_paths=False,
+        render_cache_bytes=render.DEFAULT_MAX_BYTES,
+    ):
         """ Init the Master class
 
         Args:
-            input_file (str, None): The filename containing logs to
-                parse and convert to Minions.
+            input_file (str, list, None): The file containing logs to
+                parse and convert to Minions. This may also be a
+                directory, which is searched recursively for .json
+                and .jsonl files, a glob pattern such as
+                'archive/2019-01-*/*.json.gz', or a list of any of
+                these. Files ending in .gz, .bz2 or .xz are
+                decompressed as they are read. The catalog is never
+                read as input.
             input_string (str, None): A json-serializable string.
+            compact (bool): Store each log as a CompactMinion, which
+                uses far less memory per log at the cost of rebuilding
+                the log whenever its data or model is displayed.
+            aggregate (bool): Keep one exemplar log and a count per
+                distinct log structure instead of every log, so that
+                memory scales with the number of structures.
+            embedded_json (EmbeddedJSON, None): When to decode JSON
+                embedded in string values. Defaults to
+                serialize.DEFAULT_POLICY.
+            codec (Codec, None): Parser and digest used for the logs.
+                Defaults to codec.DEFAULT_CODEC, which uses orjson if
+                it is installed and MD5 digests.
+            catalog (str, None): SQLite file of a Catalog to open or
+                create. Each make() then records its logs in the
+                catalog, files already in the catalog are skipped, and
+                the structures new to the catalog can be reported.
+            max_resolution (int, None): The highest resolution the
+                logs will be inspected at. Only the tiers needed for
+                that resolution are modeled, so construction time and
+                memory follow the inspected depth rather than the full
+                depth of the logs. Data and models past it are still
+                available for display, as deeper values are modeled
+                on first use, but unique logs can only be found up to
+                it. Cannot be used with a catalog, which needs full
+                structures.
+            stats_interval (float, None): Seconds between logging the
+                stats of a running make(). None to not log them.
+            index_paths (bool): Keep an index of which log structures
+                contain each key path, such as
+                'ExtendedProperties[].Name', and how many logs contain
+                it. See Master.path_index.
+            render_cache_bytes (int): The most bytes of unique models,
+                data and JSON outputs kept by render_cache, so that
+                printing or writing them again is a lookup. 0 to not
+                cache them.
+
+        Raises:
+            ValueError: If both a catalog and a max_resolution are
+                given.
         """
 
+        if catalog and max_resolution is not None:
+            raise ValueError("A catalog cannot be used with a max_resolution.")
+
         self.input = input_file or input_string
         self.input_type = _input_type(input_file, input_string)
-        self.minions = MinionGarage()
+        self.codec = codec or codec_.DEFAULT_CODEC
+        self.max_resolution = max_resolution
+        self.minions = MinionGarage(
+            compact=compact,
+            aggregate=aggregate,
+            codec=self.codec,
+            max_resolution=max_resolution,
+            index_paths=index_paths,
+        )
+        self.embedded_json = embedded_json or serialize.DEFAULT_POLICY
+        self.catalog = None
+        if catalog:
+            self.catalog = catalog_.Catalog(catalog, self.codec)
         self.focus = []
+        self._stats = stats_.Stats(interval=stats_interval)
+        self.render_cache = render.RenderCache(max_bytes=render_cache_bytes)
+        self._feeder = None
         logger.info(
             f"Configured for input type {self.input_type}. "
             f"Don't forget to run Master.make() to generate the log models!"
         )
 
-    def make(self, input_file=None, input_string=None):
+    def make(self, input_file=None, input_string=None, workers=1):
         """ Generates minions based on the input type.
 
         This method allows the user to manually change the input file
@@ -164,49 +818,283 @@ class Master:
         assigned to the 'input' attribute.
 
         Args:
-            input_file (str): The name of the file to read from.
+            input_file (str, list): The files to read from. See
+                Master.__init__.
             input_string (str): JSON-serializable string to be parsed.
+            workers (int): Number of processes used to read the files.
+                Files are split into ranges of lines which are
+                modeled in parallel and then merged in line order, so
+                the result is identical to reading with one process.
+                Compressed files cannot be split, so each is a single
+                range. Workers send back compact logs, which are kept
+                as CompactMinions even if compact is False, and trees
+                are only rebuilt for the logs that are displayed. With
+                aggregate=True, only the distinct structures are sent
+                back.
         """
 
         if input_file or input_string:
             self.input = input_file or input_string
             self.input_type = _input_type(input_file, input_string)
+
+        with self._stats.track(self.codec, self.embedded_json):
+            if self.catalog is None:
+                self._make(self.minions, workers)
+            else:
+                self._make_cataloged(workers)
+
+    def _make_cataloged(self, workers):
+        """ Helper method to generate minions from the input files that
+            are not yet in the catalog, then add them to the catalog.
+        """
+
+        paths = None
         if self.input_type == "file":
-            self._make_file()
+            paths = []
+            for path in self._input_paths():
+                if self.catalog.has_file(path):
+                    logger.info(
+                        f"Skipping {path}, which is already in catalog "
+                        f"{self.catalog.path}."
+                    )
+                    continue
+                paths.append(path)
+            if not paths:
+                return
+        # Only this run's logs are added to the catalog.
+        garage = MinionGarage(
+            compact=self.minions.compact,
+            aggregate=self.minions.aggregate,
+            codec=self.codec,
+        )
+        source = ", ".join(paths) if paths else self.input_type
+        self.catalog.start_run(source)
+        self._make(garage, workers, paths)
+        with self._stats.timer("catalog"):
+            self.catalog.update(garage)
+        for path in paths or ():
+            self.catalog.record_file(path)
+        self.minions.absorb(garage)
+
+    def _make(self, garage, workers, paths=None):
+        """ Helper method to generate minions into a garage based on
+            the input type.
+
+        Args:
+            garage (MinionGarage): The garage to add the minions to.
+            workers (int): See Master.make.
+            paths (list, None): The files to read, if they have
+                already been expanded from the input.
+        """
+
+        if self.input_type == "file":
+            if paths is None:
+                paths = self._input_paths()
+            if workers > 1:
+                self._make_file_parallel(garage, workers, paths)
+            else:
+                self._make_file(garage, paths)
         if self.input_type == "string":
-            self._make_string()
+            self._make_string(garage)
 
-    def _make_file(self):
-        """ Helper method to generate minions from a file and then
+    def _make_file(self, garage, paths):
+        """ Helper method to generate minions from files and then
             append them to the minions list.
         """
 
-        json_items = serialize.json_transform_from_file(self.input)
-        [self.minions.append(json_) for json_ in json_items]
+        json_items = serialize.json_transform_from_files(
+            paths, policy=self.embedded_json, codec=self.codec, stats=self._stats
+        )
+        events = _fill(garage, json_items, self._stats)
 
-        logger.info(f"Made models/minions from {len(json_items)} source logs events.")
+        logger.info(
+            f"Made models/minions from {events} source logs events "
+            f"in {len(paths)} files."
+        )
+
+    def _make_file_parallel(self, garage, workers, paths):
+        """ Helper method to generate minions from files using a pool
+            of processes, then merge them into the minions list.
 
-    def _make_string(self):
+        The files are split into more ranges than workers, in
+        proportion to their sizes, so that a slow range does not hold
+        up the rest of the pool.
+
+        Args:
+            garage (MinionGarage): The garage to merge into.
+            workers (int): The number of processes to use.
+            paths (list): The files to read.
+        """
+
+        sizes = [os.path.getsize(path) for path in paths]
+        total = sum(sizes) or 1
+        shards = [
+            (path, start, end)
+            for path, size in zip(paths, sizes)
+            for start, end in serialize.file_shards(
+                path, max(1, workers * 4 * size // total)
+            )
+        ]
+        aggregate = garage.aggregate
+        events = 0
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _make_shard,
+                    path,
+                    start,
+                    end,
+                    aggregate,
+                    self.embedded_json,
+                    self.codec,
+                    garage.max_resolution,
+                )
+                for path, start, end in shards
+            ]
+            # Absorb in submission order, which is line order.
+            for future in futures:
+                shard, shard_stats = future.result()
+                garage.absorb(shard)
+                self._stats.merge(shard_stats)
+                self._stats.tick()
+                events += shard.events
+
+        logger.info(
+            f"Made models/minions from {events} source logs events "
+            f"in {len(paths)} files using {workers} workers."
+        )
+
+    def _make_string(self, garage):
         """ Helper method to generate minions from a JSON-serializable
             string.
         """
 
-        json_items = serialize.json_transform(self.input)
-        [self.minions.append(json_) for json_ in json_items]
+        with self._stats.timer("transform"):
+            json_items = serialize.json_transform(
+                self.input, policy=self.embedded_json, codec=self.codec
+            )
+        _fill(garage, json_items, self._stats)
 
         logger.info(f"Made models/minions from {len(json_items)} source logs events.")
 
+    def feeder(
+        self,
+        queue_size=1024,
+        batch_size=256,
+        executor=None,
+        resolution=1,
+        on_new=None,
+    ):
+        """ Creates the Feeder used by feed() and feed_nowait().
+
+        Call this before feeding to change the defaults, such as to be
+        told about new structures as they arrive. Must not be called
+        while logs are still queued on a previous Feeder.
+
+        Args:
+            queue_size (int): See aio.Feeder.
+            batch_size (int): See aio.Feeder.
+            executor (Executor, None): See aio.Feeder.
+            resolution (int): See aio.Feeder.
+            on_new (callable, None): See aio.Feeder.
+
+        Returns:
+            Feeder: The new Feeder.
+        """
+
+        self._feeder = aio.Feeder(
+            self,
+            queue_size=queue_size,
+            batch_size=batch_size,
+            executor=executor,
+            resolution=resolution,
+            on_new=on_new,
+        )
+        return self._feeder
+
+    async def feed(self, records):
+        """ Generates minions from an iterable or async iterable of
+        logs without blocking the event loop, and waits until every
+        log has been modeled.
+
+        Logs are modeled in an executor as described in aio.Feeder,
+        and waiting for room in its queue applies backpressure to the
+        iterable. They are not recorded in a catalog.
+
+        Args:
+            records (iterable, async iterable): Raw log lines, as str
+                or bytes, or logs that have already been parsed.
+        """
+
+        if self._feeder is None:
+            self.feeder()
+        await self._feeder.feed(records)
+
+    def feed_nowait(self, record):
+        """ Queues a log to be modeled without waiting. See feed().
+
+        Must be called from a running event loop. Await drain() to
+        wait for the queued logs to be modeled.
+
+        Args:
+            record (str, bytes, dict, list): A log.
+
+        Raises:
+            asyncio.QueueFull: If the queue is full.
+        """
+
+        if self._feeder is None:
+            self.feeder()
+        self._feeder.feed_nowait(record)
+
+    async def drain(self):
+        """ Waits until every log queued by feed_nowait() has been
+        modeled. """
+
+        if self._feeder is not None:
+            await self._feeder.join()
+
     def count(self, tier=1):
-        """ Get the count of minions contained in the MinionGarage """
+        """ Get the count of minions contained in the MinionGarage
 
+        Raises:
+            ValueError: If the tier is past the max_resolution, as
+                with unique_count.
+        """
+
+        self._check_resolution(tier)
         return self.minions.count(tier=tier)
 
+    @property
+    def path_index(self):
+        """ The PathIndex of the key paths in the logs, for finding
+        which log structures contain a field and how often.
+
+        Example:
+            >>> m = master.Master(input_file="o365.json", index_paths=True)
+            >>> m.make()
+            >>> m.path_index.count("ExtendedProperties[].Name")
+            21133
+
+        Raises:
+            ValueError: If the Master was not created with
+                index_paths=True.
+        """
+
+        if self.minions.path_index is None:
+            raise ValueError("Key paths are only indexed with index_paths=True.")
+        return self.minions.path_index
+
     @property
     def depth(self):
         pass
 
     @depth.getter
     def depth(self):
+        """ The deepest tier of the logs. With a max_resolution, depths
+        are only known up to max_resolution + 1, so this is at most
+        that. """
+
         return self.minions.depth
 
     def unique_count(self, resolution=1):
@@ -220,31 +1108,34 @@ class Master:
         Returns:
             int: The number of unique hashes (representing unique log
                 models) for the specified resolution/tier.
+
+        Note:
+            This needs every log to be held by the Master. For inputs
+            too large for that, stream.DistinctCounter estimates the
+            count in a few kilobytes.
         """
 
-        return len(self.minions.hashes(resolution=resolution))
+        self._check_resolution(resolution)
+        with self._stats.timer("uniques"):
+            return len(self.minions.hashes(resolution=resolution))
 
     def print_unique_models(self, resolution=0, indent=None):
         """Prints the hash and model of unique logs for the specified
         resolution
         """
 
-        uniques = self._gather_uniques(resolution)
-        unique_models = {
-            hash_: minion.model(resolution) for hash_, minion in uniques.items()
-        }
-        logger.info(f"Model data:\n {json.dumps(unique_models, indent=indent)}")
+        unique_models = self._unique_json(resolution, "model", indent)
+        with self._stats.timer("log"):
+            logger.info(f"Model data:\n {unique_models}")
 
     def print_unique_data(self, resolution=0, indent=None):
         """Prints the hash and data of unique logs for the specified
         resolution.
         """
 
-        uniques = self._gather_uniques(resolution)
-        unique_data = {
-            hash_: minion.data(resolution) for hash_, minion in uniques.items()
-        }
-        logger.info(json.dumps(unique_data, indent=indent))
+        unique_data = self._unique_json(resolution, "data", indent)
+        with self._stats.timer("log"):
+            logger.info(unique_data)
 
     def write_unique_models(self, output_file, resolution=0, indent=None):
         """Writes the hash and model of unique logs for the specified
@@ -252,12 +1143,9 @@ class Master:
         """
 
         with open(output_file, "w+") as wf:
-            uniques = self._gather_uniques(resolution)
-            unique_models = {
-                hash_: minion.model(resolution) for hash_, minion in uniques.items()
-            }
-            wf.write(json.dumps(unique_models, indent=indent))
-            logger.info(f"Wrote {len(uniques)} unique log models to {output_file}.")
+            wf.write(self._unique_json(resolution, "model", indent))
+            count = len(self._gather_uniques(resolution))
+            logger.info(f"Wrote {count} unique log models to {output_file}.")
 
     def write_unique_data(self, output_file, resolution=0, indent=None):
         """Writes the hash and data of unique logs for the specified
@@ -265,46 +1153,329 @@ class Master:
         """
 
         with open(output_file, "w+") as wf:
-            uniques = self._gather_uniques(resolution)
-            unique_data = {
-                hash_: minion.data(resolution) for hash_, minion in uniques.items()
-            }
-            wf.write(json.dumps(unique_data, indent=indent))
-            logger.info(f"Wrote {len(uniques)} unique log data to {output_file}.")
+            wf.write(self._unique_json(resolution, "data", indent))
+            count = len(self._gather_uniques(resolution))
+            logger.info(f"Wrote {count} unique log data to {output_file}.")
 
     def write_unique_data_recursive(self, output_file, resolution=0, indent=None):
         """Writes unique logs to file from the resolution specified.
 
-        This will start with the specified resolution, log
-        the uniques, and then do one for resolution -= 1. This should
-        write only logs that were found to be unique in at least one
-        tier. This also prevents duplicating logs that are unique on
-        multiple tiers.
+        This writes every log that was found to be unique in at least
+        one tier from 1 through the resolution, in log line order.
+        Logs that are unique on multiple tiers are only written once.
+        All of the tiers are checked in a single pass, and each log is
+        written as soon as it is found.
         """
 
         if resolution < 0:
             raise ValueError(
                 "Resolution for this function must be greater than or equal to 0."
             )
+        self._check_resolution(resolution)
+
+        written = 0
+        with open(output_file, "w+") as wf, self._stats.timer("uniques"):
+            for minion_ in self.minions.tier_uniques(resolution):
+                json_string = json.dumps(minion_.data(resolution), indent=indent)
+                wf.write("{}\n".format(json_string))
+                written += 1
+
+        logger.info(f"Wrote {written} unique log data to {output_file}.")
+
+    def stream_unique_models(self, output, resolution=0, sort=False):
+        """Writes the hash and model of unique logs for the specified
+        resolution, one JSON object per line, as they are found.
+
+        Unlike write_unique_models, each record is written as soon as
+        it is made, so output memory stays constant however many
+        unique logs there are:
+
+            {"hash": "...", "model": {...}}
+
+        Args:
+            output (str, file object): The file to write to, which is
+                compressed if it ends in .gz, .bz2 or .xz, or an open
+                text file object such as sys.stdout.
+            resolution (int): The resolution to find unique logs at.
+            sort (bool): Write the records in hash order with sorted
+                keys, so output from different runs can be diffed. The
+                unique logs are all found before any are written.
 
-        master_uniques = dict()
+        Returns:
+            int: The number of records written.
+        """
+
+        return self._stream_uniques(output, resolution, sort, "model")
+
+    def stream_unique_data(self, output, resolution=0, sort=False):
+        """Writes the hash and data of unique logs for the specified
+        resolution, one JSON object per line, as they are found.
+
+        See stream_unique_models. Each record is:
+
+            {"hash": "...", "data": {...}}
+
+        Returns:
+            int: The number of records written.
+        """
+
+        return self._stream_uniques(output, resolution, sort, "data")
+
+    def _stream_uniques(self, output, resolution, sort, field):
+        self._check_resolution(resolution)
+        uniques = self.minions.iter_uniques(resolution)
+        if sort:
+            with self._stats.timer("uniques"):
+                uniques = sorted(uniques, key=lambda unique: unique[0])
+
+        if isinstance(output, str):
+            sink = serialize.open_output(output)
+        else:
+            sink = contextlib.nullcontext(output)
+
+        written = 0
+        with sink as wf:
+            for hash_, minion_ in uniques:
+                if field == "model":
+                    value = minion_.model(resolution)
+                else:
+                    value = minion_.data(resolution)
+                record = {"hash": hash_, field: value}
+                wf.write("{}\n".format(json.dumps(record, sort_keys=sort)))
+                written += 1
+
+        logger.info(f"Wrote {written} unique log {field} records to {output}.")
+        return written
+
+    def new_models(self, resolution=0):
+        """ Returns the models that were new to the catalog in the
+        latest run.
+
+        Args:
+            resolution (int): The resolution of the models.
+
+        Returns:
+            dict: Maps the hash of each new model to the model.
+
+        Raises:
+            ValueError: If no catalog was opened.
+        """
 
+        if self.catalog is None:
+            raise ValueError("New models can only be found with a catalog.")
+        if self.catalog.run is None:
+            return {}
+        return self.catalog.models(resolution, run=self.catalog.run)
+
+    def print_new_models(self, resolution=0, indent=None):
+        """Prints the hash and model of logs whose model at the
+        specified resolution was new to the catalog in the latest run.
+        """
+
+        new_models = self.new_models(resolution)
+        with self._stats.timer("log"):
+            logger.info(
+                f"{len(new_models)} new models:\n "
+                f"{json.dumps(new_models, indent=indent)}"
+            )
+
+    def flattener(self, separator="."):
+        """ Returns a Flattener with flatteners already compiled for
+        every log structure the Master has found.
+
+        Args:
+            separator (str): See flatten.flatten.
+
+        Returns:
+            Flattener: The prepared Flattener.
+        """
+
+        flattener = flatten.Flattener(separator=separator)
+        with self._stats.timer("flatten"):
+            flattener.prepare(self.minions)
+        return flattener
+
+    def write_flattened(self, output_file, separator="."):
+        """ Flattens every input log and writes it to file, one JSON
+        object per line.
+
+        The input is read again rather than rebuilt from the minions,
+        so this also works for compact and aggregated Masters. Running
+        make() first is not needed, but means the flatteners for the
+        structures it found are compiled up front.
+
+        Args:
+            output_file (str): The file to write the flattened logs to.
+            separator (str): See flatten.flatten.
+
+        Returns:
+            Flattener: The Flattener used, with its hit and miss counts.
+        """
+
+        flattener = self.flattener(separator=separator)
+        if self.input_type == "file":
+            json_items = serialize.json_transform_from_files(
+                self._input_paths(),
+                policy=self.embedded_json,
+                codec=self.codec,
+                stats=self._stats,
+            )
+        elif self.input_type == "string":
+            json_items = serialize.json_transform(
+                self.input, policy=self.embedded_json, codec=self.codec
+            )
+        else:
+            json_items = []
+
+        written = 0
         with open(output_file, "w+") as wf:
+            for json_item in json_items:
+                started = time.perf_counter()
+                flattened = flattener.flatten(json_item)
+                self._stats.add("flatten", time.perf_counter() - started)
+                wf.write("{}\n".format(json.dumps(flattened)))
+                written += 1
 
-            for i in range(resolution, 0, -1):
-                uniques = self._gather_uniques(i)
-                fresh_uniques = {
-                    hash_: model
-                    for hash_, model in uniques.items()
-                    if hash_ not in master_uniques.keys()
-                }
-                master_uniques = {**master_uniques, **fresh_uniques}
+        logger.info(
+            f"Wrote {written} flattened logs to {output_file} using "
+            f"{len(flattener.flatteners)} compiled flatteners."
+        )
+        return flattener
 
-            logger.info(f"Printing {len(master_uniques.values())} unique log data.")
+    def write_snapshot(self, output):
+        """ Writes the structures found so far to a snapshot, which
+        merge_snapshots can combine with snapshots from other hosts.
+        See MinionGarage.write_snapshot.
 
-            for minion_ in master_uniques.values():
-                json_string = json.dumps(minion_.data(resolution), indent=indent)
-                wf.write("{}\n".format(json_string))
+        Args:
+            output (str, file object): The file to write to.
+        """
+
+        return self.minions.write_snapshot(output)
+
+    def merge_snapshots(self, sources):
+        """ Merges garage snapshots, such as those written by Masters
+        on other hosts, into this Master.
+
+        The merge takes time in proportion to the number of distinct
+        structures, and gives the same result in any order. Afterwards
+        the Master aggregates, as described in MinionGarage.merge.
+
+        Example:
+            >>> m = master.Master(codec=codec.Codec(digest="blake2b"))
+            >>> m.merge_snapshots(glob.glob("snapshots/*.jsonl.gz"))
+            >>> m.unique_count(resolution=2)
+
+        Args:
+            sources (list): The snapshot files.
+        """
+
+        garage = self.minions
+        for source in sources:
+            snapshot = MinionGarage.from_snapshot(source, codec=self.codec)
+            garage = garage.merge(snapshot)
+        self.minions = garage
+        logger.info(
+            f"Merged {len(sources)} snapshots into {len(garage.shapes())} shapes "
+            f"from {garage.events} logs."
+        )
+
+    def stats(self):
+        """ Returns the stats for everything this Master has done so
+        far.
+
+        See stats.Stats for the stages that are timed and the counters
+        that are kept.
+
+        Returns:
+            dict: Maps each counter to its count, and each stage, with
+                '_seconds' appended, to the seconds spent in it.
+        """
+
+        return self._stats.as_dict()
+
+    def profile(self, output_file, profiler="cprofile"):
+        """ Profiles the body of a with statement, such as a make() or
+        uniqueness queries, and writes the profile to a file.
+
+        Example:
+            >>> with m.profile("make.prof"):
+            ...     m.make()
+
+        Args:
+            output_file (str): See stats.profiled.
+            profiler (str): 'cprofile' or 'tracemalloc'. See
+                stats.profiled.
+        """
+
+        return stats_.profiled(output_file, profiler=profiler)
 
     def _gather_uniques(self, resolution=0):
-        return self.minions.uniques(resolution)
+        self._check_resolution(resolution)
+        cache = self._render_cache()
+        with self._stats.timer("uniques"):
+            return cache.get(
+                ("uniques", resolution), lambda: self.minions.uniques(resolution)
+            )
+
+    def _unique_values(self, resolution, field):
+        """ Maps the hash of each unique log to its model or data,
+        each through the render cache.
+
+        A model is cached by its hash alone, as every log with that
+        hash has the same model. Data is that of the garage's first
+        log with the hash, which only changes when logs are added.
+        The mapping itself is not cached, as it would hold the same
+        values again.
+        """
+
+        uniques = self._gather_uniques(resolution)
+        cache = self.render_cache
+        values = {}
+        for hash_, minion_ in uniques.items():
+            render_ = getattr(minion_, field)
+            values[hash_] = cache.get(
+                (field, hash_, resolution), lambda: render_(resolution)
+            )
+        return values
+
+    def _unique_json(self, resolution, field, indent):
+        """ Returns the unique models or data as JSON, through the
+        render cache. """
+
+        cache = self._render_cache()
+        return cache.get(
+            ("json", field, resolution, indent),
+            lambda: json.dumps(self._unique_values(resolution, field), indent=indent),
+        )
+
+    def _render_cache(self):
+        """ Returns the render cache, emptied first if logs have been
+        added or the garage replaced since anything was cached. """
+
+        # A weak reference stops the cache keeping a replaced garage
+        # alive. A reference to a garage that is gone never equals one
+        # to a live garage, even at the same address.
+        garage = self.minions
+        self.render_cache.validate((weakref.ref(garage), garage.events))
+        return self.render_cache
+
+    def _input_paths(self):
+        """ Returns the input files, without the catalog and the files
+        SQLite keeps beside it. See serialize.expand_paths. """
+
+        exclude = ()
+        if self.catalog is not None:
+            path = self.catalog.path
+            exclude = (path, path + "-journal", path + "-wal", path + "-shm")
+        return serialize.expand_paths(self.input, exclude=exclude)
+
+    def _check_resolution(self, resolution):
+        """ Raises a ValueError if logs cannot be compared at the
+        resolution because it is past the max_resolution. """
+
+        if self.max_resolution is not None and resolution > self.max_resolution:
+            raise ValueError(
+                f"Logs were only modeled up to resolution {self.max_resolution}, "
+                f"not {resolution}."
+            )
@@ -1,57 +1,113 @@
-import collections
 import hashlib
+import itertools
 import json
+import math
+import zlib
 
+from json_inspect import traverse
+from json_inspect.codec import DEFAULT_CODEC
 
-def minion_generator(data, tier=0):
+
+# The number of Minions built by minion_generator in this process, which
+# stats.Stats reports.
+nodes_built = 0
+
+
+def minion_generator(data, tier=0, codec=None, max_resolution=None):
     """Generates a minion of the proper subclass based on data type.
+
+    Args:
+        data: The data to be converted to a minion.
+        tier: Optional tier of the minion.
+        codec: Optional Codec used to fingerprint the minion. Defaults
+            to codec.DEFAULT_CODEC.
+        max_resolution: Optional highest resolution the minion will be
+            inspected at. Dicts and lists below that resolution become
+            LazyMinions rather than trees of child minions.
     
     Returns:
         Minion subclass based on the data type.
     """
 
-    if isinstance(data, dict):
-        return DictMinion(data, tier=tier)
-    if isinstance(data, list):
-        return ListMinion(data, tier=tier)
-    return EdgeMinion(data, tier=tier)
-
-
-def build_model(data, tier=0):
-    """Builds data model based on data type.
+    if codec is None:
+        codec = DEFAULT_CODEC
+    edge_fingerprints = codec.label_fingerprints("edge")
+
+    def expand(data, tier):
+        global nodes_built
+        nodes_built += 1
+        if isinstance(data, dict):
+            if max_resolution is not None and tier > max_resolution:
+                return LazyMinion(data, tier=tier, codec=codec), None
+            key_set = intern_keys(data)
+            return (DictMinion, key_set, tier), [data[key] for key in key_set.keys]
+        if isinstance(data, list):
+            if max_resolution is not None and tier > max_resolution:
+                return LazyMinion(data, tier=tier, codec=codec), None
+            return (ListMinion, None, tier), data
+        # Most Minions are edges, so this is EdgeMinion(data, tier,
+        # codec) without the chain of constructor calls.
+        edge = EdgeMinion.__new__(EdgeMinion)
+        edge._data = data
+        edge.edge = True
+        edge.tier = tier
+        edge.label = "edge"
+        edge._depth = tier
+        edge._fingerprints = edge_fingerprints
+        return edge, None
+
+    def finish(data, state, children):
+        cls, key_set, tier = state
+        if key_set is not None:
+            children = tuple(children)
+        return cls._assemble(children, tier, codec, key_set)
+
+    # The children of each dict and list are built before it is, so
+    # its depth and fingerprints can be worked out from theirs.
+    return traverse.fold(data, expand, finish, depth=tier)
+
+
+def build_model(data, tier=0, codec=None, max_resolution=None):
+    """Builds the model of a ListMinion, or the Minion for any other
+    value.
+
+    DictMinions build their own model, a tuple of child Minions in the
+    order of the dict's interned KeySet, so dicts are not handled here.
 
     Args:
         data: The data to be built into a model.
         tier: Optional tier value that will be passed down through
             the model/minion creation process.
-    
-    Note:
-        The use of OrderedDict is required for proper hashing of the
-        model. Dict objects do not have a guarantee of order which
-        means the object could hash differently depending on key order.
-        Notice that we use OrderedDict and then add the keys in a
-        sorted order to preserve consistent hashing for comparisons.
+        codec: Optional Codec that will be passed down through the
+            model/minion creation process.
+        max_resolution: Optional max resolution that will be passed
+            down through the model/minion creation process.
 
     Returns:
-        The appropriate minion based on data type.
-
+        list: One Minion per item if the data is a list.
+        Minion: The appropriate minion for any other data type.
     """
 
-    if isinstance(data, dict):
-        sorted_keys = sorted(data.keys())
-        ordered_dict = collections.OrderedDict()  # For consistent hashing
-        for key in sorted_keys:
-            ordered_dict[key] = minion_generator(data[key], tier=tier)
-        return ordered_dict
-
     if isinstance(data, list):
-        return [minion_generator(item, tier=tier) for item in data]
-    return minion_generator(data, tier=tier)
+        return [
+            minion_generator(
+                item, tier=tier, codec=codec, max_resolution=max_resolution
+            )
+            for item in data
+        ]
+    return minion_generator(
+        data, tier=tier, codec=codec, max_resolution=max_resolution
+    )
 
 
 def hasher(data):
     """Hashes a json-valid object so that it can be compared to others.
-    
+
+    Minions no longer use this to hash their models (see
+    Minion.fingerprint), but it is kept as the reference hasher that
+    the structural fingerprints must group identically to, whichever
+    Codec is used.
+
     Args:
         data: A JSON-serializable structure.
     
@@ -64,6 +120,106 @@ def hasher(data):
     return hashlib.md5(bytes_).hexdigest()
 
 
+# Prefixes for composite fingerprints. Neither can begin a JSON
+# document, so a composite digest never collides with the digest of a
+# model that was hashed as a plain value.
+_DICT_PREFIX = b"\x00D"
+_LIST_PREFIX = b"\x00L"
+
+
+def _fingerprint_rows(children, tier, last):
+    """Lines up the fingerprints of sibling Minions by resolution.
+
+    Args:
+        children (list): Child Minions, all one tier below the parent.
+        tier (int): The tier of the parent Minion.
+        last (int): The last resolution to be included.
+
+    Returns:
+        list: One tuple of child fingerprints per resolution from the
+            parent's tier through the last resolution.
+    """
+
+    # A child's fingerprints start with its label, which is its model
+    # at the parent's tier, so they already line up with the rows.
+    width = last - tier + 1
+    columns = []
+    for child in children:
+        fingerprints = child._fingerprints
+        padding = (fingerprints[-1],) * (width - len(fingerprints))
+        columns.append(fingerprints + padding)
+    return list(zip(*columns))
+
+
+# The most key sets interned by intern_keys. Logs with dynamic keys,
+# such as device ids used as keys, can have any number of key sets, and
+# the ones past this are not kept.
+MAX_KEY_SETS = 1 << 16
+
+# Maps the frozenset of a dict's keys to its interned KeySet.
+_key_sets = {}
+_key_set_ids = itertools.count()
+
+
+class KeySet:
+    """The keys of a dict, in the sorted order DictMinions use.
+
+    Logs repeat the same few key sets over and over, so each is
+    interned by intern_keys and shared by every DictMinion with those
+    keys. Sorting the keys and making the strings that stand for them
+    is done once per key set rather than once per dict.
+
+    Attributes:
+        keys (tuple): The keys, sorted for consistent hashing.
+        id (int, None): A number unique to this key set within the
+            process, or None if it was not interned.
+        summary (str): The model of a dict with these keys whose values
+            are all edges.
+        prefix (bytes): The start of the composite fingerprint of a
+            dict with these keys.
+    """
+
+    __slots__ = ("keys", "id", "summary", "prefix")
+
+    def __init__(self, keys, id=None):
+        self.keys = tuple(sorted(keys))
+        self.id = id
+        self.summary = "DICT_KEYS: {}".format(str(list(self.keys)))
+        self.prefix = _DICT_PREFIX + json.dumps(list(self.keys)).encode("utf-8")
+
+    def __reduce__(self):
+        # Intern again when unpickled, such as in the parent of a
+        # parallel make, so key sets stay shared.
+        return (intern_keys, (self.keys,))
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def intern_keys(keys):
+    """Returns the shared KeySet for a dict's keys.
+
+    Args:
+        keys (dict, iterable): A dict, or its keys.
+
+    Returns:
+        KeySet: The interned KeySet, or a new one that is not kept if
+            MAX_KEY_SETS have already been interned.
+    """
+
+    frozen = frozenset(keys)
+    key_set = _key_sets.get(frozen)
+    if key_set is None:
+        if len(_key_sets) >= MAX_KEY_SETS:
+            return KeySet(frozen)
+        key_set = _key_sets.setdefault(frozen, KeySet(frozen, next(_key_set_ids)))
+    return key_set
+
+
+# Slots of the Minions that hold their model as a tree.
+_TREE_SLOTS = ("_data", "_model", "_fingerprints")
+
+
 class Minion:
     """Base class for all minions.
 
@@ -83,15 +239,30 @@ class Minion:
             }
         label (str): The string to be displayed in the model. 'LIST',
             'DICT', or 'edge'.
-        _model (dict, list, str): The actual structure containing
+        _model (tuple, list, str): The actual structure containing
             child minions. For example, if current minion is a LIST
             minion:
                 [EdgeMinion, DictMinion, ListMinion, EdgeMinion]
-            DICT minion:
-                {'first': 'EdgeMinion', 'second': 'ListMinion', etc}
+            DICT minion, in the order of the keys of its KeySet:
+                (EdgeMinion, ListMinion, etc)
+        _fingerprints (tuple): Digests of this Minion's model. The
+            first is for the label, used at resolutions above this
+            Minion's tier, followed by one per resolution starting at
+            this Minion's tier. Resolutions past the end of the tuple
+            share the last digest.
+        _depth (int): The deepest tier of this Minion and its child
+            Minions. Computed once when the Minion is built.
     """
 
-    def __init__(self, data=None, label=None, tier=0):
+    # Minions are created for every value of every log, so they do not
+    # carry a per-instance __dict__. The slots of a tree of child
+    # Minions are declared by the subclasses that build one (see
+    # _TREE_SLOTS), so CompactMinion does not carry them.
+    __slots__ = ("edge", "tier", "label", "_depth")
+
+    def __init__(self, data=None, label=None, tier=0, codec=None, max_resolution=None):
+        if codec is None:
+            codec = DEFAULT_CODEC
         # Holds base value if an Edge minion
         if label == "edge":
             self._data = data
@@ -105,7 +276,43 @@ class Minion:
         # an EdgeMinion
         if not self.edge:
             next_tier = self.tier + 1
-            self._model = build_model(data, tier=next_tier)
+            self._model = build_model(
+                data, tier=next_tier, codec=codec, max_resolution=max_resolution
+            )
+        # Child Minions are fully built at this point, so each of these
+        # only needs to look one tier down.
+        self._depth = self._recursive_depth()
+        self._fingerprints = self._build_fingerprints(codec)
+
+    @classmethod
+    def _assemble(cls, model, tier, codec, key_set=None):
+        """ Creates a DictMinion or ListMinion around child Minions that
+        are already built, without building anything else.
+
+        Args:
+            model (tuple, list): The child Minions.
+            tier (int): The tier of the new Minion.
+            codec (Codec): Provides the digest.
+            key_set (KeySet, None): The keys of a DictMinion, which
+                the child Minions are in the order of.
+
+        Returns:
+            Minion: The new Minion.
+        """
+
+        assembled = cls.__new__(cls)
+        assembled._data = None
+        assembled.edge = False
+        assembled.tier = tier
+        if key_set is None:
+            assembled.label = "LIST"
+        else:
+            assembled.label = "DICT"
+            assembled._keys = key_set
+        assembled._model = model
+        assembled._depth = assembled._recursive_depth()
+        assembled._fingerprints = assembled._build_fingerprints(codec)
+        return assembled
 
     def data(self, resolution=1):
         """ Look to the specified tier and pull back all data at that
@@ -144,13 +351,27 @@ class Minion:
         """
 
         if resolution == -1:
-            resolution = self.depth
-        return self._recursive_data(resolution)
+            # Every tier, including any below a LazyMinion.
+            resolution = math.inf
+
+        def expand(minion, depth):
+            # Most Minions are edges, so they skip the method call.
+            if minion.__class__ is EdgeMinion:
+                return minion._data, None
+            return minion._data_step(resolution)
+
+        return traverse.fold(self, expand, _finish_render)
 
     def model(self, resolution=1):
         if resolution == -1:
-            resolution = self.depth
-        return self._recursive_model(resolution)
+            resolution = math.inf
+
+        def expand(minion, depth):
+            if minion.__class__ is EdgeMinion:
+                return minion.label, None
+            return minion._model_step(resolution)
+
+        return traverse.fold(self, expand, _finish_render)
 
     @property
     def depth(self):
@@ -159,15 +380,57 @@ class Minion:
 
     @depth.getter
     def depth(self):
-        """ Returns the tier of the current Minion
-
-        This method should be overridden if you wish to return
-        anything other than the curren tier."""
-        return self._recursive_depth()
+        """ Returns the deepest tier of the current Minion, which was
+        computed when the Minion was built. """
+        return self._depth
 
     def hash(self, resolution=1):
-        model = self.model(resolution=resolution)
-        return hasher(model)
+        return self.fingerprint(resolution=resolution).hex()
+
+    def fingerprint(self, resolution=1):
+        """ Returns the structural fingerprint of the model at the
+        specified resolution.
+
+        Fingerprints are computed once when the Minion is built, so
+        this is a lookup. Two Minions have the same fingerprint at a
+        resolution exactly when they have the same model at that
+        resolution.
+
+        Args:
+            resolution (int): The resolution of the model to be
+                fingerprinted.
+
+        Returns:
+            bytes: The digest representing the model.
+        """
+
+        if resolution == -1:
+            resolution = self.depth
+        index = resolution - self.tier + 1
+        if index <= 0:
+            return self._fingerprints[0]
+        if index >= len(self._fingerprints):
+            return self._fingerprints[-1]
+        return self._fingerprints[index]
+
+    def _build_fingerprints(self, codec):
+        """ Returns the fingerprint of the label followed by the
+        fingerprints for every resolution where the model changes.
+
+        This method should be overridden by Minions whose model
+        contains child Minions.
+
+        Args:
+            codec (Codec): Provides the digest.
+        """
+
+        return codec.label_fingerprints(self.label)
+
+    def _last_resolution(self):
+        """ Returns the last resolution at which the model of this
+        Minion changes. """
+
+        return self.tier + len(self._fingerprints) - 2
 
     def _recursive_depth(self):
         """ Returns the tier of the current Minion
@@ -177,35 +440,43 @@ class Minion:
         """
         return self.tier
 
-    def _recursive_data(self, tier):
-        """ Returns the data that this Minion represents.
+    def _data_step(self, resolution):
+        """ Returns the data that this Minion represents, for
+        traverse.fold.
 
         This method should be overriden if you wish to return anything
-        other than the literal data within this Minion.
+        other than the literal data within this Minion. Minions with
+        children return a state and the child Minions whose data is
+        needed, and _finish_render puts the data of the children
+        together.
+
+        Returns:
+            tuple: The data and None, or the keys of a dict (None for a
+                list) and the child Minions.
         """
 
-        return self._data
+        return self._data, None
 
-    def _recursive_model(self, resolution):
+    def _model_step(self, resolution):
         """ Returns the lable as representation of the current Minion's
-        model.
+        model, for traverse.fold.
 
         This method should be overriden if you wish to return anything
-        other than the label of the current Minion
+        other than the label of the current Minion. See _data_step.
         """
 
-        return self.label
+        return self.label, None
 
     def __str__(self):
         return str(self.model(-1))
 
 
 class DictMinion(Minion):
-    """ Minion that is structured as an OrderedDict
+    """ Minion that is structured as a dict with sorted keys.
 
-    DictMinion is generated from a JSON object.  self._model will be
-    an OrderedDict of key:value pairse where the values will be a
-    Minion-derived object.
+    DictMinion is generated from a JSON object.  self._keys will be
+    the interned KeySet of the object, and self._model will be a tuple
+    of Minion-derived objects, one per key in the order of the keys.
 
     Example:
         >>> log = {
@@ -218,13 +489,42 @@ class DictMinion(Minion):
                 'key5': ['hello', 'world'],
             }
         >>> minion = DictMinion(data=log)
+        >>> minion._keys.keys
+        ('key1', 'key2', 'key5')
         >>> minion._model
-        {'key1': EdgeMinion, 'key2': DictMinion, 'key5': ListMinion}
+        (EdgeMinion, DictMinion, ListMinion)
+
+    Attributes:
+        _keys (KeySet): The keys of the dict.
     """
 
-    def __init__(self, dictionary, tier=1):
+    __slots__ = _TREE_SLOTS + ("_keys",)
+
+    def __init__(self, dictionary, tier=1, codec=None, max_resolution=None):
         """ See Minion class """
-        super().__init__(data=dictionary, label="DICT", tier=tier)
+        if codec is None:
+            codec = DEFAULT_CODEC
+        self._data = None
+        self.edge = False
+        self.tier = tier
+        self.label = "DICT"
+        self._keys = intern_keys(dictionary)
+        self._model = tuple(
+            minion_generator(
+                dictionary[key],
+                tier=tier + 1,
+                codec=codec,
+                max_resolution=max_resolution,
+            )
+            for key in self._keys.keys
+        )
+        self._depth = self._recursive_depth()
+        self._fingerprints = self._build_fingerprints(codec)
+
+    def items(self):
+        """ Returns (key, child Minion) pairs in sorted key order. """
+
+        return zip(self._keys.keys, self._model)
 
     def _recursive_depth(self):
         """ Returns the deepest tier associated with the current
@@ -234,7 +534,8 @@ class DictMinion(Minion):
 
         The return value is first set to the current Minion's tier so
         that if there are no child Minions, the current Minion's will
-        be returned.
+        be returned. Child Minions already hold their own depth, so
+        this does not walk the whole subtree.
 
         Returns:
             int: The deepest tier found from the child minions. If no
@@ -244,19 +545,17 @@ class DictMinion(Minion):
         # Default deepest tier is the current Minion's tier
         deepest = self.tier
         # Get deepest tier from all child Minions
-        for v in self._model.values():
-            depth = v.depth
+        for v in self._model:
+            depth = v._depth
             if depth > deepest:
                 deepest = depth
         return deepest
 
-    def _recursive_data(self, resolution):
-        """ Overrides super()._recursive_data to be specific for a
-        dict.
+    def _data_step(self, resolution):
+        """ Overrides super()._data_step to be specific for a dict.
 
-        Since this object is considered an OrderedDict, we will
-        perform dict comprehension to pull out the data values from
-        the values within the dictionary.
+        The data of the child Minions is put back together under the
+        same keys.
 
         If this object is actually in the tier which we are stopping on,
         then, we just return a label instead.
@@ -266,17 +565,20 @@ class DictMinion(Minion):
                 for results
 
         Returns:
-            dict: Dictionary of the data
-            str: Label of the current Minion
+            tuple: The keys and the child Minions, or the label of the
+                current Minion and None.
         """
 
         if not (resolution < self.tier):
-            return {k: v.data(resolution) for k, v in self._model.items()}
-        return self.label
+            for v in self._model:
+                if not v.edge:
+                    return self._keys.keys, self._model
+            # A dict of nothing but edges needs no traversal.
+            return {k: v._data for k, v in self.items()}, None
+        return self.label, None
 
-    def _recursive_model(self, resolution):
-        """ Overrides super()._recursive_model to be specific for a
-        dict.
+    def _model_step(self, resolution):
+        """ Overrides super()._model_step to be specific for a dict.
 
         Since the current object is a dict of key:value pairs where the
         values are Minions, we may need to return the model of the
@@ -290,20 +592,47 @@ class DictMinion(Minion):
                 for results
 
         Returns:
-            dict: Dictionary of the model
-            str: Label of the current Minion
+            tuple: The keys and the child Minions, or a surrogate
+                string or the label of the current Minion and None.
         """
 
         if not (resolution < self.tier):
-            for v in self._model.values():
+            for v in self._model:
                 if not v.edge:
-                    return {k: v.model(resolution) for k, v in self._model.items()}
+                    return self._keys.keys, self._model
             # If the dict has nothing but edges as values, just return
             # a string of the keys.
             if not self._model:
-                return "EMPTY_{}".format(self.label)
-            return "DICT_KEYS: {}".format(str(list(self._model.keys())))
-        return self.label
+                return "EMPTY_{}".format(self.label), None
+            return self._keys.summary, None
+        return self.label, None
+
+    def _build_fingerprints(self, codec):
+        """ Builds fingerprints bottom-up from the child Minions.
+
+        The fingerprint at a resolution combines the sorted keys with
+        the fingerprints of the child Minions at that same resolution,
+        which mirrors the model returned by _model_step.
+
+        Args:
+            codec (Codec): Provides the digest.
+
+        Returns:
+            tuple: Digest of the label, then digests for each
+                resolution starting at this tier.
+        """
+
+        label = codec.value_digest(self.label)
+        children = self._model
+        if all(child.edge for child in children):
+            if not children:
+                return (label, codec.value_digest("EMPTY_{}".format(self.label)))
+            return (label, codec.value_digest(self._keys.summary))
+
+        prefix = self._keys.prefix
+        last = max(child._last_resolution() for child in children)
+        rows = _fingerprint_rows(children, self.tier, last)
+        return (label,) + tuple(codec.digest(prefix + b"".join(row)) for row in rows)
 
 
 class ListMinion(Minion):
@@ -319,8 +648,16 @@ class ListMinion(Minion):
         [EdgeMinion, DictMinion, ListMinion]
     """
 
-    def __init__(self, list_, tier=0):
-        super().__init__(data=list_, label="LIST", tier=tier)
+    __slots__ = _TREE_SLOTS
+
+    def __init__(self, list_, tier=0, codec=None, max_resolution=None):
+        super().__init__(
+            data=list_,
+            label="LIST",
+            tier=tier,
+            codec=codec,
+            max_resolution=max_resolution,
+        )
 
     def _recursive_depth(self):
         """ Returns the deepest tier associated with the current
@@ -330,7 +667,8 @@ class ListMinion(Minion):
 
         The return value is first set to the current Minion's tier so
         that if there are no child Minions, the current Minion's will
-        be returned.
+        be returned. Child Minions already hold their own depth, so
+        this does not walk the whole subtree.
 
         Returns:
             int: The deepest tier found from the child minions. If no
@@ -341,14 +679,13 @@ class ListMinion(Minion):
         deepest = self.tier
         # Get deepest tier from all child Minions
         for item in self._model:
-            depth = item.depth
+            depth = item._depth
             if depth > deepest:
                 deepest = depth
         return deepest
 
-    def _recursive_data(self, resolution):
-        """ Overrides super()._recursive_data to be specific for a
-        list.
+    def _data_step(self, resolution):
+        """ Overrides super()._data_step to be specific for a list.
 
         Since this object is a list of Minions, we will need to pull
         out the data from each minion if data is needed in the tier
@@ -359,23 +696,25 @@ class ListMinion(Minion):
                 for results
 
         Returns:
-            list: List of the data
-            str: Label of the current Minion
+            tuple: None and the child Minions, or the summary or label
+                of the current Minion and None.
         """
         if resolution >= self.tier:
             # Only summarize if the next tier is the final tier.
             if resolution == self.tier:
-                return self.get_summary()
+                return self.get_summary(), None
             # If resolution is >2 from this tier, return the data
             # like normal.
-            return [item.data(resolution) for item in self._model]
+            for item in self._model:
+                if not item.edge:
+                    return None, self._model
+            return [item._data for item in self._model], None
 
         # Base case - no more children
-        return self.label
+        return self.label, None
 
-    def _recursive_model(self, resolution):
-        """ Overrides super()._recursive_model to be specific for a
-        list.
+    def _model_step(self, resolution):
+        """ Overrides super()._model_step to be specific for a list.
 
         Since the current object is a list of Minions, we will need to
         pull out the models from each minion if the model is needed in
@@ -399,8 +738,8 @@ class ListMinion(Minion):
                 for results
 
         Returns:
-            list: List of the model children or surrogate string
-            str: Label of the current Minion
+            tuple: None and the child Minions, or a surrogate or the
+                label of the current Minion and None.
         """
 
         if resolution >= self.tier:
@@ -409,27 +748,52 @@ class ListMinion(Minion):
                 if not minion.edge:
                     # Only summarize if the next tier is the final tier
                     if resolution == self.tier:
-                        return self.get_summary()
+                        return self.get_summary(), None
                     # If resolution is >2 from this tier, return the
                     # models like normal.
-                    return [item.model(resolution) for item in self._model]
+                    return None, self._model
 
             if not self._model:
-                return "EMPTY_{}".format(self.label)
-            return ["edges_only"]
+                return "EMPTY_{}".format(self.label), None
+            return ["edges_only"], None
 
         # Base case - no more children.
-        return self.label
+        return self.label, None
+
+    def _build_fingerprints(self, codec):
+        """ Builds fingerprints bottom-up from the child Minions.
+
+        At this Minion's own tier the fingerprint is that of the
+        summary. Past that, it combines the fingerprints of the child
+        Minions in order, which mirrors _model_step.
+
+        Args:
+            codec (Codec): Provides the digest.
+
+        Returns:
+            tuple: Digest of the label, then digests for each
+                resolution starting at this tier.
+        """
+
+        label = codec.value_digest(self.label)
+        if all(minion.edge for minion in self._model):
+            if not self._model:
+                return (label, codec.value_digest("EMPTY_{}".format(self.label)))
+            return (label, codec.value_digest(("edges_only",)))
+
+        last = max(minion._last_resolution() for minion in self._model)
+        rows = _fingerprint_rows(self._model, self.tier, last)
+        fingerprints = [label, codec.value_digest(tuple(self.get_summary()))]
+        # The first row is this tier, which is covered by the summary.
+        fingerprints.extend(
+            codec.digest(_LIST_PREFIX + b"".join(row)) for row in rows[1:]
+        )
+        return tuple(fingerprints)
 
     def get_summary(self):
-        types = set()
-        for minion in self._model:
-            if isinstance(minion, DictMinion):
-                types.add("DICT(s)")
-            elif isinstance(minion, ListMinion):
-                types.add("LIST(s)")
-            else:
-                types.add("edge(s)")
+        # Labels rather than types, so that LazyMinions are summarized
+        # by what they hold.
+        types = {"{}(s)".format(minion.label) for minion in self._model}
         return sorted(list(types))
 
 
@@ -443,6 +807,301 @@ class EdgeMinion(Minion):
     "edge-value" and "usa" would be edges.
     """
 
-    def __init__(self, edge_item, tier=1):
-        super().__init__(data=edge_item, label="edge", tier=tier)
+    __slots__ = _TREE_SLOTS
+
+    def __init__(self, edge_item, tier=1, codec=None):
+        super().__init__(data=edge_item, label="edge", tier=tier, codec=codec)
         self.edge = True
+
+
+class LazyMinion(Minion):
+    """Minion for a dict or list below the max resolution of a tree.
+
+    A tree built with a max resolution only needs the label of each
+    dict and list in the tier below that resolution, so these are kept
+    as LazyMinions holding the raw value. Their child Minions are only
+    built the first time data or a model is requested past the max
+    resolution, and are then kept.
+
+    Their fingerprints only cover the label, so the fingerprints of
+    the tree stop changing at the max resolution. For the same reason
+    a LazyMinion's depth is its own tier, which caps the depth of the
+    tree at the max resolution + 1.
+
+    Attributes:
+        _data (dict, list): The raw value.
+        _model (Minion, None): The fully built Minion for the value,
+            once it has been expanded.
+        _codec (Codec): The codec used to expand the value.
+    """
+
+    __slots__ = _TREE_SLOTS + ("_codec",)
+
+    def __init__(self, data, tier=1, codec=None):
+        if codec is None:
+            codec = DEFAULT_CODEC
+        self._data = data
+        self.edge = False
+        self.tier = tier
+        self.label = "DICT" if isinstance(data, dict) else "LIST"
+        self._model = None
+        self._depth = tier
+        self._fingerprints = codec.label_fingerprints(self.label)
+        self._codec = codec
+
+    def expand(self):
+        """ Returns the full Minion for the value, building it on
+        first use.
+
+        Returns:
+            Minion: A DictMinion or ListMinion for the value.
+        """
+
+        if self._model is None:
+            self._model = minion_generator(
+                self._data, tier=self.tier, codec=self._codec
+            )
+        return self._model
+
+    def _data_step(self, resolution):
+        if resolution < self.tier:
+            return self.label, None
+        return self.expand()._data_step(resolution)
+
+    def _model_step(self, resolution):
+        if resolution < self.tier:
+            return self.label, None
+        return self.expand()._model_step(resolution)
+
+
+# Bytes of logs in the shared zlib dictionary. The dictionary is loaded
+# again for every log packed, which is most of the time packing takes,
+# and logs compress only a few percent better with one past 8KB.
+_ZDICT_SIZE = 1 << 13
+
+# Logs are packed as raw deflate streams, without the zlib header,
+# dictionary id and checksum, which would add 10 bytes to each.
+_WBITS = -15
+
+# Most of a log that is not in the dictionary is ids and hashes, which
+# Z_FILTERED codes a few percent smaller than the default strategy.
+_STRATEGY = zlib.Z_FILTERED
+
+
+class Packer:
+    """Compresses the logs held by CompactMinions.
+
+    Each log is compressed on its own, so that it can be rebuilt
+    without the others, but against a zlib dictionary shared by all of
+    the minions of a garage. Logs from the same source repeat the same
+    keys and many of the same values, so this compresses them much
+    better than zlib alone.
+
+    The dictionary is the first 8KB of logs packed. Until that much
+    has been packed, logs are compressed without a dictionary by a
+    second Packer, which pack() returns along with them.
+
+    Attributes:
+        codec (Codec): The codec the minions are fingerprinted with,
+            which is also used to rebuild them.
+        zdict (bytes, None): The shared dictionary, or b"" for none.
+            None while the logs for it are being collected.
+        _samples (list): The logs collected for the dictionary.
+        _plain (Packer, None): Packs logs while the dictionary is being
+            collected.
+    """
+
+    __slots__ = ("codec", "zdict", "_samples", "_plain")
+
+    def __init__(self, codec=None, zdict=None):
+        self.codec = codec or DEFAULT_CODEC
+        self.zdict = zdict
+        self._samples = []
+        self._plain = None
+
+    def pack(self, raw):
+        """ Compresses a log.
+
+        Args:
+            raw (bytes): The log serialized as JSON.
+
+        Returns:
+            tuple: The compressed log, and the Packer that unpacks it.
+        """
+
+        if self.zdict is None:
+            if self._plain is None:
+                self._plain = Packer(self.codec, zdict=b"")
+            self._samples.append(raw)
+            collected = sum(map(len, self._samples))
+            if collected < _ZDICT_SIZE:
+                return self._plain.pack(raw)
+            self.zdict = b"".join(self._samples)[-_ZDICT_SIZE:]
+            self._samples = []
+
+        if self.zdict:
+            compressor = zlib.compressobj(
+                zlib.Z_BEST_COMPRESSION,
+                zlib.DEFLATED,
+                _WBITS,
+                strategy=_STRATEGY,
+                zdict=self.zdict,
+            )
+        else:
+            compressor = zlib.compressobj(
+                zlib.Z_BEST_COMPRESSION, zlib.DEFLATED, _WBITS, strategy=_STRATEGY
+            )
+        return compressor.compress(raw) + compressor.flush(), self
+
+    def unpack(self, packed):
+        """ Returns the JSON bytes of a log that this Packer packed. """
+
+        if self.zdict:
+            decompressor = zlib.decompressobj(_WBITS, zdict=self.zdict)
+        else:
+            decompressor = zlib.decompressobj(_WBITS)
+        return decompressor.decompress(packed) + decompressor.flush()
+
+    def __reduce__(self):
+        # Logs still being collected are not kept, so an unpickled
+        # Packer starts collecting again.
+        return (Packer, (self.codec, self.zdict))
+
+
+class CompactMinion(Minion):
+    """Minion that keeps a whole log in a compact form.
+
+    Rather than keeping a tree of child Minions, a CompactMinion keeps
+    the log serialized as JSON and compressed by a Packer, along with
+    its depth, in a single bytes object after its fingerprints.
+    Fingerprint lookups do not need the tree. The tree is rebuilt on
+    demand whenever the data or model is requested, which in practice
+    only happens for the handful of unique logs being displayed.
+
+    This trades CPU when building and rendering for a much smaller
+    footprint per log. The data must be JSON-serializable, which the
+    output of serialize.json_transform is. Minions should share one
+    Packer, as a garage's do, or each keeps its own dictionary.
+
+    With a max resolution, the fingerprints and depth are those of a
+    tree built with that max resolution (see LazyMinion), but the tree
+    is always rebuilt in full.
+
+    Attributes:
+        _packed (bytes): The fingerprints of the full Minion but the
+            first, concatenated, followed by the log serialized as
+            compact JSON and packed. The first fingerprint is the
+            digest of the label, which every minion with the label
+            shares, so it is not kept.
+        _packer (Packer): Unpacks the log, and holds the codec the
+            minion was fingerprinted with.
+        _count (int): The number of fingerprints, including the first.
+    """
+
+    __slots__ = ("_packed", "_packer", "_count")
+
+    def __init__(self, data, tier=0, codec=None, max_resolution=None, packer=None):
+        if packer is None:
+            packer = Packer(codec)
+        codec = packer.codec
+        full = minion_generator(
+            data, tier=tier, codec=codec, max_resolution=max_resolution
+        )
+        packed, self._packer = packer.pack(_compact_json(data))
+        self._packed = b"".join(full._fingerprints[1:]) + packed
+        self._count = len(full._fingerprints)
+        self.edge = full.edge
+        self.tier = full.tier
+        self.label = full.label
+        self._depth = full._depth
+
+    @classmethod
+    def restore(cls, data, fingerprints, depth, packer):
+        """ Recreates a CompactMinion for a whole log from its parts,
+        without building or fingerprinting the tree.
+
+        Args:
+            data (dict, list, str, int, bytes): The log, or the log
+                already serialized as compact JSON.
+            fingerprints (bytes): The packed fingerprints, as held by
+                a CompactMinion built with the packer's codec.
+            depth (int): The depth of the log.
+            packer (Packer): Packs the log. Its codec must be the one
+                the fingerprints were made with.
+
+        Returns:
+            CompactMinion: The restored minion.
+        """
+
+        if isinstance(data, bytes):
+            raw, data = data, json.loads(data)
+        else:
+            raw = _compact_json(data)
+        restored = cls.__new__(cls)
+        packed, restored._packer = packer.pack(raw)
+        size = packer.codec.digest_size
+        restored._packed = fingerprints[size:] + packed
+        restored._count = len(fingerprints) // size
+        restored.tier = 0
+        if isinstance(data, dict):
+            restored.label, restored.edge = "DICT", False
+        elif isinstance(data, list):
+            restored.label, restored.edge = "LIST", False
+        else:
+            restored.label, restored.edge = "edge", True
+        restored._depth = depth
+        return restored
+
+    @property
+    def _fingerprints(self):
+        """ The fingerprints of the full Minion, concatenated. """
+
+        codec = self._packer.codec
+        size = codec.digest_size
+        return codec.value_digest(self.label) + self._packed[: (self._count - 1) * size]
+
+    def expand(self):
+        """ Rebuilds the full Minion represented by this CompactMinion.
+
+        Returns:
+            Minion: A DictMinion, ListMinion or EdgeMinion for the log.
+        """
+
+        packer = self._packer
+        start = (self._count - 1) * packer.codec.digest_size
+        data = json.loads(packer.unpack(memoryview(self._packed)[start:]))
+        return minion_generator(data, tier=self.tier, codec=self._packer.codec)
+
+    def fingerprint(self, resolution=1):
+        """ See Minion.fingerprint """
+
+        if resolution == -1:
+            resolution = self.depth
+        codec = self._packer.codec
+        index = min(max(resolution - self.tier + 1, 0), self._count - 1)
+        if index == 0:
+            return codec.value_digest(self.label)
+        start = (index - 1) * codec.digest_size
+        return self._packed[start : start + codec.digest_size]
+
+    def _last_resolution(self):
+        return self.tier + self._count - 2
+
+    def _data_step(self, resolution):
+        return self.expand()._data_step(resolution)
+
+    def _model_step(self, resolution):
+        return self.expand()._model_step(resolution)
+
+
+def _compact_json(data):
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _finish_render(minion, keys, values):
+    """ Puts the data or models of a Minion's children together, for
+    traverse.fold. """
+
+    if keys is None:
+        return values
+    return dict(zip(keys, values))
@@ -0,0 +1,213 @@
+import bisect
+import collections
+
+from json_inspect import minion
+
+
+# Appended to the path of a list to name its items, whatever their
+# position.
+LIST_ITEMS = "[]"
+
+
+def key_paths(root, max_parts=None):
+    """ Returns the normalized key path of every value in a log.
+
+    Dict keys are joined with '.', and the items of a list are all
+    named by the list's path followed by '[]', so that
+    {'ExtendedProperties': [{'Name': 'a'}, {'Name': 'b'}]} has the
+    paths 'ExtendedProperties', 'ExtendedProperties[]' and
+    'ExtendedProperties[].Name'.
+
+    Args:
+        root (Minion): The minion for the log.
+        max_parts (int, None): Paths with more keys and list items
+            than this are left out. None for every path.
+
+    Returns:
+        set: The key paths. The log itself has no path, so a log that
+            is a single value has none.
+    """
+
+    if isinstance(root, minion.CompactMinion):
+        root = root.expand()
+
+    paths = set()
+    stack = [(root, "", 0)]
+    while stack:
+        node, path, parts = stack.pop()
+        if parts:
+            paths.add(path)
+        # Values past the max resolution are not modeled, and are not
+        # part of the structure the log was fingerprinted by.
+        if node.edge or isinstance(node, minion.LazyMinion):
+            continue
+        if max_parts is not None and parts >= max_parts:
+            continue
+        if isinstance(node, minion.DictMinion):
+            for key, child in node.items():
+                stack.append((child, f"{path}.{key}" if path else key, parts + 1))
+        else:
+            for child in node._model:
+                stack.append((child, path + LIST_ITEMS, parts + 1))
+    return paths
+
+
+class PathIndex:
+    """ Inverted index from key paths to the log structures that
+    contain them.
+
+    Each distinct log structure is a shape, identified by the hex of
+    the fingerprint of its full structure. The key paths of a shape
+    are only worked out the first time it is seen, after which adding
+    a log costs a fingerprint lookup. Counts per path are brought up to
+    date when queried, by adding the logs seen since the last query to
+    the paths of their shapes, so queries cost time in proportion to
+    the number of shapes and paths rather than the number of logs.
+
+    Key paths are normalized by key_paths, so
+    'ExtendedProperties[].Name' matches the Name of every item in the
+    list. Keys that contain '.' or '[]' are not escaped.
+
+    Attributes:
+        events (int): The number of logs added.
+        max_parts (int, None): See key_paths.
+        _shapes (dict): Maps a shape fingerprint to its key paths.
+        _shape_counts (Counter): Maps a shape fingerprint to the number
+            of logs with that shape.
+        _path_shapes (dict): Maps each key path to the fingerprints of
+            the shapes that contain it.
+        _path_counts (Counter): Maps each key path to the number of
+            logs that contain it, as of the last query.
+        _pending (Counter): Logs per shape added since the last query.
+        _sorted (list, None): Every key path in sorted order, for
+            prefix queries. None when paths have been added since.
+    """
+
+    def __init__(self, max_parts=None):
+        self.events = 0
+        self.max_parts = max_parts
+        self._shapes = {}
+        self._shape_counts = collections.Counter()
+        self._path_shapes = collections.defaultdict(list)
+        self._path_counts = collections.Counter()
+        self._pending = collections.Counter()
+        self._sorted = None
+
+    def add(self, new_minion, count=1):
+        """ Adds logs with the structure of a minion.
+
+        Args:
+            new_minion (Minion): The minion for the log.
+            count (int): The number of logs with this structure to add,
+                such as the count of an aggregated Shape.
+        """
+
+        key = new_minion.fingerprint(-1)
+        if key not in self._shapes:
+            paths = key_paths(new_minion, self.max_parts)
+            self._shapes[key] = paths
+            for path in paths:
+                self._path_shapes[path].append(key)
+            self._sorted = None
+        self._shape_counts[key] += count
+        self._pending[key] += count
+        self.events += count
+
+    def lookup(self, path):
+        """ Returns the shapes that contain a key path.
+
+        Example:
+            >>> m.path_index.lookup("ExtendedProperties[].Name")
+            {'6c1d...': 2201, '0a9f...': 75}
+
+        Args:
+            path (str): A normalized key path.
+
+        Returns:
+            dict: Maps the hash of each shape containing the path to
+                the number of logs with that shape, most common first.
+        """
+
+        counts = self._shape_counts
+        shapes = {key.hex(): counts[key] for key in self._path_shapes.get(path, ())}
+        return dict(sorted(shapes.items(), key=lambda item: -item[1]))
+
+    def count(self, path):
+        """ Returns the number of logs that contain a key path. """
+
+        self._flush()
+        return self._path_counts[path]
+
+    def prefix(self, prefix):
+        """ Returns the key paths that start with a prefix.
+
+        Example:
+            >>> m.path_index.prefix("Actor[].")
+            {'Actor[].ID': 30114, 'Actor[].Type': 30114}
+
+        Args:
+            prefix (str): The start of the key paths, such as 'Actor'
+                or 'Actor[].'.
+
+        Returns:
+            dict: Maps each matching key path, in sorted order, to the
+                number of logs that contain it.
+        """
+
+        self._flush()
+        if self._sorted is None:
+            self._sorted = sorted(self._path_shapes)
+        start = bisect.bisect_left(self._sorted, prefix)
+        matches = {}
+        for path in self._sorted[start:]:
+            if not path.startswith(prefix):
+                break
+            matches[path] = self._path_counts[path]
+        return matches
+
+    def frequencies(self, prefix=""):
+        """ Returns a field-frequency table of the key paths.
+
+        Args:
+            prefix (str): Only include key paths that start with this.
+
+        Returns:
+            list: A tuple of each key path, the number of logs that
+                contain it and the fraction of all logs that is, most
+                common first.
+        """
+
+        events = self.events or 1
+        table = [
+            (path, count, count / events) for path, count in self.prefix(prefix).items()
+        ]
+        table.sort(key=lambda row: -row[1])
+        return table
+
+    def shape_paths(self, shape):
+        """ Returns the sorted key paths of a shape.
+
+        Args:
+            shape (str): The hash of the shape, as returned by lookup.
+
+        Raises:
+            KeyError: If the shape has not been seen.
+        """
+
+        return sorted(self._shapes[bytes.fromhex(shape)])
+
+    def _flush(self):
+        """ Adds the logs seen since the last query to the counts of
+        their shapes' paths. """
+
+        path_counts = self._path_counts
+        for key, count in self._pending.items():
+            for path in self._shapes[key]:
+                path_counts[path] += count
+        self._pending.clear()
+
+    def __contains__(self, path):
+        return path in self._path_shapes
+
+    def __len__(self):
+        return len(self._path_shapes)
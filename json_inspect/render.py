@@ -0,0 +1,171 @@
+import collections
+import sys
+
+
+DEFAULT_MAX_BYTES = 64 << 20
+
+
+class RenderCache:
+    """ Bounded LRU cache of rendered models and data, and of the JSON
+    they are written as.
+
+    Interactive sessions tend to ask for the same unique models and
+    data over and over, at a few resolutions and indents. Each answer
+    is kept under a key such as ('model', hash, resolution), so a
+    repeated query is a lookup rather than another walk of every
+    exemplar and another json.dumps.
+
+    The cache is bounded by the approximate bytes of the values it
+    holds rather than their number, since one JSON output can be as
+    large as every other value put together. See approximate_size.
+
+    Cached values are shared, so they must not be modified. Everything
+    cached is only valid for the logs held when it was rendered, so
+    the cache is emptied by validate() whenever its stamp changes, and
+    can be emptied at any time with invalidate().
+
+    Example:
+        >>> cache = RenderCache(max_bytes=1 << 20)
+        >>> cache.get(("model", "6c1d", 1), lambda: {"a": "DICT"})
+        {'a': 'DICT'}
+        >>> cache.get(("model", "6c1d", 1), lambda: {"a": "DICT"})
+        {'a': 'DICT'}
+        >>> cache.hits, cache.misses
+        (1, 1)
+
+    Attributes:
+        max_bytes (int): The most bytes of values kept. The least
+            recently used values are dropped to make room for a new
+            one, and a value larger than this is not kept. 0 to not
+            keep any.
+        bytes (int): The approximate bytes of the values held.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to be rendered.
+        evictions (int): Values dropped to make room for others.
+        _entries (OrderedDict): Maps each key to its value and size,
+            least recently used first.
+        _stamp: Identifies the logs the values were rendered from.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = collections.OrderedDict()
+        self._stamp = None
+
+    def get(self, key, render):
+        """ Returns the value cached under a key, rendering and caching
+        it first if it is not held.
+
+        Args:
+            key (tuple): Names the value, such as the kind of value,
+                the hash of the log and the resolution.
+            render (callable): Called with no arguments to render the
+                value on a miss.
+
+        Returns:
+            The value.
+        """
+
+        entries = self._entries
+        try:
+            value, _ = entries[key]
+        except KeyError:
+            self.misses += 1
+            value = render()
+            if self.max_bytes > 0:
+                self._put(key, value, approximate_size(value))
+            return value
+        self.hits += 1
+        entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value, size):
+        """ Caches a value, dropping the least recently used values
+        until it fits. """
+
+        if size > self.max_bytes:
+            return
+        entries = self._entries
+        while entries and self.bytes + size > self.max_bytes:
+            _, (_, dropped) = entries.popitem(last=False)
+            self.bytes -= dropped
+            self.evictions += 1
+        entries[key] = (value, size)
+        self.bytes += size
+
+    def validate(self, stamp):
+        """ Empties the cache if the values were rendered from other
+        logs than the stamp identifies.
+
+        Args:
+            stamp (tuple): Identifies the logs held, such as a weak
+                reference to the garage and its number of logs.
+                Compared with ==, and should not keep the logs alive.
+        """
+
+        if stamp != self._stamp:
+            self.invalidate()
+            self._stamp = stamp
+
+    def invalidate(self):
+        """ Drops every cached value. The counters are kept. """
+
+        self._entries.clear()
+        self.bytes = 0
+        self._stamp = None
+
+    def info(self):
+        """ Returns the counters and size of the cache.
+
+        Returns:
+            dict: The hits, misses, evictions, entries held, and bytes
+                held and max_bytes.
+        """
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def approximate_size(value):
+    """ Returns roughly how many bytes a value holds.
+
+    Strings and the other values in dicts, lists and tuples are counted
+    with sys.getsizeof, walking nested containers with an explicit
+    stack. Objects that only refer to data held elsewhere, such as the
+    minions of a garage, are counted by their own size alone. Shared
+    values are counted each time they appear.
+
+    Args:
+        value: A rendered value, such as a model, data or JSON.
+
+    Returns:
+        int: The approximate size in bytes.
+    """
+
+    size = 0
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return size
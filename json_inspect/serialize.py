@@ -1,8 +1,163 @@
+import bz2
 import datetime
-import json
+import fnmatch
+import functools
+import glob
+import gzip
+import io
+import lzma
+import mmap
+import os
+import time
 
+from json_inspect import traverse
+from json_inspect.codec import DEFAULT_CODEC
 
-def json_transform(obj, format=None):
+
+# Decoding is only attempted on strings that start with one of these
+# once leading whitespace is stripped. Usernames, IPs, timestamps and
+# the like are never handed to the parser.
+_JSON_STARTS = ("{", "[", '"')
+
+# Cached in place of a decoded value when a string is not JSON.
+_NOT_JSON = object()
+
+# Files with these extensions are decompressed as they are read, and
+# compressed as they are written.
+_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+
+# Files found in a directory are only read if their names match one of
+# these, once any compressed extension is removed.
+LOG_PATTERNS = ("*.json", "*.jsonl")
+
+# Default bytes of output buffered by open_output.
+OUTPUT_BUFFER_SIZE = 1 << 16
+
+
+class EmbeddedJSON:
+    """
+    Policy for decoding JSON that is embedded within string values.
+
+    Decoded strings are kept in a bounded LRU cache, since log sources
+    tend to repeat the same embedded blobs (ExtendedProperties and the
+    like) over and over. Cached values are shared between logs, so
+    they must not be modified.
+
+    Parameters
+    ----------
+    mode: str
+        'always' to decode any string that looks like JSON, 'never' to
+        leave every string as is, or 'limited' to decode only strings
+        that are within max_depth and max_length.
+    max_depth: int
+        With mode 'limited', strings nested deeper than this are not
+        decoded. The values of a log are at depth 1. None for no limit.
+    max_length: int
+        With mode 'limited', strings longer than this are not decoded.
+        None for no limit.
+    cache_size: int
+        The number of distinct strings to keep decoded results for.
+        0 disables the cache.
+
+    Attributes
+    ----------
+    attempts: int
+        The number of strings that looked like JSON and were allowed
+        to be decoded, including ones answered from the cache.
+    decoded: int
+        The number of those strings that were JSON.
+
+    Raises
+    ----------
+    ValueError
+        Raised if the mode is not one of the above.
+    """
+
+    modes = ("always", "never", "limited")
+
+    def __init__(self, mode="always", max_depth=None, max_length=None, cache_size=1024):
+        if mode not in self.modes:
+            raise ValueError(f"Embedded JSON mode must be one of {self.modes}: {mode}")
+        self.mode = mode
+        self.max_depth = max_depth
+        self.max_length = max_length
+        self.cache_size = cache_size
+        self.attempts = 0
+        self.decoded = 0
+        if cache_size:
+            self._decode = functools.lru_cache(maxsize=cache_size)(self._decode_uncached)
+        else:
+            self._decode = self._decode_uncached
+
+    def allows(self, value, depth):
+        """
+        Returns True if the policy allows decoding the string at the
+        given depth.
+        """
+
+        if self.mode == "never":
+            return False
+        if self.mode == "limited":
+            if self.max_depth is not None and depth > self.max_depth:
+                return False
+            if self.max_length is not None and len(value) > self.max_length:
+                return False
+        return value.lstrip().startswith(_JSON_STARTS)
+
+    def decode(self, value, depth, codec=None):
+        """
+        Decodes and transforms a string if it holds JSON.
+
+        Parameters
+        ----------
+        value: str
+            The string to be decoded.
+        depth: int
+            The depth of the string within the log.
+        codec: Codec
+            The codec used to parse the string. If None, then
+            codec.DEFAULT_CODEC is used.
+
+        Returns
+        ----------
+        The transformed JSON value, or the string itself if it is not
+        JSON or the policy does not allow decoding it.
+        """
+
+        if not self.allows(value, depth):
+            return value
+        if codec is None:
+            codec = DEFAULT_CODEC
+        # Results only depend on the depth when the depth is limited.
+        if self.max_depth is None:
+            depth = 1
+        self.attempts += 1
+        decoded = self._decode(value, depth, codec)
+        if decoded is _NOT_JSON:
+            return value
+        self.decoded += 1
+        return decoded
+
+    def _decode_uncached(self, value, depth, codec):
+        try:
+            return json_transform(
+                codec.loads(value), policy=self, depth=depth, codec=codec
+            )
+        except Exception:
+            return _NOT_JSON
+
+    def __reduce__(self):
+        # The cache cannot be pickled, so rebuild from the settings.
+        return (
+            EmbeddedJSON,
+            (self.mode, self.max_depth, self.max_length, self.cache_size),
+        )
+
+
+DEFAULT_POLICY = EmbeddedJSON()
+
+
+def json_transform(obj, format=None, policy=None, depth=0, codec=None):
     """
     Turns datetime objects in JSON into strings which can be then be
     serialized by json.dumps.
@@ -16,6 +171,10 @@ def json_transform(obj, format=None):
         'inside_key_2': 'inside_value_2'}"} will become { 'hello': 
         {'inside_key': 'inside_value', 'inside_key_2': 'inside_value_2'}}
 
+    A string or bytes passed in at depth 0 is the log itself and is
+    always decoded. Strings nested within it are decoded according to
+    the policy.
+
     Parameters
     ----------
     obj: any object type
@@ -24,6 +183,14 @@ def json_transform(obj, format=None):
         Format for the datetime object to be represented as when
         it is converted to a string. If None, then datetime.ctime()
         will be used instead.
+    policy: EmbeddedJSON
+        When to decode JSON embedded in strings. If None, then
+        DEFAULT_POLICY is used.
+    depth: int
+        How deeply nested obj is within the log.
+    codec: Codec
+        The codec used to parse JSON. If None, then
+        codec.DEFAULT_CODEC is used.
 
     Returns
     ----------
@@ -36,45 +203,390 @@ def json_transform(obj, format=None):
         object.
     """
 
-    # Base cases
-    serializable_types = (int, float, bool)
-    if isinstance(obj, serializable_types) or (obj is None):
-        return obj
-    elif isinstance(obj, datetime.datetime):
-        if format:
-            return obj.strftime(format)
-        else:
-            return obj.ctime()
+    if policy is None:
+        policy = DEFAULT_POLICY
+    if codec is None:
+        codec = DEFAULT_CODEC
 
-    # Recursive cases
-    elif isinstance(obj, str):
+    if not depth and isinstance(obj, (str, bytes, bytearray)):
+        # The log itself, as a raw line. A bytes line is parsed without
+        # first being copied into a str.
         try:
-            # To catch any json elements that might be encased by a string
-            return json_transform(json.loads(obj))
+            return json_transform(codec.loads(obj), policy=policy, codec=codec)
         except Exception:
-            # Just return the string
-            return obj
+            if isinstance(obj, str):
+                # Just return the string
+                return obj
+            return obj.decode("utf-8", errors="replace")
+
+    def expand(obj, depth):
+        # Base cases
+        if isinstance(obj, (int, float, bool)) or obj is None:
+            return obj, None
+        if isinstance(obj, str):
+            # To catch any json elements that might be encased by a
+            # string
+            return policy.decode(obj, depth, codec=codec), None
+        if isinstance(obj, datetime.datetime):
+            if format:
+                return obj.strftime(format), None
+            return obj.ctime(), None
+
+        # Containers, whose items are transformed one level deeper
+        if isinstance(obj, list):
+            return list, obj
+        if isinstance(obj, dict):
+            return dict, obj.values()
+        if isinstance(obj, set):
+            return set, obj
+        raise ValueError(f"Not a valid JSON element: {type(obj)} {str(obj)}")
+
+    return traverse.fold(obj, expand, _finish_transform, depth=depth)
+
+
+def _finish_transform(obj, kind, values):
+    """ Rebuilds a container from its transformed items. """
+
+    if kind is list:
+        return values
+    if kind is dict:
+        return dict(zip(obj, values))
+    return set(values)
+
+
+def expand_paths(sources, patterns=LOG_PATTERNS, exclude=()):
+    """
+    Expands log sources into the files they name.
+
+    Parameters
+    ----------
+    sources: str or list
+        A file name, a directory, a glob pattern, or a list of any of
+        these. Directories are searched recursively, skipping hidden
+        files and directories. Patterns may use '**' to match any
+        number of directories.
+    patterns: tuple
+        Shell patterns that the names of files found in a directory
+        must match, ignoring case and any .gz, .bz2 or .xz extension,
+        so that catalogs, READMEs and the like are not read as logs.
+        Files named directly or by a glob pattern are always kept.
+        None to keep every file.
+    exclude: iterable
+        Files that are never returned, however they are named, such
+        as a catalog kept beside the logs.
+
+    Returns
+    ----------
+    list
+        The file names, in the order given. The files found in a
+        directory or matched by a pattern are sorted by name.
 
-    elif isinstance(obj, list):
-        if obj:
-            return [json_transform(each) for each in obj]
+    Raises
+    ----------
+    FileNotFoundError
+        Raised if a glob pattern does not match any files.
+    """
+
+    if isinstance(sources, (str, os.PathLike)):
+        sources = [sources]
+    excluded = {os.path.realpath(path) for path in exclude}
+
+    paths = []
+    for source in sources:
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            found = []
+            for root, dirs, files in os.walk(source):
+                dirs[:] = [name for name in dirs if not name.startswith(".")]
+                found.extend(
+                    os.path.join(root, name)
+                    for name in files
+                    if not name.startswith(".") and _is_log_name(name, patterns)
+                )
+            paths.extend(sorted(found))
+        elif glob.has_magic(source):
+            found = glob.glob(source, recursive=True)
+            found = [path for path in found if os.path.isfile(path)]
+            if not found:
+                raise FileNotFoundError(f"No files match {source}")
+            paths.extend(sorted(found))
         else:
-            return []
+            paths.append(source)
+    if excluded:
+        paths = [path for path in paths if os.path.realpath(path) not in excluded]
+    return paths
 
-    elif isinstance(obj, dict):
-        new_obj = {key: value for (key, value) in obj.items()}
-        for key in new_obj.keys():
-            new_obj[key] = json_transform(new_obj[key])
-        return new_obj
 
-    elif isinstance(obj, set):
-        return {json_transform(each) for each in obj}
+def _is_log_name(name, patterns):
+    if patterns is None:
+        return True
+    name = name.lower()
+    if os.path.splitext(name)[1] in _OPENERS:
+        name = os.path.splitext(name)[0]
+    return any(fnmatch.fnmatchcase(name, pattern.lower()) for pattern in patterns)
 
-    else:
-        raise ValueError(f"Not a valid JSON element: {type(obj)} {str(obj)}")
 
+def is_compressed(file_loc):
+    """
+    Returns True if the file is decompressed as it is read, which is
+    decided by its extension: .gz, .bz2 or .xz.
+    """
+
+    return os.path.splitext(file_loc)[1].lower() in _OPENERS
+
+
+def read_lines(file_loc, start=0, end=None):
+    """
+    Lazily reads the raw lines of a file of logs.
+
+    Compressed files are decompressed as they are read. Other files
+    are memory-mapped and split on newlines directly from the mapping,
+    so each line is copied only once, straight from the page cache.
+    Files that cannot be mapped, such as pipes, are read normally.
+
+    Parameters
+    ----------
+    file_loc: str
+        The name of the file to be read from.
+    start: int
+        Byte offset of the first line to read. Must be the start of a
+        line.
+    end: int
+        Lines starting at or after this byte offset are not read. None
+        to read to the end of the file.
+
+    Yields
+    ----------
+    bytes
+        Each line, including its newline if it has one.
+
+    Raises
+    ----------
+    ValueError
+        Raised if a byte range is given for a compressed file.
+    """
+
+    opener = _OPENERS.get(os.path.splitext(file_loc)[1].lower())
+    if opener is not None:
+        if start or end is not None:
+            raise ValueError(f"Compressed files can only be read whole: {file_loc}")
+        with opener(file_loc, "rb") as f:
+            yield from f
+        return
+
+    with open(file_loc, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and pipes cannot be mapped.
+            if start:
+                f.seek(start)
+            position = start
+            for line in f:
+                if end is not None and position >= end:
+                    break
+                position += len(line)
+                yield line
+            return
+
+        with mapped:
+            size = len(mapped)
+            end = size if end is None else min(end, size)
+            find = mapped.find
+            position = start
+            while position < end:
+                newline = find(b"\n", position)
+                following = size if newline == -1 else newline + 1
+                yield mapped[position:following]
+                position = following
+
+
+def open_output(file_loc, buffer_size=OUTPUT_BUFFER_SIZE):
+    """
+    Opens a file to write text output to, compressing it when the name
+    ends in .gz, .bz2 or .xz.
+
+    Parameters
+    ----------
+    file_loc: str
+        The name of the file to write to. It is replaced if it exists.
+    buffer_size: int
+        Bytes of output to buffer before writing to the file. Output
+        memory stays at about this much however much is written.
+
+    Returns
+    ----------
+    file object
+        A text file object, to be used as a context manager.
+    """
+
+    opener = _OPENERS.get(os.path.splitext(file_loc)[1].lower())
+    if opener is not None:
+        return io.TextIOWrapper(
+            io.BufferedWriter(opener(file_loc, "wb"), buffer_size=buffer_size),
+            encoding="utf-8",
+        )
+    return open(file_loc, "w", buffering=buffer_size, encoding="utf-8")
+
+
+def _transform_lines(lines, policy, codec, stats):
+    """
+    Transforms each raw line, timing each stage when stats are given.
+    """
+
+    if stats is None:
+        for line in lines:
+            yield json_transform(line, policy=policy, codec=codec)
+        return
+
+    if codec is None:
+        codec = DEFAULT_CODEC
+    clock = time.perf_counter
+    lines = iter(lines)
+    while True:
+        started = clock()
+        line = next(lines, None)
+        read = clock()
+        if line is None:
+            stats.add("read", read - started)
+            return
+        try:
+            parsed = codec.loads(line)
+        except Exception:
+            # json_transform falls back to the text of the line.
+            parsed = line
+        parsed_at = clock()
+        transformed = json_transform(parsed, policy=policy, codec=codec)
+        stats.add("read", read - started)
+        stats.add("parse", parsed_at - read)
+        stats.add("transform", clock() - parsed_at)
+        stats.count("lines")
+        stats.count("bytes_read", len(line))
+        yield transformed
+
+
+def json_transform_from_file(file_loc, policy=None, codec=None, stats=None):
+    """
+    Lazily reads a file of JSON logs, one log per line, and yields
+    each transformed log.
+
+    Only a single line is held in memory at a time, so peak memory
+    depends on the largest record rather than the size of the file.
+    The file is read in binary and each line is handed straight to the
+    parser. Compressed files are read as described in read_lines.
+
+    Parameters
+    ----------
+    file_loc: str
+        The name of the file to be read from.
+    policy: EmbeddedJSON
+        See json_transform.
+    codec: Codec
+        See json_transform.
+    stats: Stats
+        If given, the time spent reading, parsing and transforming
+        each line is added to it, along with the lines and bytes read.
+
+    Yields
+    ----------
+    The transformed object for each line of the file.
+    """
+
+    yield from _transform_lines(read_lines(file_loc), policy, codec, stats)
+
+
+def json_transform_from_files(sources, policy=None, codec=None, stats=None):
+    """
+    Lazily reads every file named by the sources in turn and yields
+    each transformed log.
+
+    Parameters
+    ----------
+    sources: str or list
+        See expand_paths.
+    policy: EmbeddedJSON
+        See json_transform.
+    codec: Codec
+        See json_transform.
+    stats: Stats
+        See json_transform_from_file.
+
+    Yields
+    ----------
+    The transformed object for each line of each file.
+    """
+
+    for file_loc in expand_paths(sources):
+        yield from json_transform_from_file(
+            file_loc, policy=policy, codec=codec, stats=stats
+        )
+
+
+def file_shards(file_loc, count):
+    """
+    Splits a file into byte ranges that each start at the beginning
+    of a line, so that each range can be read independently.
+
+    Parameters
+    ----------
+    file_loc: str
+        The name of the file to be split.
+    count: int
+        The number of ranges wanted. Fewer are returned when the file
+        has too few lines. Compressed files cannot be split, so they
+        are always a single range of (0, None).
+
+    Returns
+    ----------
+    list
+        (start, end) byte offsets, in file order, covering the file.
+    """
+
+    if is_compressed(file_loc):
+        return [(0, None)]
+    size = os.path.getsize(file_loc)
+    boundaries = [0]
+    with open(file_loc, "rb") as f:
+        for i in range(1, count):
+            f.seek(max(size * i // count, boundaries[-1]))
+            if f.tell():
+                # Finish the line this offset landed in.
+                f.readline()
+            boundary = f.tell()
+            if boundary > boundaries[-1] and boundary < size:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries, boundaries[1:]))
+
+
+def json_transform_from_file_range(
+    file_loc, start, end, policy=None, codec=None, stats=None
+):
+    """
+    Lazily reads the lines of a file that start within a byte range
+    and yields each transformed log.
+
+    Parameters
+    ----------
+    file_loc: str
+        The name of the file to be read from.
+    start: int
+        Byte offset of the first line to read. Must be the start of a
+        line.
+    end: int
+        Lines starting at or after this byte offset are not read. None
+        to read to the end of the file.
+    policy: EmbeddedJSON
+        See json_transform.
+    codec: Codec
+        See json_transform.
+    stats: Stats
+        See json_transform_from_file.
+
+    Yields
+    ----------
+    The transformed object for each line in the range.
+    """
 
-def json_transform_from_file(file_loc):
-    with open(file_loc, "r") as f:
-        lines = f.readlines()
-    return [json_transform(line) for line in lines]
+    lines = read_lines(file_loc, start, end)
+    yield from _transform_lines(lines, policy, codec, stats)
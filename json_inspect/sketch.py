@@ -0,0 +1,141 @@
+import hashlib
+import math
+
+
+FORMAT_VERSION = 1
+
+MIN_PRECISION = 4
+MAX_PRECISION = 18
+
+
+class HyperLogLog:
+    """ Estimates the number of distinct fingerprints added to it.
+
+    The sketch has 2 ** precision one-byte registers, so it takes the
+    same few kilobytes of memory however many fingerprints are added.
+    Its relative standard error is about 1.04 / sqrt(2 ** precision),
+    e.g. 0.8% for the default precision of 14, which takes 16KB.
+
+    Fingerprints must be uniformly distributed digests, such as the
+    structural fingerprints of Minions. They are used as the hash, so
+    sketches can only be merged if their fingerprints were made with
+    the same digest.
+
+    Attributes:
+        precision (int): The number of bits that pick a register.
+        registers (bytearray): The highest rank seen by each register.
+    """
+
+    def __init__(self, error=None, precision=None):
+        """ Init the HyperLogLog class
+
+        Args:
+            error (float, None): The relative standard error wanted.
+                The smallest precision that achieves it is used.
+            precision (int, None): The precision to use, from 4 to 18.
+                Defaults to 14 when no error is given either.
+
+        Raises:
+            ValueError: If both an error and a precision are given, or
+                the precision is out of range.
+        """
+
+        if error is not None and precision is not None:
+            raise ValueError("Give either an error or a precision, not both.")
+        if error is not None:
+            precision = math.ceil(math.log2((1.04 / error) ** 2))
+            precision = min(max(precision, MIN_PRECISION), MAX_PRECISION)
+        elif precision is None:
+            precision = 14
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(
+                f"Precision must be from {MIN_PRECISION} to {MAX_PRECISION}: "
+                f"{precision}"
+            )
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    @property
+    def error(self):
+        """ The relative standard error of the estimate. """
+
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def add(self, fingerprint):
+        """ Adds a fingerprint to the sketch.
+
+        Args:
+            fingerprint (bytes): A digest.
+        """
+
+        if len(fingerprint) < 8:
+            fingerprint = hashlib.blake2b(fingerprint, digest_size=8).digest()
+        value = int.from_bytes(fingerprint[:8], "big")
+        bits = 64 - self.precision
+        index = value >> bits
+        rank = bits - (value & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        """ Returns the estimated number of distinct fingerprints. """
+
+        registers = self.registers
+        m = len(registers)
+        total = 0.0
+        for rank in range(max(registers) + 1):
+            total += registers.count(rank) * 2.0 ** -rank
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / total
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small counts.
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def merge(self, other):
+        """ Adds the fingerprints counted by another sketch, as if they
+        had been added to this one.
+
+        Args:
+            other (HyperLogLog): A sketch with the same precision.
+
+        Returns:
+            HyperLogLog: This sketch.
+
+        Raises:
+            ValueError: If the precisions differ.
+        """
+
+        if other.precision != self.precision:
+            raise ValueError(
+                f"Cannot merge a sketch of precision {other.precision} into one "
+                f"of precision {self.precision}."
+            )
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def to_bytes(self):
+        """ Returns the sketch as bytes, which from_bytes reads. """
+
+        return bytes((FORMAT_VERSION, self.precision)) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """ Reads a sketch written by to_bytes.
+
+        Raises:
+            ValueError: If the data is not a sketch this version can
+                read.
+        """
+
+        if len(data) < 2 or data[0] != FORMAT_VERSION:
+            raise ValueError("Not a version {} sketch.".format(FORMAT_VERSION))
+        sketch = cls(precision=data[1])
+        if len(data) - 2 != len(sketch.registers):
+            raise ValueError("The sketch is truncated.")
+        sketch.registers[:] = data[2:]
+        return sketch
@@ -0,0 +1,179 @@
+import collections
+import contextlib
+import cProfile
+import time
+import tracemalloc
+
+from loguru import logger
+
+from json_inspect import minion
+
+
+PROFILERS = ("cprofile", "tracemalloc")
+
+
+def _totals(codec, policy):
+    """ Running totals kept by the minion module, codec and policy. """
+
+    return {
+        "nodes": minion.nodes_built,
+        "digests": codec.digests,
+        "embedded_attempts": policy.attempts,
+        "embedded_decoded": policy.decoded,
+    }
+
+
+class Stats:
+    """ Timers and counters for the stages of a run.
+
+    The timed stages are:
+        read: Reading raw lines from files.
+        parse: Parsing each line with the codec.
+        transform: serialize.json_transform of each parsed log,
+            including decoding any embedded JSON.
+        build: Building the minions for each log, including their
+            fingerprints, and adding them to the garage.
+        catalog: Updating the catalog.
+        uniques: Answering uniqueness queries.
+        flatten: Compiling flatteners and flattening logs.
+        log: Writing the output of the print_* methods of a Master
+            through loguru, which can be large and go to slow sinks.
+            The other log calls write one line per run or query, so
+            they are not timed.
+
+    The counters are:
+        lines: Lines read.
+        bytes_read: Bytes read, after decompression.
+        events: Logs added to the garage.
+        nodes: Minions built.
+        digests: Digests computed by the codec.
+        embedded_attempts: Strings that looked like embedded JSON.
+        embedded_decoded: Strings that were embedded JSON.
+
+    Times from parallel workers are summed, so they can add up to more
+    than the wall-clock time of the run.
+
+    Attributes:
+        counters (Counter): Maps a counter name to its count.
+        timers (Counter): Maps a stage name to the seconds spent in it.
+        interval (float, None): Seconds between logged reports, or
+            None to not log any.
+    """
+
+    def __init__(self, interval=None):
+        self.counters = collections.Counter()
+        self.timers = collections.Counter()
+        self.interval = interval
+        self._last_report = time.monotonic()
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def add(self, stage, seconds):
+        self.timers[stage] += seconds
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """ Times the body of a with statement as a stage. """
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[stage] += time.perf_counter() - started
+
+    @contextlib.contextmanager
+    def track(self, codec, policy):
+        """ Counts the minions built, digests computed and embedded
+        JSON decoded during the body of a with statement.
+
+        Args:
+            codec (Codec): The codec used in the body.
+            policy (EmbeddedJSON): The policy used in the body.
+        """
+
+        before = _totals(codec, policy)
+        try:
+            yield
+        finally:
+            for name, total in _totals(codec, policy).items():
+                self.counters[name] += total - before[name]
+
+    def merge(self, other):
+        """ Adds the counts and times of another Stats to this one. """
+
+        self.counters.update(other.counters)
+        self.timers.update(other.timers)
+
+    def tick(self):
+        """ Logs a report if the interval has passed since the last. """
+
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.log()
+
+    def log(self):
+        summary = ", ".join(f"{name}={value}" for name, value in self.as_dict().items())
+        logger.info(f"Stats: {summary}")
+
+    def as_dict(self):
+        """ Returns the counters, followed by the time spent in each
+        stage in seconds, with '_seconds' appended to each name. """
+
+        stats = dict(self.counters)
+        for stage, seconds in self.timers.items():
+            stats[f"{stage}_seconds"] = round(seconds, 6)
+        return stats
+
+
+@contextlib.contextmanager
+def profiled(output_file, profiler="cprofile"):
+    """ Profiles the body of a with statement and writes the profile to
+    a file.
+
+    Only the current process is profiled, so the workers of a parallel
+    Master.make() are not included.
+
+    Args:
+        output_file (str): The file to write the profile to.
+        profiler (str): 'cprofile' to write cProfile stats, which can
+            be read with pstats or snakeviz, or 'tracemalloc' to write
+            a snapshot of the memory allocated, which can be read with
+            tracemalloc.Snapshot.load().
+
+    Raises:
+        ValueError: If the profiler is not supported.
+    """
+
+    if profiler not in PROFILERS:
+        raise ValueError(f"Profiler must be one of {PROFILERS}: {profiler}")
+
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(output_file)
+            logger.info(f"Wrote cProfile stats to {output_file}.")
+        return
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        if started:
+            tracemalloc.stop()
+        snapshot.dump(output_file)
+        top = snapshot.statistics("lineno")[:5]
+        logger.info(
+            f"Wrote tracemalloc snapshot to {output_file}. Top allocations:\n"
+            + "\n".join(str(stat) for stat in top)
+        )
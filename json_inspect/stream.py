@@ -0,0 +1,664 @@
+import base64
+import collections
+import datetime
+import json
+import time
+
+from json_inspect import codec as codec_
+from json_inspect import minion
+from json_inspect import serialize
+from json_inspect import sketch
+
+
+# The most seconds DriftDetector lets a log's time be ahead of the clock.
+DEFAULT_MAX_SKEW = 24 * 60 * 60
+
+
+class NoveltyFilter:
+    """ Watches a stream of logs for structures that have not been seen
+    before at a resolution.
+
+    Only the fingerprints seen so far are kept, so memory depends on
+    the number of distinct structures rather than the number of logs.
+    Logs are only modeled down to the resolution, so deeper values do
+    not slow the filter down.
+
+    Attributes:
+        resolution (int): The resolution structures are compared at.
+            As with MinionGarage.uniques, logs with a depth below the
+            resolution are counted but never reported.
+        events (int): The number of logs checked.
+        seen (set): The fingerprints seen so far.
+    """
+
+    def __init__(self, resolution=1, codec=None, embedded_json=None):
+        """ Init the NoveltyFilter class
+
+        Args:
+            resolution (int): See above.
+            codec (Codec, None): Parser and digest used for the logs.
+            embedded_json (EmbeddedJSON, None): When to decode JSON
+                embedded in string values.
+        """
+
+        self.resolution = resolution
+        self.codec = codec or codec_.DEFAULT_CODEC
+        self.embedded_json = embedded_json or serialize.DEFAULT_POLICY
+        self.events = 0
+        self.seen = set()
+
+    def check_line(self, line):
+        """ Parses a raw log line and checks it. See check().
+
+        Args:
+            line (str, bytes): One JSON log.
+        """
+
+        data = serialize.json_transform(
+            line, policy=self.embedded_json, codec=self.codec
+        )
+        return self.check(data)
+
+    def check(self, data):
+        """ Checks a log against the structures seen so far.
+
+        Args:
+            data (dict, list, str, int): A log that has already been
+                through serialize.json_transform.
+
+        Returns:
+            Minion: The log if its structure is new at the resolution.
+            None: If the structure was seen before.
+        """
+
+        self.events += 1
+        new_minion = minion.minion_generator(
+            data, codec=self.codec, max_resolution=self.resolution
+        )
+        if new_minion.depth < self.resolution:
+            return None
+        fingerprint = new_minion.fingerprint(self.resolution)
+        if fingerprint in self.seen:
+            return None
+        self.seen.add(fingerprint)
+        return new_minion
+
+    def __len__(self):
+        return len(self.seen)
+
+
+class DistinctCounter:
+    """ Estimates the number of distinct structures in a stream of logs
+    at one or more resolutions.
+
+    A HyperLogLog sketch per resolution is fed the fingerprint of each
+    log, so memory is a few kilobytes per resolution however large the
+    input is. Counters from several files or hosts can be merged, and
+    saved with to_bytes to be merged later.
+
+    Attributes:
+        resolutions (tuple): The resolutions structures are counted at.
+            As with Master.unique_count, only logs with a depth of at
+            least the resolution are counted at it.
+        events (int): The number of logs checked.
+        sketches (dict): Maps each resolution to its HyperLogLog.
+    """
+
+    def __init__(self, resolutions=(1,), error=0.01, codec=None, embedded_json=None):
+        """ Init the DistinctCounter class
+
+        Args:
+            resolutions (iterable): See above.
+            error (float): The relative standard error wanted for each
+                count. See HyperLogLog.
+            codec (Codec, None): Parser and digest used for the logs.
+                Only counters with the same digest can be merged.
+            embedded_json (EmbeddedJSON, None): When to decode JSON
+                embedded in string values.
+        """
+
+        self.resolutions = tuple(sorted(set(resolutions)))
+        self.codec = codec or codec_.DEFAULT_CODEC
+        self.embedded_json = embedded_json or serialize.DEFAULT_POLICY
+        self.events = 0
+        self.sketches = {
+            resolution: sketch.HyperLogLog(error=error)
+            for resolution in self.resolutions
+        }
+
+    def check_line(self, line):
+        """ Parses a raw log line and counts it. See check().
+
+        Args:
+            line (str, bytes): One JSON log.
+        """
+
+        data = serialize.json_transform(
+            line, policy=self.embedded_json, codec=self.codec
+        )
+        self.check(data)
+
+    def check(self, data):
+        """ Counts a log.
+
+        Args:
+            data (dict, list, str, int): A log that has already been
+                through serialize.json_transform.
+        """
+
+        self.events += 1
+        new_minion = minion.minion_generator(
+            data, codec=self.codec, max_resolution=self.resolutions[-1]
+        )
+        for resolution, sketch_ in self.sketches.items():
+            if new_minion.depth < resolution:
+                break
+            sketch_.add(new_minion.fingerprint(resolution))
+
+    def count(self, resolution=1):
+        """ Returns the estimated number of distinct structures at the
+        resolution.
+
+        Raises:
+            KeyError: If the resolution is not being counted.
+        """
+
+        return self.sketches[resolution].count()
+
+    def merge(self, other):
+        """ Adds the logs counted by another counter, as if they had
+        been checked by this one.
+
+        Args:
+            other (DistinctCounter): A counter with the same digest and
+                resolutions.
+
+        Returns:
+            DistinctCounter: This counter.
+
+        Raises:
+            ValueError: If the digests, resolutions or errors differ,
+                in which case neither counter is changed.
+        """
+
+        if _digest_name(other.codec) != _digest_name(self.codec):
+            raise ValueError("Cannot merge counters made with different digests.")
+        if other.resolutions != self.resolutions:
+            raise ValueError(
+                f"Cannot merge counters of resolutions {list(other.resolutions)} "
+                f"into counters of resolutions {list(self.resolutions)}."
+            )
+        for resolution, sketch_ in self.sketches.items():
+            if sketch_.precision != other.sketches[resolution].precision:
+                raise ValueError("Cannot merge counters with different errors.")
+        for resolution, sketch_ in self.sketches.items():
+            sketch_.merge(other.sketches[resolution])
+        self.events += other.events
+        return self
+
+    def to_bytes(self):
+        """ Returns the counter as bytes, which from_bytes reads. """
+
+        return json.dumps(
+            {
+                "digest": _digest_name(self.codec),
+                "events": self.events,
+                "sketches": {
+                    resolution: base64.b64encode(sketch_.to_bytes()).decode("ascii")
+                    for resolution, sketch_ in self.sketches.items()
+                },
+            }
+        ).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, data, codec=None, embedded_json=None):
+        """ Reads a counter written by to_bytes.
+
+        Args:
+            data (bytes): The saved counter.
+            codec (Codec, None): See DistinctCounter.
+            embedded_json (EmbeddedJSON, None): See DistinctCounter.
+
+        Raises:
+            ValueError: If the counter was made with a different digest
+                than the codec, or is not a counter this version can
+                read.
+        """
+
+        saved = json.loads(data)
+        counter = cls(
+            resolutions=[int(resolution) for resolution in saved["sketches"]],
+            codec=codec,
+            embedded_json=embedded_json,
+        )
+        if saved["digest"] != _digest_name(counter.codec):
+            raise ValueError(
+                f"The counter was made with the {saved['digest']} digest, "
+                f"not {_digest_name(counter.codec)}."
+            )
+        counter.events = saved["events"]
+        counter.sketches = {
+            int(resolution): sketch.HyperLogLog.from_bytes(base64.b64decode(encoded))
+            for resolution, encoded in saved["sketches"].items()
+        }
+        return counter
+
+
+class DriftDetector:
+    """ Reports the structures that appear, vanish or change in
+    frequency from one time window to the next in a stream of logs.
+
+    Logs are counted by their fingerprint at the resolution in panes of
+    step seconds, which are aligned to the epoch so that hourly panes
+    start on the hour. A window is the latest window / step panes, so
+    windows tumble when step is the window and slide by step when it is
+    shorter. Each time a pane closes, the window ending with it is
+    compared with the window of the same length just before it.
+
+    Sliding windows overlap, so a structure stays in the latest window
+    for window / step reports. It is only reported as new in the first
+    of them, when the pane that just closed is the only one of the
+    window to hold it, and as vanished in the first report after the
+    last pane to hold it leaves the latest window. Shifted structures
+    are compared afresh in every report. Tumbling windows do not
+    overlap, so these are the same as comparing the two windows.
+
+    Windows are kept as running totals that each closed pane is added
+    to and taken from, and only the counts of the panes in the two
+    windows are retained, along with one exemplar log per structure in
+    them. Memory is therefore bounded by the number of distinct
+    structures times the number of panes retained, however long the
+    stream runs.
+
+    Time is read from the timestamp key path of each log, or is the
+    time each log is checked if there is none. Logs without a usable
+    time, logs older than the open pane, and logs more than max_skew
+    seconds ahead of the clock are counted in the open pane. A single
+    log from the far future would otherwise close every pane up to its
+    time, and leave every later log behind the open pane.
+
+    Example:
+        >>> drift = DriftDetector(window=3600, timestamp="CreationTime")
+        >>> for line in lines:
+        ...     for report in drift.check_line(line):
+        ...         alert(report["new"], report["vanished"], report["shifted"])
+        >>> drift.flush()
+
+    Attributes:
+        window (float): Seconds in a window.
+        step (float): Seconds in a pane, which windows slide by.
+        resolution (int): The resolution structures are compared at.
+        timestamp (str, None): Dotted key path of the time of each log,
+            such as 'CreationTime' or 'event.created'. Numbers are
+            seconds since the epoch and strings are ISO 8601, read as
+            UTC if they have no offset. None to use the time each log
+            is checked.
+        shift_ratio (float): A structure in both windows is reported as
+            shifted when its share of the logs in one window is at
+            least this many times its share in the other.
+        min_count (int): The fewest logs with a structure, in either
+            window, for it to be reported as shifted.
+        max_skew (float, None): The most seconds a log's time may be
+            ahead of the clock. None for no limit, such as to replay
+            logs with a clock of their own.
+        events (int): The number of logs checked.
+        untimed (int): Logs without a usable time.
+        late (int): Logs older than the open pane.
+        skewed (int): Logs more than max_skew seconds ahead of the
+            clock.
+    """
+
+    def __init__(
+        self,
+        window=3600,
+        step=None,
+        resolution=1,
+        timestamp=None,
+        shift_ratio=2.0,
+        min_count=10,
+        max_skew=DEFAULT_MAX_SKEW,
+        codec=None,
+        embedded_json=None,
+    ):
+        """ Init the DriftDetector class
+
+        Args:
+            window (float): See above.
+            step (float, None): See above. None for tumbling windows.
+            resolution (int): See above.
+            timestamp (str, None): See above.
+            shift_ratio (float): See above.
+            min_count (int): See above.
+            max_skew (float, None): See above.
+            codec (Codec, None): Parser and digest used for the logs.
+            embedded_json (EmbeddedJSON, None): When to decode JSON
+                embedded in string values.
+
+        Raises:
+            ValueError: If the window is not a whole number of steps.
+        """
+
+        step = step or window
+        if step <= 0 or window % step:
+            raise ValueError(
+                f"The window must be a whole number of steps: {window}, {step}"
+            )
+        self.window = window
+        self.step = step
+        self.resolution = resolution
+        self.timestamp = timestamp
+        self.shift_ratio = shift_ratio
+        self.min_count = min_count
+        self.max_skew = max_skew
+        self.codec = codec or codec_.DEFAULT_CODEC
+        self.embedded_json = embedded_json or serialize.DEFAULT_POLICY
+        self.events = 0
+        self.untimed = 0
+        self.late = 0
+        self.skewed = 0
+        self._path = tuple(timestamp.split(".")) if timestamp else None
+        self._window_panes = round(window / step)
+        self._pane = {}
+        self._pane_start = None
+        # Closed panes and their log counts, oldest first. The latest
+        # _window_panes make up the window, and those before it the
+        # previous window.
+        self._panes = collections.deque()
+        self._current = {}
+        self._current_events = 0
+        self._previous = {}
+        self._previous_events = 0
+        # The pane that closed last, and the pane that it moved from
+        # the window to the previous window.
+        self._latest = {}
+        self._moved = {}
+        self._exemplars = {}
+
+    def check_line(self, line):
+        """ Parses a raw log line and checks it. See check().
+
+        Args:
+            line (str, bytes): One JSON log.
+        """
+
+        data = serialize.json_transform(
+            line, policy=self.embedded_json, codec=self.codec
+        )
+        return self.check(data)
+
+    def check(self, data, timestamp=None):
+        """ Counts a log, first closing any panes that end at or before
+        its time.
+
+        Args:
+            data (dict, list, str, int): A log that has already been
+                through serialize.json_transform.
+            timestamp (float, None): Seconds since the epoch to use as
+                the time of the log, instead of finding it.
+
+        Returns:
+            list: The report of each window that closed, oldest first.
+                See DriftDetector.report. Usually empty.
+        """
+
+        self.events += 1
+        if timestamp is None:
+            if self._path is None:
+                timestamp = time.time()
+            else:
+                timestamp = timestamp_at(data, self._path)
+        reports = []
+        if timestamp is None:
+            self.untimed += 1
+        elif self._pane_start is not None and timestamp < self._pane_start:
+            self.late += 1
+        elif self.max_skew is not None and timestamp > time.time() + self.max_skew:
+            self.skewed += 1
+        else:
+            reports = self.advance(timestamp)
+
+        new_minion = minion.minion_generator(
+            data, codec=self.codec, max_resolution=self.resolution
+        )
+        fingerprint = new_minion.fingerprint(self.resolution)
+        pane = self._pane
+        count = pane.get(fingerprint)
+        if count is None:
+            pane[fingerprint] = 1
+            self._exemplars.setdefault(fingerprint, new_minion)
+        else:
+            pane[fingerprint] = count + 1
+        return reports
+
+    def advance(self, timestamp=None):
+        """ Closes every pane that ends at or before a time.
+
+        With no timestamp key path, windows only close as logs arrive,
+        so call this now and then to close them on a quiet stream.
+
+        Args:
+            timestamp (float, None): Seconds since the epoch. None for
+                now.
+
+        Returns:
+            list: The report of each window that closed, oldest first.
+        """
+
+        if timestamp is None:
+            timestamp = time.time()
+        start = timestamp - timestamp % self.step
+        if self._pane_start is None:
+            self._pane_start = start
+            return []
+
+        reports = []
+        while self._pane_start < start:
+            if not (self._pane or self._current or self._previous):
+                # Every pane left is empty, so skip them up to the time
+                # rather than closing each one.
+                self._pane_start = start
+                break
+            report = self._close()
+            if report["events"] or report["previous_events"]:
+                reports.append(report)
+        return reports
+
+    def flush(self):
+        """ Closes the open pane, such as at the end of the input.
+
+        Returns:
+            list: The report of the window that closed, or nothing if
+                no logs were checked.
+        """
+
+        if self._pane_start is None:
+            if not self._pane:
+                return []
+            self.advance()
+        return [self._close()]
+
+    def _close(self):
+        """ Closes the open pane, moves the windows along by a pane and
+        returns their report. """
+
+        pane, events = self._pane, sum(self._pane.values())
+        panes = self._panes
+        panes.append((pane, events))
+        _add_counts(self._current, pane)
+        self._current_events += events
+        self._latest, self._moved = pane, {}
+
+        if len(panes) > self._window_panes:
+            # The oldest pane of the window moves to the previous one.
+            moved, moved_events = panes[-self._window_panes - 1]
+            _subtract_counts(self._current, moved)
+            self._current_events -= moved_events
+            _add_counts(self._previous, moved)
+            self._previous_events += moved_events
+            self._moved = moved
+
+        if len(panes) > 2 * self._window_panes:
+            dropped, dropped_events = panes.popleft()
+            _subtract_counts(self._previous, dropped)
+            self._previous_events -= dropped_events
+            for fingerprint in dropped:
+                if fingerprint in self._previous or fingerprint in self._current:
+                    continue
+                del self._exemplars[fingerprint]
+
+        end = self._pane_start + self.step
+        self._pane = {}
+        self._pane_start = end
+        return self.report(end)
+
+    def report(self, end=None):
+        """ Compares the latest window with the one before it.
+
+        Shapes are listed most common first, each as a dict of its hash,
+        model, count in the window and count in the previous window.
+        Shifted shapes also have their share of the logs in each.
+
+        Example:
+            >>> drift.report()
+            {'start': '2019-01-18T09:00:00+00:00',
+             'end': '2019-01-18T10:00:00+00:00',
+             'events': 30114, 'previous_events': 29870, 'shapes': 41,
+             'new': [{'hash': '6c1d...', 'model': {...}, 'count': 75,
+                      'previous_count': 0}],
+             'vanished': [], 'shifted': []}
+
+        Args:
+            end (float, None): When the latest window ended, in seconds
+                since the epoch. None for the end of the latest closed
+                pane.
+
+        Returns:
+            dict: The window's start and end, its number of logs and
+                structures, and the new, vanished and shifted shapes.
+                Every shape is new in the first window it is in.
+        """
+
+        if end is None and self._panes:
+            end = self._pane_start
+        current, previous = self._current, self._previous
+        events, previous_events = self._current_events, self._previous_events
+
+        # A structure only in the latest pane was not in the window of
+        # the last report, and one only left this window if it was in
+        # the pane that moved out of it.
+        latest, moved = self._latest, self._moved
+        new = [
+            key
+            for key, count in current.items()
+            if key not in previous and count == latest.get(key)
+        ]
+        vanished = [key for key in previous if key not in current and key in moved]
+        shifted = []
+        if events and previous_events:
+            for key, count in current.items():
+                previous_count = previous.get(key)
+                if previous_count is None:
+                    continue
+                if max(count, previous_count) < self.min_count:
+                    continue
+                share = count / events
+                previous_share = previous_count / previous_events
+                if (
+                    share >= previous_share * self.shift_ratio
+                    or previous_share >= share * self.shift_ratio
+                ):
+                    shifted.append(key)
+
+        def shapes(keys, shares=False):
+            records = []
+            for key in keys:
+                count, previous_count = current.get(key, 0), previous.get(key, 0)
+                record = {
+                    "hash": key.hex(),
+                    "model": self._exemplars[key].model(self.resolution),
+                    "count": count,
+                    "previous_count": previous_count,
+                }
+                if shares:
+                    record["share"] = round(count / events, 6)
+                    record["previous_share"] = round(
+                        previous_count / previous_events, 6
+                    )
+                records.append(record)
+            records.sort(
+                key=lambda record: -max(record["count"], record["previous_count"])
+            )
+            return records
+
+        return {
+            "start": _isoformat(end - self.window) if end is not None else None,
+            "end": _isoformat(end) if end is not None else None,
+            "events": events,
+            "previous_events": previous_events,
+            "shapes": len(current),
+            "new": shapes(new),
+            "vanished": shapes(vanished),
+            "shifted": shapes(shifted, shares=True),
+        }
+
+    def __len__(self):
+        return len(self._exemplars)
+
+
+def timestamp_at(data, path):
+    """ Returns the time of a log from the value at a key path.
+
+    Args:
+        data (dict, list, str, int): A log that has already been
+            through serialize.json_transform.
+        path (tuple): The keys leading to the value.
+
+    Returns:
+        float: Seconds since the epoch. Numbers are taken to be seconds
+            since the epoch, and strings to be ISO 8601 times, in UTC
+            if they have no offset.
+        None: If there is no such value, or it is not a time.
+    """
+
+    value = data
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    if value[-1:] in ("Z", "z"):
+        value = value[:-1] + "+00:00"
+    try:
+        parsed = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.timestamp()
+
+
+def _add_counts(totals, counts):
+    for key, count in counts.items():
+        totals[key] = totals.get(key, 0) + count
+
+
+def _subtract_counts(totals, counts):
+    for key, count in counts.items():
+        remaining = totals[key] - count
+        if remaining:
+            totals[key] = remaining
+        else:
+            del totals[key]
+
+
+def _isoformat(seconds):
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).isoformat()
+
+
+def _digest_name(codec):
+    return f"{codec.digest_name}/{codec.digest_size}"
@@ -0,0 +1,68 @@
+""" The traversal core shared by the walks over logs and minions.
+
+Logs can be nested arbitrarily deep, especially once JSON embedded in
+strings has been decoded into further nesting, so walks over them keep
+an explicit stack rather than recursing. This has no depth limit, and
+avoids a Python function call per level in the hottest loops.
+"""
+
+
+def fold(root, expand, finish, depth=0):
+    """ Folds a tree bottom-up, without recursion.
+
+    Each node is expanded once, top-down. A leaf's value comes straight
+    from expand. A node with children is finished once the values of
+    all of its children are known, bottom-up, and its value is passed
+    on to its parent.
+
+    Example:
+        >>> def expand(node, depth):
+        ...     if isinstance(node, list):
+        ...         return None, node
+        ...     return node, None
+        >>> fold([1, [2, 3]], expand, lambda node, state, values: sum(values))
+        6
+
+    Args:
+        root: The root node.
+        expand (callable): Called with each node and its depth. Returns
+            a tuple of either the node's value and None, for a leaf, or
+            any state to be passed to finish and an iterable of the
+            node's children.
+        finish (callable): Called with a node with children, the state
+            expand returned for it and a list of the values of its
+            children, in order. The list is not used again, so it may
+            be returned or kept. Returns the node's value.
+        depth (int): The depth of the root.
+
+    Returns:
+        The value of the root.
+    """
+
+    value, children = expand(root, depth)
+    if children is None:
+        return value
+
+    # Each frame is a node whose children are being expanded, with its
+    # state, an iterator over the children left and their values so
+    # far. Leaf children are handled in a tight loop without a frame.
+    stack = []
+    node, state, remaining, values = root, value, iter(children), []
+    depth += 1
+    while True:
+        for child in remaining:
+            value, children = expand(child, depth)
+            if children is None:
+                values.append(value)
+                continue
+            stack.append((node, state, remaining, values))
+            node, state, remaining, values = child, value, iter(children), []
+            depth += 1
+            break
+        else:
+            value = finish(node, state, values)
+            if not stack:
+                return value
+            node, state, remaining, values = stack.pop()
+            values.append(value)
+            depth -= 1
@@ -0,0 +1,66 @@
+""" Random logs shared by the tests. """
+
+import random
+
+
+# A small vocabulary, so that many of the random logs share structure
+# at some resolutions and differ at others.
+KEYS = ["id", "type", "actor", "props", "name", "value"]
+VALUES = ["a", "b", 1, 2, 3.5, True, None]
+
+# Logs that are not dicts, and empty containers, are logs too.
+ODD_LOGS = [[], {}, "edge", 7, [1, 2], [[]], [{}], {"id": []}]
+
+
+def random_value(rng, depth, keys=KEYS, values=VALUES):
+    """ Returns a random JSON value nested at most depth deep. """
+
+    roll = rng.random()
+    if depth <= 0 or roll < 0.35:
+        return rng.choice(values)
+    if roll < 0.45:
+        return rng.choice([{}, []])
+    if roll < 0.55:
+        # A list with only edges in it.
+        return [rng.choice(values) for _ in range(rng.randint(1, 3))]
+    if roll < 0.75:
+        return [
+            random_value(rng, depth - 1, keys, values)
+            for _ in range(rng.randint(1, 3))
+        ]
+    return {
+        key: random_value(rng, depth - 1, keys, values)
+        for key in rng.sample(keys, rng.randint(1, 4))
+    }
+
+
+def random_log(rng, depth=5, keys=KEYS, values=VALUES):
+    """ Returns a random dict whose values are nested up to depth. """
+
+    return {
+        key: random_value(rng, rng.randint(0, depth), keys, values)
+        for key in rng.sample(keys, rng.randint(1, 4))
+    }
+
+
+def random_logs(seed, count=300, odd=True, **kwargs):
+    """ Returns count random logs, followed by ODD_LOGS if odd is True.
+    Keyword arguments are passed to random_log. """
+
+    rng = random.Random(seed)
+    logs = [random_log(rng, **kwargs) for _ in range(count)]
+    if odd:
+        logs += ODD_LOGS
+    return logs
+
+
+def shuffled(rng, value):
+    """ The same value with the keys of every dict in a random order. """
+
+    if isinstance(value, dict):
+        items = list(value.items())
+        rng.shuffle(items)
+        return {key: shuffled(rng, item) for key, item in items}
+    if isinstance(value, list):
+        return [shuffled(rng, item) for item in value]
+    return value
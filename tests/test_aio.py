@@ -0,0 +1,82 @@
+import asyncio
+import json
+
+import pytest
+
+from json_inspect import master
+
+
+LINES = [
+    json.dumps(log)
+    for log in [
+        {"id": 1, "actor": {"name": "a"}},
+        {"id": 2, "actor": {"name": "b", "type": 1}},
+        {"id": 3, "props": [{"name": "a"}, {"value": 2}]},
+        {"id": 4},
+        [1, {"id": 5}],
+    ]
+    * 20
+]
+
+
+async def producer(lines):
+    """ Stands in for an asyncio log collector. """
+
+    for line in lines:
+        await asyncio.sleep(0)
+        yield line
+
+
+def structures(m):
+    return [minion_.hash(-1) for minion_ in m.minions.filtered(0)]
+
+
+def expected(lines):
+    m = master.Master(input_string="[" + ",".join(lines) + "]")
+    m.make()
+    return structures(m)
+
+
+def test_feed_matches_make():
+    m = master.Master()
+    new = []
+    m.feeder(queue_size=8, batch_size=4, on_new=lambda minion_: new.append(minion_))
+    asyncio.run(m.feed(producer(LINES)))
+    assert structures(m) == expected(LINES)
+    assert len(new) == m.unique_count(1)
+
+
+def test_feed_from_several_event_loops():
+    m = master.Master()
+    half = len(LINES) // 2
+    asyncio.run(m.feed(producer(LINES[:half])))
+    asyncio.run(m.feed(producer(LINES[half:])))
+    assert structures(m) == expected(LINES)
+
+
+def test_logs_queued_when_a_loop_ends_are_modeled_on_the_next():
+    m = master.Master()
+    m.feeder(batch_size=2)
+
+    async def queue_only():
+        for line in LINES[:5]:
+            m.feed_nowait(line)
+
+    asyncio.run(queue_only())
+    asyncio.run(asyncio.wait_for(m.drain(), timeout=10))
+    assert structures(m) == expected(LINES[:5])
+
+
+def test_feed_nowait_pushes_back_when_full():
+    m = master.Master()
+    m.feeder(queue_size=2)
+
+    async def flood():
+        m.feed_nowait(LINES[0])
+        m.feed_nowait(LINES[1])
+        with pytest.raises(asyncio.QueueFull):
+            m.feed_nowait(LINES[2])
+        await m.drain()
+
+    asyncio.run(flood())
+    assert m.minions.events == 2
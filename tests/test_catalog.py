@@ -0,0 +1,114 @@
+import json
+import os
+
+import pytest
+
+from json_inspect import catalog as catalog_
+from json_inspect import codec as codec_
+from json_inspect import master
+from json_inspect import minion
+
+
+RUN_1 = [{"id": 1}, {"id": 2, "actor": {"name": "a"}}, {"id": 3}]
+RUN_2 = [
+    {"id": 4, "actor": {"name": "b", "type": 1}},
+    {"id": 5, "props": [{"name": "c"}]},
+]
+
+
+def write(path, logs):
+    with open(path, "w") as f:
+        f.writelines(json.dumps(log) + "\n" for log in logs)
+
+
+def run(directory, catalog):
+    m = master.Master(catalog=str(catalog), input_file=str(directory), aggregate=True)
+    m.make()
+    return m
+
+
+def hashes(logs, resolution):
+    m = master.Master(input_string=json.dumps(logs))
+    m.make()
+    return set(m.minions.uniques(resolution))
+
+
+def test_second_run_skips_unchanged_files(tmp_path):
+    logs, catalog = tmp_path / "logs", tmp_path / "shapes.db"
+    logs.mkdir()
+    write(str(logs / "a.json"), RUN_1)
+    assert run(logs, catalog).minions.events == len(RUN_1)
+
+    write(str(logs / "b.json"), RUN_2)
+    second = run(logs, catalog)
+    assert second.minions.events == len(RUN_2)
+
+    reopened = catalog_.Catalog(str(catalog), codec_.DEFAULT_CODEC)
+    assert reopened.has_file(str(logs / "a.json"))
+    assert reopened.has_file(str(logs / "b.json"))
+    # A file that changed is read again.
+    write(str(logs / "a.json"), RUN_1 + [{"id": 6}])
+    os.utime(str(logs / "a.json"), (1, 1))
+    assert not reopened.has_file(str(logs / "a.json"))
+    reopened.close()
+    assert run(logs, catalog).minions.events == len(RUN_1) + 1
+
+
+def test_nothing_to_read_starts_no_run(tmp_path):
+    logs, catalog = tmp_path / "logs", tmp_path / "shapes.db"
+    logs.mkdir()
+    write(str(logs / "a.json"), RUN_1)
+    run(logs, catalog)
+    again = run(logs, catalog)
+    assert again.minions.events == 0
+    assert again.catalog.run is None
+    assert again.new_models(1) == {}
+
+
+@pytest.mark.parametrize("resolution", [0, 1, 2])
+def test_new_models_are_only_those_of_the_latest_run(tmp_path, resolution):
+    logs, catalog = tmp_path / "logs", tmp_path / "shapes.db"
+    logs.mkdir()
+    write(str(logs / "a.json"), RUN_1)
+    first = run(logs, catalog)
+    assert set(first.new_models(resolution)) == hashes(RUN_1, resolution)
+
+    write(str(logs / "b.json"), RUN_2)
+    second = run(logs, catalog)
+    expected = hashes(RUN_2, resolution) - hashes(RUN_1, resolution)
+    assert set(second.new_models(resolution)) == expected
+
+
+def garage(logs):
+    garage_ = master.MinionGarage(aggregate=True)
+    for log in logs:
+        garage_.append(log)
+    return garage_
+
+
+def test_seen_times_and_counts_update(tmp_path):
+    catalog = catalog_.Catalog(str(tmp_path / "shapes.db"), codec_.DEFAULT_CODEC)
+    catalog.start_run("first")
+    assert len(catalog.update(garage(RUN_1), seen=100.0)) == 2
+    catalog.start_run("second")
+    new = catalog.update(garage(RUN_1[:1] + RUN_2), seen=200.0)
+    assert [shape.exemplar.data(-1) for shape in new] == RUN_2
+
+    shapes = {row["hash"]: row for row in catalog.shapes()}
+    again = shapes[minion.minion_generator(RUN_1[0]).hash(-1)]
+    assert (again["first_seen"], again["last_seen"]) == (100.0, 200.0)
+    assert (again["count"], again["first_run"]) == (3, 1)
+    once = shapes[minion.minion_generator(RUN_1[1]).hash(-1)]
+    assert (once["first_seen"], once["last_seen"], once["count"]) == (100.0, 100.0, 1)
+    for log in RUN_2:
+        row = shapes[minion.minion_generator(log).hash(-1)]
+        assert (row["first_seen"], row["last_seen"]) == (200.0, 200.0)
+        assert row["first_run"] == 2
+    catalog.close()
+
+
+def test_other_digest_is_rejected(tmp_path):
+    path = str(tmp_path / "shapes.db")
+    catalog_.Catalog(path, codec_.DEFAULT_CODEC).close()
+    with pytest.raises(ValueError, match="digest"):
+        catalog_.Catalog(path, codec_.Codec(digest="blake2b"))
@@ -0,0 +1,41 @@
+import pytest
+
+from json_inspect import codec as codec_
+from json_inspect import minion
+
+import helpers
+
+
+CODECS = [codec_.Codec(digest="md5"), codec_.Codec(digest="blake2b")]
+
+def groups(keys):
+    """ Partitions positions by key, as a set of frozensets. """
+
+    partition = {}
+    for position, key in enumerate(keys):
+        partition.setdefault(key, set()).add(position)
+    return {frozenset(positions) for positions in partition.values()}
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("codec", CODECS, ids=lambda codec: codec.digest_name)
+def test_fingerprints_group_like_hasher(codec, seed):
+    logs = helpers.random_logs(seed)
+    minions = [minion.minion_generator(log, codec=codec) for log in logs]
+    depth = max(minion_.depth for minion_ in minions)
+
+    for resolution in range(-1, depth + 2):
+        fingerprints = [minion_.fingerprint(resolution) for minion_ in minions]
+        hashes = [minion.hasher(minion_.model(resolution)) for minion_ in minions]
+        assert groups(fingerprints) == groups(hashes), resolution
+
+
+@pytest.mark.parametrize("codec", CODECS, ids=lambda codec: codec.digest_name)
+def test_fingerprints_are_deterministic(codec):
+    logs = helpers.random_logs(3, count=100)
+    first = [minion.minion_generator(log, codec=codec) for log in logs]
+    second = [minion.minion_generator(log, codec=codec) for log in logs]
+    for one, other in zip(first, second):
+        for resolution in range(-1, one.depth + 1):
+            assert one.fingerprint(resolution) == other.fingerprint(resolution)
+            assert len(one.fingerprint(resolution)) == codec.digest_size
@@ -0,0 +1,69 @@
+import json
+import random
+
+import pytest
+
+from json_inspect import flatten
+from json_inspect import master
+
+import helpers
+
+
+# Dotted keys, which can collide once flattened.
+KEYS = helpers.KEYS + ["a.b", "a"]
+
+
+def logs(seed, count=200):
+    """ Logs of a few structures, each with its keys in random orders. """
+
+    rng = random.Random(seed)
+    bases = [helpers.random_value(rng, 4, keys=KEYS) for _ in range(20)]
+    return [helpers.shuffled(rng, rng.choice(bases)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_flattener_matches_flatten(seed):
+    flattener = flatten.Flattener()
+    for log in logs(seed):
+        expected = flatten.flatten(log)
+        flattened = flattener.flatten(log)
+        assert list(flattened.items()) == list(expected.items())
+    assert flattener.hits
+
+
+@pytest.mark.parametrize(
+    "log", [{"a.b": 1, "a": {"b": 2}}, {"a": {"b": 2}, "a.b": 1}], ids=["first", "last"]
+)
+def test_colliding_keys(log):
+    flattener = flatten.Flattener()
+    # Learn the other key order first, so the log must not reuse it.
+    flattener.flatten(dict(reversed(list(log.items()))))
+    assert list(flattener.flatten(log).items()) == list(flatten.flatten(log).items())
+
+
+def test_deep_log():
+    log = value = {}
+    for _ in range(1200):
+        value["a"] = {"b": 1}
+        value = value["a"]
+    expected = flatten.flatten(log)
+    assert len(expected) == 1200
+    flattener = flatten.Flattener()
+    assert flattener.flatten(log) == expected
+    assert flattener.flatten(log) == expected
+    assert flattener.hits == 1
+
+
+def test_master_flattener(tmp_path):
+    sample = logs(3, count=50)
+    m = master.Master(input_string=json.dumps(sample))
+    m.make()
+    flattener = m.flattener()
+    for log in sample:
+        assert list(flattener.flatten(log).items()) == list(
+            flatten.flatten(log).items()
+        )
+    output = tmp_path / "flat.jsonl"
+    m.write_flattened(str(output))
+    written = [json.loads(line) for line in output.read_text().splitlines()]
+    assert written == [flatten.flatten(log) for log in sample]
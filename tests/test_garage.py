@@ -0,0 +1,136 @@
+import itertools
+import json
+import random
+
+import pytest
+
+from json_inspect import codec as codec_
+from json_inspect import master
+
+import helpers
+
+
+def shards(seed, count=4, **kwargs):
+    rng = random.Random(seed)
+    garages = []
+    for _ in range(count):
+        garage = master.MinionGarage(**kwargs)
+        for _ in range(rng.randint(20, 60)):
+            garage.append(helpers.random_value(rng, 4))
+        garages.append(garage)
+    return garages
+
+
+def summary(garage):
+    """ What a merged garage reports at every tier. """
+
+    tiers = range(1, garage.depth + 2)
+    return {
+        "events": garage.events,
+        "depth": garage.depth,
+        "count": [garage.count(tier) for tier in tiers],
+        "unique_count": [len(garage.hashes(tier)) for tier in tiers],
+        "hashes": [garage.hashes(tier) for tier in tiers],
+        "shapes": sorted(
+            (shape.exemplar.hash(-1), shape.count) for shape in garage.shapes()
+        ),
+    }
+
+
+def merge_left(garages):
+    merged = garages[0]
+    for garage in garages[1:]:
+        merged = merged.merge(garage)
+    return merged
+
+
+def merge_right(garages):
+    merged = garages[-1]
+    for garage in reversed(garages[:-1]):
+        merged = garage.merge(merged)
+    return merged
+
+
+def merge_tree(garages):
+    if len(garages) == 1:
+        return garages[0]
+    middle = len(garages) // 2
+    return merge_tree(garages[:middle]).merge(merge_tree(garages[middle:]))
+
+
+@pytest.mark.parametrize(
+    "settings",
+    [{}, {"aggregate": True}, {"compact": True}, {"max_resolution": 2}],
+    ids=["plain", "aggregate", "compact", "max_resolution"],
+)
+@pytest.mark.parametrize("seed", [0, 1])
+def test_merge_order(settings, seed):
+    garages = shards(seed, **settings)
+    expected = summary(merge_left(garages))
+    for order in itertools.permutations(garages):
+        order = list(order)
+        for merge in (merge_left, merge_right, merge_tree):
+            assert summary(merge(order)) == expected
+
+
+def test_merge_matches_single_garage():
+    garages = shards(2, aggregate=True)
+    whole = master.MinionGarage(aggregate=True)
+    for garage in garages:
+        whole.absorb(garage)
+    assert summary(merge_tree(garages)) == summary(whole)
+
+
+def test_merge_rejects_other_digest():
+    garage = shards(3, count=1)[0]
+    other = master.MinionGarage(codec=codec_.Codec(digest="blake2b"))
+    other.append({"id": 1})
+    with pytest.raises(ValueError):
+        garage.merge(other)
+
+
+@pytest.mark.parametrize("name", ["snapshot.jsonl", "snapshot.jsonl.gz"])
+def test_snapshot_round_trip(tmp_path, name):
+    garage = merge_tree(shards(4))
+    path = str(tmp_path / name)
+    assert garage.write_snapshot(path) == len(garage.shapes())
+    loaded = master.MinionGarage.from_snapshot(path)
+    assert summary(loaded) == summary(garage)
+    # A loaded garage merges like any other.
+    extra = shards(5, count=1)[0]
+    assert summary(loaded.merge(extra)) == summary(garage.merge(extra))
+
+
+def test_snapshot_round_trip_blake2b(tmp_path):
+    blake2b = codec_.Codec(digest="blake2b", digest_size=16)
+    garage = merge_tree(shards(6, codec=blake2b))
+    path = str(tmp_path / "snapshot.jsonl")
+    garage.write_snapshot(path)
+    loaded = master.MinionGarage.from_snapshot(path)
+    assert loaded.codec.digest_name == "blake2b"
+    assert summary(loaded) == summary(garage)
+
+
+def test_snapshot_rejects_other_version(tmp_path):
+    path = tmp_path / "snapshot.jsonl"
+    merge_tree(shards(7)).write_snapshot(str(path))
+    header, *records = path.read_text().splitlines()
+    header = json.loads(header)
+    header["version"] = master.SNAPSHOT_VERSION + 1
+    path.write_text("\n".join([json.dumps(header)] + records) + "\n")
+    with pytest.raises(ValueError, match="version"):
+        master.MinionGarage.from_snapshot(str(path))
+
+
+def test_snapshot_rejects_other_digest(tmp_path):
+    path = str(tmp_path / "snapshot.jsonl")
+    merge_tree(shards(8)).write_snapshot(path)
+    with pytest.raises(ValueError, match="do not match"):
+        master.MinionGarage.from_snapshot(path, codec=codec_.Codec(digest="blake2b"))
+
+
+def test_snapshot_rejects_other_file(tmp_path):
+    path = tmp_path / "logs.jsonl"
+    path.write_text('{"id": 1}\n')
+    with pytest.raises(ValueError, match="not a garage snapshot"):
+        master.MinionGarage.from_snapshot(str(path))
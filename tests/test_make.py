@@ -0,0 +1,85 @@
+import bz2
+import gzip
+import json
+import random
+
+import pytest
+
+from json_inspect import master
+from json_inspect import serialize
+
+import helpers
+
+
+def write_inputs(directory):
+    """ Writes logs of a few repeated structures to plain, compressed,
+    empty and unterminated files, in the order they are read. """
+
+    rng = random.Random(0)
+    pool = helpers.random_logs(0, count=30, depth=3)
+    logs = [rng.choice(pool) for _ in range(400)]
+    lines = [json.dumps(log) for log in logs]
+    files = [
+        ("a.json", open, "\n".join(lines[:200]) + "\n"),
+        ("b.json.gz", gzip.open, "\n".join(lines[200:280]) + "\n"),
+        ("c.json", open, ""),
+        ("d.jsonl.bz2", bz2.open, "\n".join(lines[280:320]) + "\n"),
+        # No newline after the last log.
+        ("e.json", open, "\n".join(lines[320:])),
+    ]
+    for name, opener, text in files:
+        with opener(str(directory / name), "wt") as f:
+            f.write(text)
+    return logs
+
+
+def made(directory, workers, **kwargs):
+    m = master.Master(input_file=str(directory), **kwargs)
+    m.make(workers=workers)
+    return m
+
+
+def summary(m):
+    garage = m.minions
+    tiers = range(0, garage.depth + 2)
+    return {
+        "count": [m.count(tier) for tier in tiers],
+        "unique_count": [m.unique_count(tier) for tier in tiers],
+        "uniques": [
+            [(hash_, unique.data(-1)) for hash_, unique in garage.uniques(tier).items()]
+            for tier in tiers
+        ],
+        "shapes": [
+            (
+                shape.exemplar.hash(-1),
+                shape.count,
+                shape.first_line,
+                shape.last_line,
+                shape.exemplar.data(-1),
+            )
+            for shape in garage.shapes()
+        ],
+    }
+
+
+def test_shards_split_the_plain_file(tmp_path):
+    write_inputs(tmp_path)
+    assert len(serialize.file_shards(str(tmp_path / "a.json"), 12)) > 1
+    assert serialize.file_shards(str(tmp_path / "b.json.gz"), 12) == [(0, None)]
+    assert serialize.file_shards(str(tmp_path / "c.json"), 12) == [(0, 0)]
+
+
+@pytest.mark.parametrize("aggregate", [False, True], ids=["every_log", "aggregate"])
+def test_parallel_make_matches_serial(tmp_path, aggregate):
+    logs = write_inputs(tmp_path)
+    serial = made(tmp_path, 1, aggregate=aggregate)
+    parallel = made(tmp_path, 3, aggregate=aggregate)
+    assert serial.minions.events == parallel.minions.events == len(logs)
+    assert summary(parallel) == summary(serial)
+    if not aggregate:
+        data = [minion_.data(-1) for minion_ in parallel.minions.filtered(0)]
+        assert data == logs
+    else:
+        shapes = parallel.minions.shapes()
+        assert shapes[0].first_line == 0
+        assert max(shape.last_line for shape in shapes) == len(logs) - 1
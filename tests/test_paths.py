@@ -0,0 +1,146 @@
+import collections
+import json
+
+import pytest
+
+from json_inspect import master
+from json_inspect import paths
+
+import helpers
+
+
+LOGS = [
+    {"id": 1, "actor": [{"id": "a", "type": 1}, {"id": "b"}]},
+    {"id": 2, "actor": [{"id": "c", "type": 2}]},
+    {"id": 3, "props": {"name": "x", "value": [1, 2]}},
+    {"id": 4, "props": {"name": "y", "value": []}},
+    [1, {"id": 5}],
+    "edge",
+]
+
+
+def expected_paths(value, path="", parts=0, max_parts=None):
+    """ The key paths of a log, worked out from the log itself. """
+
+    found = {path} if parts else set()
+    if max_parts is not None and parts >= max_parts:
+        return found
+    if isinstance(value, dict):
+        for key, item in value.items():
+            child = f"{path}.{key}" if path else key
+            found |= expected_paths(item, child, parts + 1, max_parts)
+    elif isinstance(value, list):
+        for item in value:
+            found |= expected_paths(item, path + "[]", parts + 1, max_parts)
+    return found
+
+
+def expected_counts(logs, max_parts=None):
+    counts = collections.Counter()
+    for log in logs:
+        counts.update(expected_paths(log, max_parts=max_parts))
+    return counts
+
+
+def made(logs=LOGS, **kwargs):
+    m = master.Master(input_string=json.dumps(logs), index_paths=True, **kwargs)
+    m.make()
+    return m
+
+
+def test_lookups():
+    index = made().path_index
+    assert index.events == len(LOGS)
+    assert index.count("actor[].id") == 2
+    assert index.count("actor[].type") == 2
+    assert index.count("props.value[]") == 1
+    assert index.count("[].id") == 1
+    assert index.count("missing") == 0
+    assert "actor[]" in index and "actor" in index and "missing" not in index
+
+    assert index.prefix("props") == {
+        "props": 2,
+        "props.name": 2,
+        "props.value": 2,
+        "props.value[]": 1,
+    }
+    assert index.prefix("actor[].") == {"actor[].id": 2, "actor[].type": 2}
+    assert index.prefix("zzz") == {}
+    assert index.frequencies("id") == [("id", 4, 4 / len(LOGS))]
+
+    shapes = index.lookup("props.name")
+    assert sorted(shapes.values()) == [1, 1]
+    for shape in shapes:
+        assert "props.name" in index.shape_paths(shape)
+    assert index.lookup("missing") == {}
+    with pytest.raises(KeyError):
+        index.shape_paths("00" * 16)
+
+
+def test_counts_of_repeated_shapes():
+    logs = LOGS * 3 + [{"id": 9, "actor": [{"id": "d", "type": 3}]}]
+    m = made(logs)
+    index = m.path_index
+    assert index.count("actor[].type") == 7
+    # Counts are brought up to date by the next query.
+    m.make(input_string=json.dumps([{"actor": []}]))
+    assert index.count("actor") == 8
+    assert index.count("actor[].type") == 7
+
+    shapes = index.lookup("actor[].type")
+    assert list(shapes.values()) == [4, 3]
+    assert sum(shapes.values()) == index.count("actor[].type")
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{}, {"compact": True}, {"aggregate": True}, {"max_resolution": 2}],
+    ids=["plain", "compact", "aggregate", "max_resolution"],
+)
+def test_counts_match_the_logs(kwargs):
+    logs = helpers.random_logs(41)
+    max_parts = kwargs.get("max_resolution")
+    if max_parts is not None:
+        max_parts += 1
+    expected = expected_counts(logs, max_parts)
+
+    index = made(logs, **kwargs).path_index
+    assert len(index) == len(expected)
+    assert index.prefix("") == dict(sorted(expected.items()))
+    for path, count in expected.items():
+        assert index.count(path) == count
+        assert sum(index.lookup(path).values()) == count
+
+
+def test_parallel_make_merges_the_index(tmp_path):
+    logs = helpers.random_logs(42)
+    for number in range(3):
+        with open(tmp_path / f"{number}.json", "w") as f:
+            f.writelines(json.dumps(log) + "\n" for log in logs[number::3])
+
+    m = master.Master(input_file=str(tmp_path), index_paths=True)
+    m.make(workers=3)
+    assert m.path_index.events == len(logs)
+    assert m.path_index.prefix("") == dict(sorted(expected_counts(logs).items()))
+
+
+def test_key_paths_of_a_minion():
+    m = made()
+    first = next(iter(m.minions.filtered(1)))
+    assert paths.key_paths(first) == {
+        "id",
+        "actor",
+        "actor[]",
+        "actor[].id",
+        "actor[].type",
+    }
+    assert paths.key_paths(first, max_parts=1) == {"id", "actor"}
+
+
+def test_index_is_opt_in():
+    m = made()
+    m2 = master.Master(input_string=json.dumps(LOGS))
+    m2.make()
+    assert m.path_index is m.minions.path_index
+    with pytest.raises(ValueError):
+        m2.path_index
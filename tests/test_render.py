@@ -0,0 +1,123 @@
+import asyncio
+import gc
+import json
+
+import pytest
+
+from json_inspect import master
+from json_inspect import render
+
+
+LOGS = [
+    {"id": 1, "actor": {"name": "a"}},
+    {"id": 2, "actor": {"name": "b", "type": 1}},
+    {"id": 3, "props": [{"name": "a"}, {"value": 2}]},
+    [1, {"id": 5}],
+]
+
+
+def made(logs=LOGS, **kwargs):
+    m = master.Master(input_string=json.dumps(logs), **kwargs)
+    m.make()
+    return m
+
+
+def test_repeated_output_is_identical(tmp_path):
+    m = made()
+    outputs = []
+    for name in ("first.json", "second.json"):
+        path = tmp_path / name
+        m.write_unique_models(str(path), resolution=2, indent=2)
+        m.write_unique_data(str(tmp_path / f"data-{name}"), resolution=2)
+        outputs.append((path.read_bytes(), (tmp_path / f"data-{name}").read_bytes()))
+    assert outputs[0] == outputs[1]
+
+    uncached = made(render_cache_bytes=0)
+    path = tmp_path / "uncached.json"
+    uncached.write_unique_models(str(path), resolution=2, indent=2)
+    assert path.read_bytes() == outputs[0][0]
+    assert len(uncached.render_cache) == 0
+
+
+def test_hits_increase():
+    m = made()
+    m.print_unique_models(resolution=1)
+    before = m.render_cache.info()
+    assert before["misses"] and before["bytes"] > 0
+    m.print_unique_models(resolution=1)
+    after = m.render_cache.info()
+    assert after["hits"] > before["hits"]
+    assert after["misses"] == before["misses"]
+
+
+def test_rendered_values_are_cached_once():
+    m = made()
+    m.print_unique_data(resolution=2)
+    kinds = {key[0] for key in m.render_cache._entries}
+    assert kinds == {"uniques", "data", "json"}
+
+
+def test_eviction_at_the_byte_bound():
+    value = "x" * 1000
+    size = render.approximate_size(value)
+    cache = render.RenderCache(max_bytes=3 * size)
+    for key in range(5):
+        cache.get(key, lambda: value)
+    assert len(cache) == 3 and cache.evictions == 2
+    assert cache.bytes == 3 * size <= cache.max_bytes
+    assert 0 not in cache and 4 in cache
+
+    # Using a value makes it the last to be evicted.
+    cache.get(2, lambda: pytest.fail("cached"))
+    cache.get(5, lambda: value)
+    assert 2 in cache and 3 not in cache
+
+
+def test_values_larger_than_the_bound_are_not_kept():
+    cache = render.RenderCache(max_bytes=100)
+    cache.get("small", lambda: "x")
+    assert cache.get("big", lambda: "x" * 1000) == "x" * 1000
+    assert "big" not in cache and "small" in cache
+
+
+def test_approximate_size_counts_nested_values():
+    nested = {"a": ["x" * 1000, {"b": "y" * 1000}]}
+    assert render.approximate_size(nested) > 2000
+    deep = value = []
+    for _ in range(5000):
+        value.append([])
+        value = value[0]
+    assert render.approximate_size(deep) > 5000
+
+
+def test_cleared_after_make():
+    m = made()
+    m.print_unique_models(resolution=1)
+    assert len(m.render_cache)
+    m.make(input_string=json.dumps([{"new": {"shape": 1}}]))
+    m.print_unique_models(resolution=1)
+    assert ("model", list(m.minions.filtered(1))[-1].hash(1), 1) in m.render_cache
+    assert m.render_cache.info()["hits"] == 0
+
+
+def test_cleared_after_feed():
+    m = made()
+    m.print_unique_models(resolution=1)
+    misses = m.render_cache.misses
+    asyncio.run(m.feed([json.dumps({"fed": [1, 2]})]))
+    m.print_unique_models(resolution=1)
+    assert m.render_cache.hits == 0
+    assert m.render_cache.misses > misses
+    hashes = {key[1] for key in m.render_cache._entries if key[0] == "model"}
+    assert list(m.minions.filtered(1))[-1].hash(1) in hashes
+
+
+def test_stamp_does_not_keep_the_garage_alive():
+    m = made()
+    m.print_unique_models(resolution=1)
+    garage = m.minions
+    m.minions = master.MinionGarage()
+    del garage
+    gc.collect()
+    (reference, _) = m.render_cache._stamp
+    assert reference() is None
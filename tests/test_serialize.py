@@ -0,0 +1,153 @@
+import gzip
+import json
+import os
+
+import pytest
+
+from json_inspect import master
+from json_inspect import serialize
+
+
+def write(path, logs, opener=open):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with opener(path, "wt") as f:
+        f.writelines(json.dumps(log) + "\n" for log in logs)
+
+
+def test_directories_only_yield_logs(tmp_path):
+    write(str(tmp_path / "a.json"), [{"id": 1}])
+    write(str(tmp_path / "b.jsonl.gz"), [{"id": 2}], opener=gzip.open)
+    write(str(tmp_path / "sub" / "c.JSON"), [{"id": 3}])
+    write(str(tmp_path / ".hidden.json"), [{"id": 4}])
+    for name in ("README.md", "logs.tar", "shapes.db", "notes.json.txt"):
+        (tmp_path / name).write_text("not a log\n")
+
+    found = serialize.expand_paths(str(tmp_path))
+    assert found == [
+        str(tmp_path / "a.json"),
+        str(tmp_path / "b.jsonl.gz"),
+        str(tmp_path / "sub" / "c.JSON"),
+    ]
+    assert len(serialize.expand_paths(str(tmp_path), patterns=None)) == 7
+    assert serialize.expand_paths(str(tmp_path), patterns=("*.md",)) == [
+        str(tmp_path / "README.md")
+    ]
+
+
+def test_named_files_are_kept_unless_excluded(tmp_path):
+    readme = str(tmp_path / "README.md")
+    (tmp_path / "README.md").write_text("\n")
+    assert serialize.expand_paths([readme]) == [readme]
+    assert serialize.expand_paths(str(tmp_path / "*.md")) == [readme]
+    assert serialize.expand_paths([readme], exclude=[readme]) == []
+
+
+def test_catalog_beside_the_logs_is_not_read(tmp_path):
+    write(str(tmp_path / "a.json"), [{"id": 1}, {"id": 2, "actor": {}}])
+    catalog = str(tmp_path / "shapes.json")
+    for run in range(2):
+        write(str(tmp_path / f"run-{run}.json"), [{"run": run}])
+        m = master.Master(catalog=catalog, input_file=str(tmp_path))
+        m.make()
+        assert m.minions.events == (3 if run == 0 else 1)
+
+
+BLOB = {"a": {"b": [1, {"c": 2}]}, "d": "x"}
+
+
+def embedded(**kwargs):
+    return serialize.EmbeddedJSON(**kwargs)
+
+
+def test_embedded_json_modes():
+    text = json.dumps(BLOB)
+    log = {"top": text, "deep": {"inner": text}}
+
+    always = serialize.json_transform(log, policy=embedded(mode="always"))
+    assert always == {"top": BLOB, "deep": {"inner": BLOB}}
+
+    never = serialize.json_transform(log, policy=embedded(mode="never"))
+    assert never == log
+
+    shallow = serialize.json_transform(
+        log, policy=embedded(mode="limited", max_depth=1)
+    )
+    assert shallow == {"top": BLOB, "deep": {"inner": text}}
+
+    short = serialize.json_transform(
+        {"small": '{"a": 1}', "large": text},
+        policy=embedded(mode="limited", max_length=len(text) - 1),
+    )
+    assert short == {"small": {"a": 1}, "large": text}
+
+    # The log line itself is always decoded, whatever the mode.
+    line = json.dumps(log)
+    assert serialize.json_transform(line, policy=embedded(mode="never")) == log
+
+    with pytest.raises(ValueError):
+        embedded(mode="sometimes")
+
+
+def test_embedded_json_prefilter():
+    policy = embedded()
+    log = {
+        "user": "alice",
+        "ip": "10.0.0.1",
+        "time": "2019-01-02T03:04:05Z",
+        "number": "42",
+        "broken": "{not json",
+        "quoted": ' "inner"',
+        "list": "[1, 2]",
+    }
+    result = serialize.json_transform(log, policy=policy)
+    assert result == dict(log, quoted="inner", list=[1, 2])
+    # Only the strings starting with {, [ or " reach the parser.
+    assert (policy.attempts, policy.decoded) == (3, 2)
+
+
+def test_embedded_json_cache():
+    policy = embedded()
+    text = json.dumps(BLOB)
+    logs = [{"id": i, "props": text} for i in range(5)]
+    results = [serialize.json_transform(log, policy=policy) for log in logs]
+    assert all(result["props"] == BLOB for result in results)
+    assert (policy.attempts, policy.decoded) == (5, 5)
+    info = policy._decode.cache_info()
+    assert (info.hits, info.misses) == (4, 1)
+
+    uncached = embedded(cache_size=0)
+    assert serialize.json_transform(logs[0], policy=uncached)["props"] == BLOB
+
+    # Depths only split the cache when the depth is limited.
+    limited = embedded(mode="limited", max_depth=3)
+    serialize.json_transform({"a": text, "b": {"c": text}}, policy=limited)
+    assert limited._decode.cache_info().misses == 2
+
+
+def test_rendering_leaves_cached_values_alone(tmp_path):
+    policy = embedded()
+    text = json.dumps(BLOB)
+    cached = serialize.json_transform({"props": text}, policy=policy)["props"]
+    assert serialize.json_transform([text], policy=policy)[0] is cached
+
+    logs = [{"id": i, "props": text, "more": {"props": text}} for i in range(4)]
+    m = master.Master(input_string=json.dumps(logs), embedded_json=policy)
+    m.make()
+    for resolution in range(m.depth + 2):
+        for minion_ in m.minions.filtered(1):
+            minion_.data(resolution)
+            minion_.model(resolution)
+        m.print_unique_models(resolution)
+        m.print_unique_data(resolution)
+        m.stream_unique_models(str(tmp_path / "models.jsonl"), resolution)
+        m.stream_unique_data(str(tmp_path / "data.jsonl"), resolution)
+    m.write_flattened(str(tmp_path / "flat.json"))
+    assert cached == BLOB
+
+    # What is rendered is the caller's to change.
+    for minion_ in m.minions.filtered(1):
+        data = minion_.data(-1)
+        data["props"]["a"]["b"].append(3)
+        data["more"]["props"]["d"] = "y"
+    assert cached == BLOB
+    assert serialize.json_transform([text], policy=policy)[0] is cached
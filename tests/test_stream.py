@@ -0,0 +1,117 @@
+import time
+
+import pytest
+
+from json_inspect import codec as codec_
+from json_inspect import minion
+from json_inspect import stream
+
+
+LOGS = [{"id": 1}, {"id": 1, "actor": {"name": "a"}}, {"actor": [{"id": 2}]}, [1, 2]]
+
+
+def counter(resolutions=(1,), logs=LOGS, **kwargs):
+    counter_ = stream.DistinctCounter(resolutions=resolutions, **kwargs)
+    for log in logs:
+        counter_.check(log)
+    return counter_
+
+
+def test_distinct_counter_merge():
+    merged = counter(resolutions=(1, 2)).merge(counter(resolutions=(1, 2)))
+    assert merged.events == 2 * len(LOGS)
+    assert merged.count(1) == counter(resolutions=(1,)).count(1)
+
+
+def test_distinct_counter_round_trip():
+    saved = counter(resolutions=(1, 2))
+    loaded = stream.DistinctCounter.from_bytes(saved.to_bytes())
+    assert loaded.resolutions == (1, 2)
+    assert loaded.events == saved.events
+    assert loaded.count(2) == saved.count(2)
+
+
+@pytest.mark.parametrize(
+    "other",
+    [
+        lambda: counter(resolutions=(2,)),
+        lambda: counter(resolutions=(1, 2)),
+        lambda: counter(codec=codec_.Codec(digest="blake2b")),
+        lambda: counter(error=0.05),
+    ],
+    ids=["resolutions", "more_resolutions", "digest", "error"],
+)
+def test_distinct_counter_merge_rejects_mismatch(other):
+    current = counter()
+    before = (current.events, current.count(1))
+    with pytest.raises(ValueError):
+        current.merge(other())
+    assert (current.events, current.count(1)) == before
+
+
+START = 1_000_000
+
+
+def drift_reports(detector, panes):
+    """ Checks the logs of each pane in turn, a second into it. """
+
+    reports = []
+    for number, logs in enumerate(panes):
+        for log in logs:
+            timestamp = START + number * detector.step + 1
+            reports.extend(detector.check(log, timestamp=timestamp))
+    return reports + detector.flush()
+
+
+def named(records):
+    """ The keys of the log each shape was made from. """
+
+    names = {
+        minion.minion_generator(log, max_resolution=1).hash(1): name
+        for name, log in (("a", {"a": 1}), ("b", {"b": 1}))
+    }
+    return [names[record["hash"]] for record in records]
+
+
+def test_drift_ignores_far_future_time():
+    detector = stream.DriftDetector(window=60, max_skew=3600)
+    assert detector.check({"a": 1}, timestamp=START) == []
+    assert detector.check({"b": 1}, timestamp=time.time() + 7200) == []
+    assert detector.skewed == 1
+    # The log from the future is counted in the open pane, which later
+    # logs still close on time.
+    (report,) = detector.check({"a": 1}, timestamp=START + 60)
+    assert report["events"] == 2
+    assert detector.late == 0
+
+
+def test_drift_without_max_skew():
+    detector = stream.DriftDetector(window=60, max_skew=None)
+    detector.check({"a": 1}, timestamp=START)
+    detector.check({"b": 1}, timestamp=time.time() + 7200)
+    detector.check({"a": 1}, timestamp=START + 60)
+    assert (detector.skewed, detector.late) == (0, 1)
+
+
+@pytest.mark.parametrize("step", [1, 3], ids=["sliding", "tumbling"])
+def test_drift_reports_shapes_once(step):
+    detector = stream.DriftDetector(window=3, step=step, min_count=1)
+    panes = [[{"a": 1}]] * 12
+    panes[3] = [{"a": 1}, {"b": 1}]
+    reports = drift_reports(detector, panes)
+    new = [name for report in reports for name in named(report["new"])]
+    vanished = [name for report in reports for name in named(report["vanished"])]
+    assert new == ["a", "b"]
+    assert vanished == ["b"]
+
+
+def test_drift_sliding_reports_shape_again_after_it_vanishes():
+    detector = stream.DriftDetector(window=3, step=1)
+    panes = [[{"a": 1}] for _ in range(12)]
+    panes[2].append({"b": 1})
+    panes[9].append({"b": 1})
+    reports = drift_reports(detector, panes)
+    new = [named(report["new"]) for report in reports]
+    vanished = [named(report["vanished"]) for report in reports]
+    assert [number for number, names in enumerate(new) if "b" in names] == [2, 9]
+    assert [number for number, names in enumerate(vanished) if names] == [5]
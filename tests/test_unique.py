@@ -0,0 +1,87 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from json_inspect import master
+
+import helpers
+
+
+def made(logs, **kwargs):
+    m = master.Master(input_string=json.dumps(logs), **kwargs)
+    m.make()
+    return m
+
+
+def records(text):
+    return [json.loads(line) for line in text.splitlines()]
+
+
+FIELDS = {"model": "models", "data": "data"}
+
+
+@pytest.mark.parametrize("field", list(FIELDS))
+@pytest.mark.parametrize("resolution", [0, 1, 2, 4])
+def test_streamed_records_match_written_uniques(tmp_path, field, resolution):
+    m = made(helpers.random_logs(31))
+    stream = getattr(m, f"stream_unique_{FIELDS[field]}")
+    path = tmp_path / "uniques.json"
+    getattr(m, f"write_unique_{FIELDS[field]}")(str(path), resolution=resolution)
+    expected = json.loads(path.read_text())
+
+    output = io.StringIO()
+    written = stream(output, resolution=resolution)
+    streamed = records(output.getvalue())
+    assert written == len(streamed) == m.unique_count(resolution)
+    # In order of first appearance, as write_unique_* writes them.
+    assert [record["hash"] for record in streamed] == list(expected)
+    assert {record["hash"]: record[field] for record in streamed} == expected
+    assert not output.closed
+
+
+@pytest.mark.parametrize("field", list(FIELDS))
+def test_sorted_stream_to_compressed_file(tmp_path, field):
+    logs = helpers.random_logs(32)
+    m = made(logs)
+    stream = getattr(m, f"stream_unique_{FIELDS[field]}")
+    unsorted = io.StringIO()
+    stream(unsorted, resolution=2)
+
+    path = tmp_path / "uniques.jsonl.gz"
+    written = stream(str(path), resolution=2, sort=True)
+    with gzip.open(str(path), "rt") as f:
+        text = f.read()
+    lines = text.splitlines()
+    streamed = records(text)
+    assert written == len(lines)
+    assert [record["hash"] for record in streamed] == sorted(
+        record["hash"] for record in records(unsorted.getvalue())
+    )
+    assert lines == [json.dumps(record, sort_keys=True) for record in streamed]
+    assert sorted(lines) == sorted(
+        json.dumps(record, sort_keys=True) for record in records(unsorted.getvalue())
+    )
+
+    # Sorted output does not depend on the order the logs came in.
+    again = made(list(reversed(logs)))
+    output = io.StringIO()
+    getattr(again, f"stream_unique_{FIELDS[field]}")(output, resolution=2, sort=True)
+    if field == "model":
+        assert output.getvalue() == text
+    else:
+        hashes = [record["hash"] for record in records(output.getvalue())]
+        assert hashes == [record["hash"] for record in streamed]
+
+
+def test_stream_checks_the_resolution(tmp_path):
+    m = made(helpers.random_logs(33, count=20), max_resolution=1)
+    with pytest.raises(ValueError):
+        m.stream_unique_models(io.StringIO(), resolution=3)
+    assert m.stream_unique_models(io.StringIO(), resolution=1) == m.unique_count(1)
+
+    empty = made([])
+    path = tmp_path / "empty.jsonl"
+    assert empty.stream_unique_data(str(path)) == 0
+    assert path.read_text() == ""